@@ -11,14 +11,26 @@ class SurahAdmin(admin.ModelAdmin):
 class AyahAdmin(admin.ModelAdmin):
     list_display = ['surah', 'number_in_surah', 'page_number', 'juz_number']
     list_filter = ['surah', 'juz_number', 'page_number']
-    search_fields = ['text_uthmani', 'translation_en']
+    search_fields = ['text_uthmani', 'translations__text']
     ordering = ['surah__number', 'number_in_surah']
 
+@admin.register(Translation)
+class TranslationAdmin(admin.ModelAdmin):
+    list_display = ['ayah', 'language', 'edition']
+    list_filter = ['language', 'edition']
+    search_fields = ['text']
+
 @admin.register(Tafsir)
 class TafsirAdmin(admin.ModelAdmin):
     list_display = ['ayah', 'source', 'language']
     list_filter = ['source', 'language']
-    search_fields = ['text']
+    search_fields = ['ayah__text_uthmani']
+
+@admin.register(TextDictionary)
+class TextDictionaryAdmin(admin.ModelAdmin):
+    list_display = ['key', 'created_at']
+    list_filter = ['key']
+    exclude = ['data']
 
 @admin.register(UserNote)
 class UserNoteAdmin(admin.ModelAdmin):
@@ -38,4 +50,9 @@ class WordMeaningAdmin(admin.ModelAdmin):
 
 @admin.register(Recitation)
 class RecitationAdmin(admin.ModelAdmin):
-    list_display = ['name', 'style', 'reciter_id']
\ No newline at end of file
+    list_display = ['name', 'style', 'reciter_id']
+
+@admin.register(AudioFile)
+class AudioFileAdmin(admin.ModelAdmin):
+    list_display = ['recitation', 'surah_number', 'ayah_number', 'size', 'downloaded_at']
+    list_filter = ['recitation']
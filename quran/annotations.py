@@ -0,0 +1,43 @@
+"""
+Per-user bookmark and note flags for verse payloads.
+
+Verse payloads are the same for every reader, so they can be cached and
+shared. The current user's flags are looked up separately (one UNION
+query over bookmarks and notes) and overlaid on copies of the cached
+verse dicts, never on the dicts themselves.
+"""
+from django.db.models import CharField, Value
+
+from .models import Bookmark, UserNote
+
+NO_FLAGS = {'is_bookmarked': False, 'bookmark_type': None, 'has_note': False}
+
+
+def user_flags(user, ayah_ids):
+    """``{ayah_id: flags}`` for the ayahs the user bookmarked or annotated"""
+    ayah_ids = list(ayah_ids)
+    if not ayah_ids:
+        return {}
+    bookmarks = Bookmark.objects.filter(user=user, ayah_id__in=ayah_ids).annotate(
+        kind=Value('bookmark', output_field=CharField()),
+    ).values_list('ayah_id', 'bookmark_type', 'kind')
+    notes = UserNote.objects.filter(user=user, ayah_id__in=ayah_ids).annotate(
+        bookmark_type_=Value('', output_field=CharField()),
+        kind=Value('note', output_field=CharField()),
+    ).values_list('ayah_id', 'bookmark_type_', 'kind')
+
+    flags = {}
+    for ayah_id, bookmark_type, kind in bookmarks.union(notes, all=True):
+        entry = flags.setdefault(ayah_id, dict(NO_FLAGS))
+        if kind == 'bookmark':
+            entry['is_bookmarked'] = True
+            entry['bookmark_type'] = bookmark_type
+        else:
+            entry['has_note'] = True
+    return flags
+
+
+def overlay(verses, user):
+    """Copies of serialized verses with the user's flags added"""
+    flags = user_flags(user, [verse['id'] for verse in verses])
+    return [{**verse, **flags.get(verse['id'], NO_FLAGS)} for verse in verses]
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class QuranConfig(AppConfig):
     name = 'quran'
+
+    def ready(self):
+        # Connects the cache invalidation, annotation change log, corpus replica and SQLite tuning signals
+        from . import audio, payloads, replica, sqlite, sync, words
@@ -0,0 +1,129 @@
+"""
+Recitation audio URL resolution.
+
+Reciter URL templates are read from the database once per version of the
+``reference`` dataset and kept in memory. Saving or deleting a
+``Recitation`` bumps that version, so every worker reloads them within
+``QURAN_CACHE_VERSION_TTL`` seconds.
+Playlists for a whole surah are built from that cache plus a single query
+for the ayah ids, and cached per (reciter, surah) under the corpus version.
+"""
+import threading
+import zlib
+
+from django.conf import settings
+from django.urls import reverse
+
+from . import caching, payloads, positions
+from .models import Ayah, Recitation
+
+# Used when the requested reciter is unknown (matches the old per-ayah fallback)
+DEFAULT_AUDIO_TEMPLATE = 'https://everyayah.com/data/Alafasy_128kbps/{surah}{ayah}.mp3'
+
+DEFAULT_RECITER_ID = 1
+
+# Playlists only change when the corpus or a reciter template changes
+PLAYLIST_CACHE_TIMEOUT = 60 * 60 * 24
+
+_recitations = None  # (reference version, {reciter_id: entry})
+_lock = threading.Lock()
+
+
+def _load_recitations():
+    global _recitations
+    current = caching.version(payloads.REFERENCE)
+    loaded = _recitations
+    if loaded is None or loaded[0] != current:
+        with _lock:
+            if _recitations is loaded:
+                _recitations = (current, {
+                    reciter_id: {'reciter_id': reciter_id, 'name': name, 'template': template}
+                    for reciter_id, name, template in Recitation.objects.values_list(
+                        'reciter_id', 'name', 'audio_url_template'
+                    )
+                })
+            loaded = _recitations
+    return loaded[1]
+
+
+def get_recitation(reciter_id):
+    """Cached reciter entry (dict with reciter_id/name/template) or None"""
+    try:
+        reciter_id = int(reciter_id)
+    except (TypeError, ValueError):
+        return None
+    return _load_recitations().get(reciter_id)
+
+
+def format_audio_url(template, surah, ayah):
+    """Fill a ``{surah}``/``{ayah}`` template with zero-padded numbers"""
+    return template.format(surah=f"{surah:03d}", ayah=f"{ayah:03d}")
+
+
+def remote_template(recitation):
+    """The reciter's own URL template (the default reciter when unknown)"""
+    return recitation['template'] if recitation else DEFAULT_AUDIO_TEMPLATE
+
+
+def audio_template(recitation):
+    """URL template handed to clients: the local mirror when enabled"""
+    if recitation is not None and getattr(settings, 'QURAN_AUDIO_SERVE_LOCAL', False):
+        url = reverse('audio-stream', kwargs={'reciter_id': recitation['reciter_id'], 'file_key': '000000'})
+        return url.replace('000000', '{surah}{ayah}')
+    return remote_template(recitation)
+
+
+def remote_audio_url(reciter_id, surah, ayah):
+    """Source URL of one ayah on the reciter's host"""
+    return format_audio_url(remote_template(get_recitation(reciter_id)), surah, ayah)
+
+
+def resolve_audio_url(ayah, reciter_id=DEFAULT_RECITER_ID):
+    """Audio URL for an Ayah instance and reciter"""
+    recitation = get_recitation(reciter_id)
+    if recitation is not None:
+        try:
+            return format_audio_url(audio_template(recitation), ayah.surah_id, ayah.number_in_surah)
+        except (KeyError, IndexError, ValueError):
+            pass
+    return ayah.audio_url or format_audio_url(DEFAULT_AUDIO_TEMPLATE, ayah.surah_id, ayah.number_in_surah)
+
+
+def playlist_cache_key(reciter_id, surah_number, template):
+    # The template checksum stops entries built from an old template being
+    # served after the reciter is edited
+    return f"playlist:{reciter_id}:{surah_number}:{zlib.crc32(template.encode()):08x}"
+
+
+def build_playlist(surah_number, recitation=None):
+    """Ordered audio entries for every ayah of a surah"""
+    template = audio_template(recitation)
+    ayah_ids = dict(
+        Ayah.objects.filter(surah_id=surah_number).values_list('number_in_surah', 'id')
+    )
+    items = []
+    for number_in_surah in range(1, positions.SURAH_AYAH_COUNTS[surah_number - 1] + 1):
+        ayah_id = ayah_ids.get(number_in_surah)
+        if ayah_id is None:
+            continue
+        items.append({
+            'id': ayah_id,
+            'ayah': positions.verse_key(surah_number, number_in_surah),
+            'number_in_surah': number_in_surah,
+            'audio_url': format_audio_url(template, surah_number, number_in_surah),
+        })
+    return items
+
+
+def get_playlist(surah_number, reciter_id=DEFAULT_RECITER_ID):
+    """Return ``(recitation, items)`` for a surah, using the shared cache.
+
+    Raises ValueError for a surah number outside 1-114.
+    """
+    positions.surah_range(surah_number)
+    recitation = get_recitation(reciter_id)
+    template = audio_template(recitation)
+    key = playlist_cache_key(recitation['reciter_id'] if recitation else 0, surah_number, template)
+
+    items = caching.get_or_set((key,), lambda: build_playlist(surah_number, recitation), PLAYLIST_CACHE_TIMEOUT)
+    return recitation, items
@@ -0,0 +1,95 @@
+"""
+Content-addressed store for mirrored recitation audio.
+
+Files live under ``QURAN_AUDIO_ROOT/objects/<sha[:2]>/<sha[2:]>`` so the
+same recording shared by two reciter entries is stored once, and a file's
+hash doubles as a strong ETag. Downloads in progress are kept in
+``partial/`` and moved into place atomically once complete.
+"""
+import hashlib
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def root():
+    return Path(getattr(settings, 'QURAN_AUDIO_ROOT', Path(settings.MEDIA_ROOT) / 'audio'))
+
+
+def object_name(sha256):
+    """Path of an object relative to the store root"""
+    return f"objects/{sha256[:2]}/{sha256[2:]}"
+
+
+def object_path(sha256):
+    return root() / object_name(sha256)
+
+
+def partial_path(reciter_id, surah, ayah):
+    return root() / 'partial' / f"{reciter_id}_{surah:03d}{ayah:03d}.part"
+
+
+def hash_file(path, digest=None):
+    """Feed an existing file into a sha256 digest"""
+    digest = digest or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest
+
+
+def commit_partial(partial, sha256):
+    """Move a finished download into the object store; returns its path"""
+    target = object_path(sha256)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists():
+        os.remove(partial)
+    else:
+        os.replace(partial, target)
+    return target
+
+
+def parse_range(header, size):
+    """Parse a single ``bytes=`` range into an inclusive (start, end).
+
+    Returns None for a missing or multi-range header (serve the whole
+    file) and raises ValueError for a range that cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+def iter_range(path, start, end):
+    """Yield the bytes of ``path`` between start and end inclusive"""
+    remaining = end - start + 1
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,217 @@
+"""
+Cache keys tied to dataset versions.
+
+Everything derived from the corpus is tagged with the current
+``DatasetVersion`` of that dataset. ``key()`` embeds it in the key::
+
+    quran:corpus:v7:surah-verses:2:en:asad,bn:default
+
+and ``get_or_set()`` stores ``(version, fresh_until, value)`` in one slot
+per key, so an entry from an older version can still be served while it
+is rebuilt. Ingest commands call ``bump()`` when they finish.
+
+Each process remembers the version it last saw and re-checks it at most
+every ``QURAN_CACHE_VERSION_TTL`` seconds. With a shared backend (Redis,
+file based) the check is one cache read of the version key; with the
+per-process local-memory backend it reads the ``DatasetVersion`` row.
+Either way every worker moves to the new version within that window.
+
+Misses are single-flight: concurrent requests for the same slot in one
+process wait for a single build, and with a shared backend a lock entry
+lets only one worker build at a time. Anyone who does not get to build
+is handed the stale entry when there is one (stale-while-revalidate),
+and otherwise waits up to ``QURAN_CACHE_BUILD_WAIT`` seconds for the
+builder before giving up and building too.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import F
+
+from . import instrumentation, metrics
+from .models import DatasetVersion
+
+CORPUS = 'corpus'
+
+DEFAULT_VERSION_TTL = 2
+
+# Corpus data only changes on ingest, which moves every key to a new version
+DEFAULT_TIMEOUT = 60 * 60 * 24
+
+# How long an expired or old-version entry may still be served while rebuilt
+DEFAULT_STALE_SECONDS = 60 * 60 * 24
+
+# Longest a request waits for someone else's build before building itself
+DEFAULT_BUILD_WAIT = 10
+
+# Cross-worker build lock; expires on its own if the builder dies
+LOCK_TIMEOUT = 60
+POLL_INTERVAL = 0.05
+
+_seen = {}  # dataset name -> (version, checked_at)
+_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, 'QURAN_CACHE_ALIAS', 'default')]
+
+
+def is_shared(backend):
+    """Whether other processes see what this one writes"""
+    return not isinstance(backend, LocMemCache)
+
+
+def version_key(name):
+    return f"quran:version:{name}"
+
+
+def stored_version(name):
+    return DatasetVersion.objects.filter(name=name).values_list('version', flat=True).first() or 0
+
+
+def version(name=CORPUS):
+    """Current version of a dataset, re-checked at most every QURAN_CACHE_VERSION_TTL seconds"""
+    now = time.monotonic()
+    seen = _seen.get(name)
+    if seen is not None and now - seen[1] < getattr(settings, 'QURAN_CACHE_VERSION_TTL', DEFAULT_VERSION_TTL):
+        return seen[0]
+
+    backend = get_cache()
+    current = backend.get(version_key(name)) if is_shared(backend) else None
+    if current is None:
+        current = stored_version(name)
+        if is_shared(backend):
+            backend.add(version_key(name), current, None)
+    with _lock:
+        _seen[name] = (current, now)
+    return current
+
+
+def bump(name=CORPUS):
+    """Move a dataset to a new version, orphaning every key built on the old one"""
+    with transaction.atomic():
+        DatasetVersion.objects.get_or_create(name=name)
+        DatasetVersion.objects.filter(name=name).update(version=F('version') + 1)
+        current = stored_version(name)
+
+    def publish():
+        get_cache().set(version_key(name), current, None)
+        with _lock:
+            _seen.pop(name, None)
+
+    # Inside an ingest transaction, wait until the new data is visible
+    transaction.on_commit(publish)
+    return current
+
+
+def key(*parts, dataset=CORPUS):
+    """Cache key for ``parts`` under the dataset's current version"""
+    return ':'.join(['quran', dataset, f"v{version(dataset)}", *map(str, parts)])
+
+
+def slot_key(parts, dataset=CORPUS):
+    return ':'.join(['quran', dataset, *map(str, parts)])
+
+
+def count(parts, outcome):
+    """Record a lookup for the request's Server-Timing and the per-family metrics"""
+    instrumentation.count_cache(outcome)
+    metrics.inc('quran_cache_requests_total', family=str(parts[0]).partition(':')[0], outcome=outcome)
+
+
+class _Flight:
+    """One in-process build that other requests for the same slot wait on"""
+    __slots__ = ('event', 'value', 'failed')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.failed = False
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _settings():
+    return (
+        getattr(settings, 'QURAN_CACHE_BUILD_WAIT', DEFAULT_BUILD_WAIT),
+        getattr(settings, 'QURAN_CACHE_STALE_SECONDS', DEFAULT_STALE_SECONDS),
+    )
+
+
+def get_or_set(parts, build, timeout=DEFAULT_TIMEOUT, dataset=CORPUS):
+    """Cached ``build()`` for ``parts`` under the dataset's current version.
+
+    Fresh entries are returned straight away. On a miss only one caller
+    runs ``build``; the others get the stale entry if there is one, or
+    wait for the builder.
+    """
+    backend = get_cache()
+    current = version(dataset)
+    slot = slot_key(parts, dataset)
+    entry = backend.get(slot)
+    if entry is not None and entry[0] == current and entry[1] > time.time():
+        count(parts, 'hit')
+        return entry[2]
+    stale = entry[2] if entry is not None else None
+    wait, stale_seconds = _settings()
+
+    def store():
+        count(parts, 'miss')
+        value = build()
+        backend.set(slot, (current, time.time() + timeout, value), timeout + stale_seconds)
+        return value
+
+    def store_once():
+        """Build unless another worker holds the slot's lock"""
+        if not is_shared(backend):
+            return store()
+        lock = f"{slot}:lock"
+        if backend.add(lock, 1, LOCK_TIMEOUT):
+            try:
+                return store()
+            finally:
+                backend.delete(lock)
+        if stale is not None:
+            count(parts, 'stale')
+            return stale
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            entry = backend.get(slot)
+            if entry is not None and entry[0] == current:
+                count(parts, 'hit')
+                return entry[2]
+        # The other worker is too slow or died holding the lock
+        return store()
+
+    with _flights_lock:
+        flight = _flights.get(slot)
+        leader = flight is None
+        if leader:
+            flight = _flights[slot] = _Flight()
+
+    if not leader:
+        if stale is not None:
+            count(parts, 'stale')
+            return stale
+        if flight.event.wait(wait) and not flight.failed:
+            count(parts, 'hit')
+            return flight.value
+        return store()
+
+    try:
+        flight.value = store_once()
+        return flight.value
+    except BaseException:
+        flight.failed = True
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(slot, None)
+        flight.event.set()
@@ -0,0 +1,245 @@
+"""
+Compressed text columns.
+
+``CompressedTextField`` stores text as a small header followed by the
+compressed UTF-8 bytes. The header names the codec (zstd when the
+``zstandard`` package is installed, zlib otherwise) and the optional
+``TextDictionary`` the text was compressed with, so rows written with
+different codecs or dictionaries can sit side by side.
+
+Values are decompressed on first attribute access. Decompressed texts are
+kept in a process-wide LRU bounded by size (``QURAN_TEXT_CACHE_BYTES``), so
+a popular passage is not inflated again on every request.
+"""
+import struct
+import threading
+import zlib
+from collections import Counter, OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models.query_utils import DeferredAttribute
+from django.db.models.signals import post_delete, post_save
+
+try:
+    import zstandard
+except ImportError:  # optional, better ratio and speed
+    zstandard = None
+
+ZLIB = b'z'
+ZSTD = b's'
+
+_HEADER = struct.Struct('>cI')  # codec, dictionary id (0 = none)
+
+ZLIB_LEVEL = 9
+# Dictionary compression does most of the work; higher levels barely shrink
+# short texts further and make ingest many times slower
+ZSTD_LEVEL = 6
+
+# zlib only looks back 32 KiB, so a longer preset dictionary is wasted
+ZLIB_DICTIONARY_SIZE = 32 * 1024
+
+DEFAULT_CACHE_BYTES = 16 * 1024 * 1024
+
+
+class CompressedText:
+    """Compressed bytes as read from the database"""
+    __slots__ = ('blob',)
+
+    def __init__(self, blob):
+        self.blob = bytes(blob)
+
+    def decode(self):
+        return decompress(self.blob)
+
+    def __len__(self):
+        return len(self.blob)
+
+    def __repr__(self):
+        return f"CompressedText({len(self.blob)} bytes)"
+
+    def __reduce__(self):
+        return (CompressedText, (self.blob,))
+
+
+# Dictionaries never change once written, so they are cached by id forever;
+# the per-key "current dictionary" lookup is dropped when one is added
+_dictionaries = {}
+_current = {}
+
+
+def get_dictionary(dictionary_id):
+    data = _dictionaries.get(dictionary_id)
+    if data is None:
+        TextDictionary = apps.get_model('quran', 'TextDictionary')
+        data = bytes(TextDictionary.objects.values_list('data', flat=True).get(id=dictionary_id))
+        _dictionaries[dictionary_id] = data
+    return data
+
+
+def current_dictionary(key):
+    """Id of the newest dictionary registered for ``key`` (or 0)"""
+    try:
+        return _current[key]
+    except KeyError:
+        pass
+    TextDictionary = apps.get_model('quran', 'TextDictionary')
+    dictionary_id = TextDictionary.objects.filter(key=key).order_by('-id').values_list('id', flat=True).first()
+    _current[key] = dictionary_id or 0
+    return _current[key]
+
+
+def forget_dictionaries(**kwargs):
+    _current.clear()
+
+
+post_save.connect(forget_dictionaries, sender='quran.TextDictionary')
+post_delete.connect(forget_dictionaries, sender='quran.TextDictionary')
+
+
+# zstd compressors per dictionary id; they are not thread-safe, so one set per thread
+_compressors = threading.local()
+
+
+def zstd_compressor(dictionary_id):
+    compressors = getattr(_compressors, 'by_dictionary', None)
+    if compressors is None:
+        compressors = _compressors.by_dictionary = {}
+    compressor = compressors.get(dictionary_id)
+    if compressor is None:
+        dictionary = get_dictionary(dictionary_id) if dictionary_id else None
+        compressor = compressors[dictionary_id] = zstandard.ZstdCompressor(
+            level=ZSTD_LEVEL,
+            dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None,
+        )
+    return compressor
+
+
+def compress(text, dictionary_id=0):
+    """Compress a string into a self-describing blob"""
+    data = text.encode('utf-8')
+    if zstandard is not None:
+        return _HEADER.pack(ZSTD, dictionary_id) + zstd_compressor(dictionary_id).compress(data)
+
+    dictionary = get_dictionary(dictionary_id) if dictionary_id else None
+    if dictionary:
+        compressor = zlib.compressobj(ZLIB_LEVEL, zdict=dictionary[-ZLIB_DICTIONARY_SIZE:])
+    else:
+        compressor = zlib.compressobj(ZLIB_LEVEL)
+    return _HEADER.pack(ZLIB, dictionary_id) + compressor.compress(data) + compressor.flush()
+
+
+def train_dictionary(samples, size=ZLIB_DICTIONARY_SIZE):
+    """Preset dictionary (bytes) built from sample texts"""
+    samples = [text.encode('utf-8') for text in samples if text]
+    if zstandard is not None:
+        return zstandard.train_dictionary(size, samples).as_bytes()
+
+    # zlib has no trainer: raw sample text, then the phrases repeated across
+    # samples with the most common last, where zlib reaches them cheapest
+    counts = Counter(
+        phrase for sample in samples for phrase in set(sample.split(b'. ')) if len(phrase) > 8
+    )
+    dictionary = b''.join(samples)[-size:]
+    for phrase, count in reversed(counts.most_common()):
+        if count < 2:
+            continue
+        dictionary = (dictionary + phrase + b'. ')[-size:]
+    return dictionary
+
+
+def _inflate(blob):
+    codec, dictionary_id = _HEADER.unpack_from(blob)
+    payload = memoryview(blob)[_HEADER.size:]
+    dictionary = get_dictionary(dictionary_id) if dictionary_id else None
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstd compressed text needs the zstandard package")
+        decompressor = zstandard.ZstdDecompressor(
+            dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None,
+        )
+        data = decompressor.decompressobj().decompress(payload)
+    elif codec == ZLIB:
+        if dictionary:
+            decompressor = zlib.decompressobj(zdict=dictionary[-ZLIB_DICTIONARY_SIZE:])
+        else:
+            decompressor = zlib.decompressobj()
+        data = decompressor.decompress(payload) + decompressor.flush()
+    else:
+        raise ValueError(f"Unknown text codec {codec!r}")
+    return data.decode('utf-8')
+
+
+class TextCache:
+    """LRU of decompressed texts keyed by their compressed blob"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, blob):
+        with self._lock:
+            text = self._entries.get(blob)
+            if text is not None:
+                self._entries.move_to_end(blob)
+            return text
+
+    def put(self, blob, text):
+        cost = len(blob) + len(text)
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            if blob in self._entries:
+                return
+            self._entries[blob] = text
+            self.size += cost
+            while self.size > self.max_bytes:
+                old_blob, old_text = self._entries.popitem(last=False)
+                self.size -= len(old_blob) + len(old_text)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+_cache = None
+_lock = threading.Lock()
+
+
+def text_cache():
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = TextCache(getattr(settings, 'QURAN_TEXT_CACHE_BYTES', DEFAULT_CACHE_BYTES))
+    return _cache
+
+
+def decompress(blob):
+    """Text of a compressed blob, from the LRU when recently used"""
+    cache = text_cache()
+    text = cache.get(blob)
+    if text is None:
+        text = _inflate(blob)
+        cache.put(blob, text)
+    return text
+
+
+class LazyTextAttribute(DeferredAttribute):
+    """Model attribute that decompresses its value on first access"""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = instance.__dict__.get(self.field.attname, self)
+        if value is self:
+            value = super().__get__(instance, cls)
+        if isinstance(value, CompressedText):
+            value = instance.__dict__[self.field.attname] = value.decode()
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
@@ -0,0 +1,129 @@
+"""
+Per-request performance metrics.
+
+With ``QURAN_SERVER_TIMING`` on, ``ServerTimingMiddleware`` counts every
+query and its time, and collects the time spent in named spans that the
+views, serializers and renderer mark with ``span()``, plus cache hits and
+misses from ``caching``. Each response gets a ``Server-Timing`` header
+(shown in the browser's network panel) and one ``key=value`` log line on
+the ``quran.requests`` logger.
+
+Span times exclude the queries run inside them, so ``serialize`` is the
+serializer's own cost and the lazy queries it triggers count as ``db``.
+When the setting is off the middleware removes itself and ``span()``
+costs one context variable lookup.
+"""
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('quran.requests')
+
+CACHE_OUTCOMES = ('hit', 'stale', 'miss')
+
+_current = ContextVar('quran_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """What one request spent its time on"""
+    __slots__ = ('started', 'queries', 'db_time', 'spans', 'cache')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.spans = {}
+        self.cache = dict.fromkeys(CACHE_OUTCOMES, 0)
+
+    def server_timing(self, total):
+        entries = [f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"']
+        entries += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.spans.items()]
+        if any(self.cache.values()):
+            counts = ' '.join(f"{outcome}={count}" for outcome, count in self.cache.items())
+            entries.append(f'cache;desc="{counts}"')
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ', '.join(entries)
+
+    def log_fields(self, total):
+        fields = {
+            'total_ms': round(total * 1000, 1),
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 1),
+        }
+        fields.update((f"{name}_ms", round(seconds * 1000, 1)) for name, seconds in self.spans.items())
+        fields.update((f"cache_{outcome}", count) for outcome, count in self.cache.items())
+        return fields
+
+
+def current():
+    """Metrics of the request being handled, or None"""
+    return _current.get()
+
+
+@contextmanager
+def span(name):
+    """Add the time spent in the block (less its queries) to the request's ``name`` span"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    db_before = metrics.db_time
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started - (metrics.db_time - db_before)
+        metrics.spans[name] = metrics.spans.get(name, 0.0) + elapsed
+
+
+def count_cache(outcome):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache[outcome] += 1
+
+
+def record_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.db_time += time.perf_counter() - started
+
+
+class ServerTimingMiddleware:
+    """Times each request and reports it in Server-Timing and the request log"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QURAN_SERVER_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total = time.perf_counter() - metrics.started
+        response['Server-Timing'] = metrics.server_timing(total)
+        fields = metrics.log_fields(total)
+        logger.info(
+            "method=%s path=%s status=%s %s",
+            request.method, request.path, response.status_code,
+            ' '.join(f"{key}={value}" for key, value in fields.items()),
+            extra={'metrics': fields},
+        )
+        return response
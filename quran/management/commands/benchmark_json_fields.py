@@ -0,0 +1,61 @@
+import json
+import time
+from django.core.management.base import BaseCommand
+from quran.models import Ayah
+from quran.rawjson import RawJSON, raw_value
+from quran.renderers import JSONRenderer
+from quran.serializers import AyahSerializer
+
+JSON_FIELDS = ['audio_segments', 'segment_timestamps']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-row cost of the JSON columns on full-surah loads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--surah', type=int, default=2, help='Surah to load')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs per strategy')
+
+    def handle(self, *args, **options):
+        repeat = max(1, options['repeat'])
+        queryset = (Ayah.objects.filter(surah_id=options['surah'])
+                    .select_related('surah').prefetch_related('word_meanings'))
+        rows = queryset.count()
+        if not rows:
+            self.stdout.write(self.style.ERROR("No verses found. Run download_quran_data first."))
+            return
+
+        self.stdout.write(f"Surah {options['surah']}: {rows} ayahs")
+
+        renderer = JSONRenderer()
+
+        def eager():
+            # What the old field did: every JSON column parsed with json.loads on load
+            ayahs = list(queryset.all())
+            for ayah in ayahs:
+                for name in JSON_FIELDS:
+                    value = raw_value(ayah, name)
+                    setattr(ayah, name, json.loads(value.text) if isinstance(value, RawJSON) else value)
+            return ayahs
+
+        def render(ayahs):
+            return renderer.render(AyahSerializer(ayahs, many=True).data)
+
+        strategies = [
+            ('load, eager decode (legacy)', eager),
+            ('load, lazy', lambda: list(queryset.all())),
+            ('load + render, eager decode', lambda: render(eager())),
+            ('load + render, raw passthrough', lambda: render(list(queryset.all()))),
+        ]
+
+        for name, run in strategies:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+
+            best = min(timings)
+            self.stdout.write(
+                f"{name:<32} best {best * 1000:8.1f} ms  {best / rows * 1e6:8.1f} µs/row"
+            )
@@ -0,0 +1,131 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from quran import sqlite
+from quran.models import Ayah
+
+READ_SQL = f"SELECT * FROM {Ayah._meta.db_table} WHERE surah_id = ? ORDER BY number_in_surah"
+
+# Stand-in for note and bookmark saves: one small transaction per write
+WRITE_TABLE = 'benchmark_writes'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent corpus reads against user-style writes with and without the SQLite tuning'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(self.style.ERROR("The default database is not SQLite."))
+            return
+        if not Ayah.objects.exists():
+            self.stdout.write(self.style.ERROR("No verses found. Run download_quran_data first."))
+            return
+
+        profiles = [
+            ('rollback journal, defaults', {'journal_mode': 'delete'}, False),
+            ('WAL + tuned pragmas', sqlite.pragmas(), False),
+            ('WAL + tuned, read-only readers', sqlite.pragmas(), True),
+        ]
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers, {options['seconds']:.0f}s per profile"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for name, pragmas, read_only in profiles:
+                # A fresh copy per profile, so the journal mode is the only difference
+                path = os.path.join(directory, f"{len(os.listdir(directory))}.sqlite3")
+                target = sqlite3.connect(path)
+                connection.ensure_connection()
+                connection.connection.backup(target)
+                target.execute(f"CREATE TABLE {WRITE_TABLE} (id INTEGER PRIMARY KEY, ayah_id INTEGER, note TEXT)")
+                target.commit()
+                target.close()
+                self.run_profile(name, path, pragmas, read_only, options)
+
+    def connect(self, path, pragmas, read_only):
+        uri = f"file:{path}?mode=ro" if read_only else f"file:{path}"
+        conn = sqlite3.connect(uri, uri=True, timeout=20, isolation_level=None, check_same_thread=False)
+        for name, value in pragmas.items():
+            if read_only and name in sqlite.WRITE_PRAGMAS:
+                continue
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def run_profile(self, name, path, pragmas, read_only, options):
+        # Sets the persistent journal mode before the workers connect
+        self.connect(path, pragmas, False).close()
+
+        stop = threading.Event()
+        latencies = {'read': [], 'write': []}
+        errors = []
+        lock = threading.Lock()
+
+        def reader():
+            conn = self.connect(path, pragmas, read_only)
+            timings = []
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    conn.execute(READ_SQL, (random.randint(1, 114),)).fetchall()
+                except sqlite3.OperationalError as e:
+                    errors.append(str(e))
+                    continue
+                timings.append(time.perf_counter() - started)
+            conn.close()
+            with lock:
+                latencies['read'].extend(timings)
+
+        def writer():
+            conn = self.connect(path, pragmas, False)
+            timings = []
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.execute(
+                        f"INSERT INTO {WRITE_TABLE} (ayah_id, note) VALUES (?, ?)",
+                        (random.randint(1, 6236), 'x' * 200),
+                    )
+                    conn.execute('COMMIT')
+                except sqlite3.OperationalError as e:
+                    errors.append(str(e))
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    continue
+                timings.append(time.perf_counter() - started)
+            conn.close()
+            with lock:
+                latencies['write'].extend(timings)
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=writer) for _ in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        self.stdout.write(f"\n{name}")
+        for kind, timings in latencies.items():
+            if not timings:
+                self.stdout.write(f"  {kind:<6} none completed")
+                continue
+            timings.sort()
+            p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+            self.stdout.write(
+                f"  {kind:<6} {len(timings) / options['seconds']:8.0f}/s  "
+                f"median {statistics.median(timings) * 1000:6.2f} ms  p99 {p99 * 1000:7.2f} ms"
+            )
+        if errors:
+            self.stdout.write(self.style.WARNING(f"  {len(errors)} errors, e.g. {errors[0]}"))
@@ -0,0 +1,71 @@
+import time
+from django.core.management.base import BaseCommand
+from quran.models import Ayah
+from quran.transliteration import LETTERS, Transliterator
+
+
+class Command(BaseCommand):
+    help = 'Benchmark word transliteration over the full Quran corpus'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs per strategy')
+    
+    def handle(self, *args, **options):
+        repeat = max(1, options['repeat'])
+        
+        texts = list(Ayah.objects.order_by('surah__number', 'number_in_surah')
+                     .values_list('text_uthmani', flat=True))
+        words = [word for text in texts for word in text.split()]
+        
+        if not words:
+            self.stdout.write(self.style.ERROR("No verses found. Run download_quran_data first."))
+            return
+        
+        self.stdout.write(f"Corpus: {len(texts)} ayahs, {len(words)} words "
+                          f"({len(set(words))} distinct), {sum(len(w) for w in words)} characters")
+        
+        warm = Transliterator()
+        warm.transliterate_words(words)
+        
+        strategies = [
+            # name, setup (returns a fresh engine or None), run
+            ('per-character loop (legacy)', lambda: None,
+             lambda engine: [self.legacy_transliteration(w) for w in words]),
+            ('table, per word, cold', Transliterator,
+             lambda engine: [engine.transliterate(w) for w in words]),
+            ('table, one pass, no cache', Transliterator,
+             lambda engine: engine.translate_uncached(words)),
+            ('table, corpus batch, cold', Transliterator,
+             lambda engine: engine.transliterate_ayah_words(texts)),
+            ('table, corpus batch, warm', lambda: warm,
+             lambda engine: engine.transliterate_ayah_words(texts)),
+        ]
+        
+        baseline = None
+        for name, setup, run in strategies:
+            timings = []
+            for _ in range(repeat):
+                engine = setup()
+                start = time.perf_counter()
+                run(engine)
+                timings.append(time.perf_counter() - start)
+            
+            best = min(timings)
+            if baseline is None:
+                baseline = best
+            self.stdout.write(
+                f"{name:<30} best {best * 1000:9.1f} ms  "
+                f"{len(words) / best:12,.0f} words/s  x{baseline / best:.1f}"
+            )
+    
+    def legacy_transliteration(self, arabic_word):
+        """Character-by-character loop the ingest commands used before the table engine"""
+        translit = ''
+        for char in arabic_word:
+            if char in LETTERS:
+                translit += LETTERS[char]
+            elif char in 'ًٌٍََُِّْ':
+                continue
+            else:
+                translit += char
+        return translit
@@ -0,0 +1,46 @@
+from django.core.management.base import CommandError
+from django.db import transaction
+from quran import compressed
+from quran.models import Tafsir, TextDictionary
+from quran.replica import IngestCommand
+
+
+class Command(IngestCommand):
+    help = 'Train a compression dictionary for one tafsir source and language and recompress its texts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Tafsir source, e.g. ibn_kathir')
+        parser.add_argument('--language', default='en')
+        parser.add_argument('--size', type=int, default=compressed.ZLIB_DICTIONARY_SIZE,
+                            help='Dictionary size in bytes')
+        parser.add_argument('--samples', type=int, default=2000,
+                            help='Number of texts to train on')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows fetched per query')
+
+    def handle(self, *args, **options):
+        tafsirs = Tafsir.objects.filter(source=options['source'], language=options['language'])
+        samples = [t.text for t in tafsirs.order_by('?')[:options['samples']]]
+        if not samples:
+            raise CommandError(f"No {options['source']} tafsir in {options['language']}")
+
+        data = compressed.train_dictionary(samples, options['size'])
+        if not data:
+            raise CommandError('Samples have too little in common for a dictionary')
+
+        key = Tafsir._meta.get_field('text').dictionary_key.format(
+            source=options['source'], language=options['language'],
+        )
+        before = after = count = 0
+        with transaction.atomic():
+            dictionary = TextDictionary.objects.create(key=key, data=data)
+            self.stdout.write(f"📚 Dictionary {dictionary.id} for {key}: {len(data)} bytes")
+
+            for tafsir in tafsirs.iterator(chunk_size=options['batch_size']):
+                before += len(tafsir.__dict__['text'])
+                # A plain string is recompressed with the newest dictionary on save
+                tafsir.text = tafsir.text
+                tafsir.save(update_fields=['text'])
+                after += len(tafsir.__dict__['text'])
+                count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Recompressed {count} texts: {before} → {after} bytes"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from quran import caching
+
+
+class Command(BaseCommand):
+    help = 'Bump a dataset version so every worker stops serving entries cached from the old data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?', default=caching.CORPUS, help='Dataset name (default: corpus)')
+
+    def handle(self, *args, **options):
+        version = caching.bump(options['name'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {options['name']} is now at version {version}"))
@@ -0,0 +1,84 @@
+import time
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from quran import replica
+
+
+class Command(BaseCommand):
+    help = ('Replace the contents of this database with every row of another one, '
+            'e.g. the old SQLite file (QURAN_DB_IMPORT) after switching to QURAN_DB=postgres')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default='import', help='Database alias to copy from (default: import)')
+        parser.add_argument('--target', default='default', help='Database alias to copy into (default: default)')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive')
+
+    def handle(self, *args, **options):
+        source, target = options['source'], options['target']
+        if source not in connections.settings:
+            raise CommandError(f"No '{source}' database. Set QURAN_DB_IMPORT to the SQLite file to copy from.")
+        if options['interactive']:
+            answer = input(f"Every row in '{target}' will be replaced. Type 'yes' to continue: ")
+            if answer != 'yes':
+                raise CommandError('Copy cancelled.')
+
+        # Content types and permissions are copied too, so their ids still
+        # match the rows that point at them
+        call_command('flush', database=target, interactive=False, inhibit_post_migrate=True, verbosity=0)
+
+        models = [
+            model for model in apps.get_models(include_auto_created=True)
+            if model._meta.managed and not model._meta.proxy
+        ]
+        started = time.perf_counter()
+        # Foreign keys are checked at commit, so the table order does not matter
+        with transaction.atomic(using=target):
+            for model in models:
+                copied = self.copy(model, source, target, options['batch_size'])
+                if copied:
+                    self.stdout.write(f"📋 {model._meta.label}: {copied} rows")
+
+            connection = connections[target]
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                    cursor.execute(sql)
+
+        replica.publish()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Copied {len(models)} tables from '{source}' to '{target}' in {time.perf_counter() - started:.1f}s"
+        ))
+
+    def copy(self, model, source, target, batch_size):
+        """Insert the stored values of every row as-is (no save(), so auto_now fields keep their values)"""
+        connection = connections[target]
+        fields = model._meta.concrete_fields
+        placeholders = [
+            field.get_placeholder(None, None, connection) if hasattr(field, 'get_placeholder') else '%s'
+            for field in fields
+        ]
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            connection.ops.quote_name(model._meta.db_table),
+            ', '.join(connection.ops.quote_name(field.column) for field in fields),
+            ', '.join(placeholders),
+        )
+        rows = model._base_manager.using(source).order_by('pk').values_list(
+            *[field.attname for field in fields]
+        ).iterator(chunk_size=batch_size)
+
+        copied = 0
+        batch = []
+        with connection.cursor() as cursor:
+            for row in rows:
+                batch.append([field.get_db_prep_save(value, connection) for field, value in zip(fields, row)])
+                if len(batch) >= batch_size:
+                    cursor.executemany(sql, batch)
+                    copied += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+                copied += len(batch)
+        return copied
@@ -1,11 +1,12 @@
 import requests
 import json
 import re
-from django.core.management.base import BaseCommand
 from django.db import transaction
 from quran.models import Surah, Ayah, WordMeaning
+from quran.transliteration import transliterate, transliterate_words
+from quran.replica import IngestCommand
 
-class Command(BaseCommand):
+class Command(IngestCommand):
     help = 'Create word meanings for Quran verses'
     
     def handle(self, *args, **options):
@@ -30,7 +31,7 @@ class Command(BaseCommand):
             
             word_count = 0
             for ayah in ayahs:
-                words_created = self.create_ayah_word_meanings(ayah)
+                words_created = self.create_ayah_word_meanings(ayah, surah_number)
                 word_count += words_created
             
             self.stdout.write(f"  Created {word_count} word meanings for Surah {surah_number}: {surah.name_english}")
@@ -40,7 +41,7 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Error processing surah {surah_number}: {e}"))
     
-    def create_ayah_word_meanings(self, ayah):
+    def create_ayah_word_meanings(self, ayah, surah_number):
         """Create word meanings for a specific ayah"""
         if not ayah.text_uthmani:
             return 0
@@ -49,7 +50,10 @@ class Command(BaseCommand):
         words = self.parse_arabic_text(ayah.text_uthmani)
         
         # Get pre-defined word meanings if available
-        pre_defined = self.get_pre_defined_meanings(ayah.surah.number, ayah.number_in_surah)
+        pre_defined = self.get_pre_defined_meanings(surah_number, ayah.number_in_surah)
+        
+        # Transliterate every word of the ayah in one pass
+        transliterations = transliterate_words(words)
         
         word_count = 0
         for i, arabic_word in enumerate(words):
@@ -57,7 +61,8 @@ class Command(BaseCommand):
             if i < len(pre_defined):
                 word_data = pre_defined[i]
             else:
-                word_data = self.generate_word_data(arabic_word, i, ayah.surah.number, ayah.number_in_surah)
+                word_data = self.generate_word_data(arabic_word, i, surah_number, ayah.number_in_surah,
+                                                    transliteration=transliterations[i])
             
             # Create word meaning
             try:
@@ -176,11 +181,11 @@ class Command(BaseCommand):
         
         return []
     
-    def generate_word_data(self, arabic_word, word_index, surah_number, ayah_number):
+    def generate_word_data(self, arabic_word, word_index, surah_number, ayah_number, transliteration=None):
         """Generate word data for unknown words"""
         return {
             'arabic': arabic_word,
-            'transliteration': self.generate_transliteration(arabic_word, word_index),
+            'transliteration': transliteration or self.generate_transliteration(arabic_word, word_index),
             'meaning': self.get_word_meaning(arabic_word),
             'root': self.extract_root(arabic_word),
             'part_of_speech': self.guess_part_of_speech(arabic_word),
@@ -189,28 +194,7 @@ class Command(BaseCommand):
     
     def generate_transliteration(self, arabic_word, word_index):
         """Generate basic transliteration"""
-        # Basic transliteration mapping
-        translit_map = {
-            'ا': 'a', 'أ': 'a', 'إ': 'i', 'آ': 'aa', 'ى': 'a',
-            'ب': 'b', 'ت': 't', 'ث': 'th', 'ج': 'j', 'ح': 'h',
-            'خ': 'kh', 'د': 'd', 'ذ': 'dh', 'ر': 'r', 'ز': 'z',
-            'س': 's', 'ش': 'sh', 'ص': 's', 'ض': 'd', 'ط': 't',
-            'ظ': 'dh', 'ع': 'a', 'غ': 'gh', 'ف': 'f', 'ق': 'q',
-            'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n', 'ه': 'h',
-            'و': 'w', 'ي': 'y', 'ة': 'h', 'ء': "'", 'ؤ': "'u",
-            'ئ': "'i", 'لا': 'la'
-        }
-        
-        result = []
-        for char in arabic_word:
-            if char in translit_map:
-                result.append(translit_map[char])
-            elif char in 'ًٌٍََُِّْ':  # Skip Arabic diacritics
-                continue
-            else:
-                result.append(char)
-        
-        translit = ''.join(result)
+        translit = transliterate(arabic_word)
         return translit if translit else f"word_{word_index + 1}"
     
     def get_word_meaning(self, arabic_word):
@@ -1,13 +1,13 @@
-from django.shortcuts import get_object_or_404
 import requests
 import json
 import time
-from django.core.management.base import BaseCommand
 from django.db import transaction
 from tqdm import tqdm
-from quran.models import Surah, Ayah, Recitation, WordMeaning
+from quran.models import Surah, Ayah, Recitation, Translation, WordMeaning
+from quran import positions, translations
+from quran.replica import IngestCommand
 
-class Command(BaseCommand):
+class Command(IngestCommand):
     help = 'Download complete Bangla Translation data from open-source APIs'
     
     def handle(self, *args, **options):
@@ -40,19 +40,27 @@ class Command(BaseCommand):
             response_bn.raise_for_status()
             bn_data = response_bn.json()
             
-            surah = Surah.objects.get(number=surah_number)
-            surah.name_translation_bn = bn_data['translation']
-            surah.save()
-            updated_ayahs = []
+            Surah.objects.filter(number=surah_number).update(name_translation_bn=bn_data['translation'])
+            rows = []
+            
+            # Load the surah's ayah ids in one query instead of one lookup per verse
+            ayah_ids = dict(Ayah.objects.filter(surah_id=surah_number).values_list('number_in_surah', 'id'))
             
             # Append Bangla Translation ayahs
             for i in range(len(bn_data['verses'])):
                 verse_number = bn_data['verses'][i]['id']
-                ayah = get_object_or_404(Ayah, surah=surah, number_in_surah=verse_number)
-                ayah.translation_bn = bn_data['verses'][i]['translation']
-                updated_ayahs.append(ayah)
+                ayah_id = ayah_ids.get(verse_number)
+                if ayah_id is None:
+                    raise Ayah.DoesNotExist(f"Ayah {positions.verse_key(surah_number, verse_number)} not found")
+                rows.append(Translation(
+                    ayah_id=ayah_id, language='bn', edition=translations.default_edition('bn'),
+                    text=bn_data['verses'][i]['translation'],
+                ))
 
-            Ayah.objects.bulk_update(updated_ayahs, ['translation_bn'])                
+            Translation.objects.bulk_create(
+                rows, update_conflicts=True,
+                unique_fields=['language', 'edition', 'ayah'], update_fields=['text'],
+            )
             
             self.stdout.write(self.style.SUCCESS(f"✅ Created {len(bn_data['verses'])} verses for Surah {surah_number}"))
             
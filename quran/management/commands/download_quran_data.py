@@ -1,14 +1,16 @@
 import requests
 import json
 import time
-from django.core.management.base import BaseCommand
 from django.db import transaction
 from tqdm import tqdm
-from quran.models import Surah, Ayah, Recitation, WordMeaning
+from quran.models import Surah, Ayah, Recitation, Translation, WordMeaning
+from quran import positions, translations
+from quran.transliteration import transliterate, transliterate_texts, transliterate_words
+from quran.replica import IngestCommand
 import arabic_reshaper
 from bidi.algorithm import get_display
 
-class Command(BaseCommand):
+class Command(IngestCommand):
     help = 'Download complete Quran data from open-source APIs'
     
     def handle(self, *args, **options):
@@ -59,7 +61,7 @@ class Command(BaseCommand):
                     name_translation=surah_data['englishNameTranslation'],
                     revelation_type=surah_data['revelationType'].lower(),
                     total_verses=surah_data['numberOfAyahs'],
-                    audio_url=f"https://everyayah.com/data/Alafasy_128kbps/{str(surah_data['number']).zfill(3)}001.mp3"
+                    audio_url=f"https://everyayah.com/data/Alafasy_128kbps/{positions.audio_file_key(surah_data['number'], 1)}.mp3"
                 )
             
             self.stdout.write(self.style.SUCCESS(f"✅ Created {len(surahs)} Surahs"))
@@ -92,7 +94,7 @@ class Command(BaseCommand):
                 name_translation=translation,
                 revelation_type=revelation,
                 total_verses=verses,
-                audio_url=f"https://everyayah.com/data/Alafasy_128kbps/{str(number).zfill(3)}001.mp3"
+                audio_url=f"https://everyayah.com/data/Alafasy_128kbps/{positions.audio_file_key(number, 1)}.mp3"
             )
         
         self.stdout.write(self.style.WARNING(f"Created {len(surahs_data)} basic surahs"))
@@ -101,8 +103,13 @@ class Command(BaseCommand):
         """Download verses for first 10 surahs (for testing)"""
         self.stdout.write("Downloading verses...")
         
-        # We'll download first 3 surahs to test
+        # Ayahs reference surahs by number, so check once which ones exist
+        surah_numbers = set(Surah.objects.values_list('number', flat=True))
+        
         for surah_num in range(1, 115):
+            if surah_num not in surah_numbers:
+                self.stdout.write(self.style.WARNING(f"Surah {surah_num} not found, skipping..."))
+                continue
             try:
                 self.stdout.write(f"Downloading verses for Surah {surah_num}...")
                 self.download_surah_verses(surah_num)
@@ -126,30 +133,31 @@ class Command(BaseCommand):
             response_en.raise_for_status()
             english_data = response_en.json()
             
-            surah = Surah.objects.get(number=surah_number)
+            # Transliterate the whole surah in one pass
+            transliterations = transliterate_texts(
+                ayah['text'] for ayah in arabic_data['data']['ayahs']
+            )
             
-            # Create ayahs
+            # Create ayahs; page/juz/hizb come from the position tables, and the
+            # surah primary key is its number so no Surah lookup is needed
+            ayahs = []
+            english = []
             for i in range(len(arabic_data['data']['ayahs'])):
                 arabic_ayah = arabic_data['data']['ayahs'][i]
                 english_ayah = english_data['data']['ayahs'][i]
+                verse = positions.position(surah_number, arabic_ayah['numberInSurah'])
                 
-                # Calculate page, juz, hizb (simplified)
-                page_number = arabic_ayah.get('page', self.calculate_page(surah_number, arabic_ayah['numberInSurah']))
-                juz_number = arabic_ayah.get('juz', self.calculate_juz(surah_number, arabic_ayah['numberInSurah']))
-                hizb_number = arabic_ayah.get('hizbQuarter', self.calculate_hizb(surah_number, arabic_ayah['numberInSurah']))
-                
-                Ayah.objects.create(
-                    surah=surah,
-                    number=arabic_ayah['number'],
-                    number_in_surah=arabic_ayah['numberInSurah'],
+                ayahs.append(Ayah(
+                    surah_id=surah_number,
                     text_uthmani=arabic_ayah['text'],
                     text_simple=arabic_ayah['text'],  # Same for now
-                    translation_en=english_ayah.get('text', ''),
-                    page_number=page_number,
-                    juz_number=juz_number,
-                    hizb_number=hizb_number,
-                    audio_url=f"https://everyayah.com/data/Alafasy_128kbps/{str(surah_number).zfill(3)}{str(arabic_ayah['numberInSurah']).zfill(3)}.mp3"
-                )
+                    transliteration=transliterations[i],
+                    audio_url=f"https://everyayah.com/data/Alafasy_128kbps/{positions.audio_file_key(verse.surah, verse.ayah)}.mp3",
+                    **verse.ayah_fields()
+                ))
+                english.append(english_ayah.get('text', ''))
+            Ayah.objects.bulk_create(ayahs)
+            self.create_translations(ayahs, english, 'en', 'asad')
             
             self.stdout.write(self.style.SUCCESS(f"✅ Created {len(arabic_data['data']['ayahs'])} verses for Surah {surah_number}"))
             
@@ -160,41 +168,46 @@ class Command(BaseCommand):
     
     def create_sample_verses(self, surah_number):
         """Create sample verses if API fails"""
-        surah = Surah.objects.get(number=surah_number)
-        
         # Sample verses for Al-Fatihah
         if surah_number == 1:
             verses = [
-                (1, "بِسْمِ ٱللَّهِ ٱلرَّحْمَٰنِ ٱلرَّحِيمِ", "In the name of Allah, the Entirely Merciful, the Especially Merciful.", 1, 1, 1),
-                (2, "ٱلْحَمْدُ لِلَّهِ رَبِّ ٱلْعَٰلَمِينَ", "[All] praise is [due] to Allah, Lord of the worlds -", 1, 1, 1),
-                (3, "ٱلرَّحْمَٰنِ ٱلرَّحِيمِ", "The Entirely Merciful, the Especially Merciful,", 1, 1, 1),
-                (4, "مَٰلِكِ يَوْمِ ٱلدِّينِ", "Sovereign of the Day of Recompense.", 1, 1, 1),
-                (5, "إِيَّاكَ نَعْبُدُ وَإِيَّاكَ نَسْتَعِينُ", "It is You we worship and You we ask for help.", 1, 1, 1),
-                (6, "ٱهْدِنَا ٱلصِّرَٰطَ ٱلْمُسْتَقِيمَ", "Guide us to the straight path -", 1, 1, 1),
-                (7, "صِرَٰطَ ٱلَّذِينَ أَنْعَمْتَ عَلَيْهِمْ غَيْرِ ٱلْمَغْضُوبِ عَلَيْهِمْ وَلَا ٱلضَّآلِّينَ", "The path of those upon whom You have bestowed favor, not of those who have evoked [Your] anger or of those who are astray.", 1, 1, 1),
+                (1, "بِسْمِ ٱللَّهِ ٱلرَّحْمَٰنِ ٱلرَّحِيمِ", "In the name of Allah, the Entirely Merciful, the Especially Merciful."),
+                (2, "ٱلْحَمْدُ لِلَّهِ رَبِّ ٱلْعَٰلَمِينَ", "[All] praise is [due] to Allah, Lord of the worlds -"),
+                (3, "ٱلرَّحْمَٰنِ ٱلرَّحِيمِ", "The Entirely Merciful, the Especially Merciful,"),
+                (4, "مَٰلِكِ يَوْمِ ٱلدِّينِ", "Sovereign of the Day of Recompense."),
+                (5, "إِيَّاكَ نَعْبُدُ وَإِيَّاكَ نَسْتَعِينُ", "It is You we worship and You we ask for help."),
+                (6, "ٱهْدِنَا ٱلصِّرَٰطَ ٱلْمُسْتَقِيمَ", "Guide us to the straight path -"),
+                (7, "صِرَٰطَ ٱلَّذِينَ أَنْعَمْتَ عَلَيْهِمْ غَيْرِ ٱلْمَغْضُوبِ عَلَيْهِمْ وَلَا ٱلضَّآلِّينَ", "The path of those upon whom You have bestowed favor, not of those who have evoked [Your] anger or of those who are astray."),
             ]
         else:
             # Create at least one sample verse for other surahs
             verses = [
-                (1, f"Sample verse for Surah {surah_number}", f"Sample translation for Surah {surah_number}", 1, 1, 1),
+                (1, f"Sample verse for Surah {surah_number}", f"Sample translation for Surah {surah_number}"),
             ]
         
-        for number_in_surah, arabic, translation, page, juz, hizb in verses:
-            Ayah.objects.create(
-                surah=surah,
-                number=number_in_surah,
-                number_in_surah=number_in_surah,
+        ayahs = []
+        for number_in_surah, arabic, translation in verses:
+            verse = positions.position(surah_number, number_in_surah)
+            ayahs.append(Ayah(
+                surah_id=surah_number,
                 text_uthmani=arabic,
                 text_simple=arabic,
-                translation_en=translation,
-                page_number=page,
-                juz_number=juz,
-                hizb_number=hizb,
-                audio_url=f"https://everyayah.com/data/Alafasy_128kbps/{str(surah_number).zfill(3)}{str(number_in_surah).zfill(3)}.mp3"
-            )
+                audio_url=f"https://everyayah.com/data/Alafasy_128kbps/{positions.audio_file_key(surah_number, number_in_surah)}.mp3",
+                **verse.ayah_fields()
+            ))
+        Ayah.objects.bulk_create(ayahs)
+        self.create_translations(ayahs, [translation for _, _, translation in verses],
+                                 'en', translations.default_edition('en'))
         
         self.stdout.write(self.style.WARNING(f"Created {len(verses)} sample verses for Surah {surah_number}"))
     
+    def create_translations(self, ayahs, texts, language, edition):
+        """Store one edition's text for freshly created ayahs"""
+        Translation.objects.bulk_create(
+            Translation(ayah=ayah, language=language, edition=edition, text=text)
+            for ayah, text in zip(ayahs, texts) if text
+        )
+    
     def download_recitations(self):
         """Create recitation entries"""
         self.stdout.write("Creating recitations...")
@@ -280,16 +293,15 @@ class Command(BaseCommand):
     def parse_wbw_data(self, surah_number, wbw_data):
         """Parse Quran Word-by-Word API data"""
         
-        surah = Surah.objects.get(number=surah_number)
+        ayahs = self.surah_ayahs(surah_number)
         
         for ayah_data in wbw_data.get('ayahs', []):
             ayah_number = ayah_data.get('ayah_number')
             
             try:
-                ayah = Ayah.objects.get(
-                    surah=surah,
-                    number_in_surah=ayah_number
-                )
+                ayah = ayahs.get(ayah_number)
+                if ayah is None:
+                    continue
                 
                 words = ayah_data.get('words', [])
                 
@@ -322,8 +334,6 @@ class Command(BaseCommand):
                 
                 self.stdout.write(f"  Processed {len(words)} words for Ayah {ayah_number}")
                 
-            except Ayah.DoesNotExist:
-                continue
             except Exception as e:
                 self.stdout.write(f"  Error processing ayah {ayah_number}: {e}")
 
@@ -341,16 +351,13 @@ class Command(BaseCommand):
             data = response.json()
             verses = data.get('verses', [])
             
-            surah = Surah.objects.get(number=surah_number)
+            ayahs = self.surah_ayahs(surah_number)
             
             for verse_data in verses:
                 ayah_number = verse_data.get('verse_number')
                 
                 try:
-                    ayah = Ayah.objects.get(
-                        surah=surah,
-                        number_in_surah=ayah_number
-                    )
+                    ayah = ayahs[ayah_number]
                     
                     words = verse_data.get('words', [])
                     
@@ -383,26 +390,29 @@ class Command(BaseCommand):
                             }
                         )
                     
-                except Ayah.DoesNotExist:
+                except KeyError:
                     continue
                     
         except Exception as e:
             self.stdout.write(f"Tanzil API failed for surah {surah_number}: {e}")
 
+    def surah_ayahs(self, surah_number):
+        """Load every ayah of a surah in one query, keyed by number in surah"""
+        return {ayah.number_in_surah: ayah for ayah in Ayah.objects.filter(surah_id=surah_number)}
+
     def process_alternative_word_data(self, surah_number):
         """Process word data from alternative sources"""
         
         # Alternative: Use local database or fallback to calculated data
-        surah = Surah.objects.get(number=surah_number)
-        ayahs = Ayah.objects.filter(surah=surah)
+        ayahs = Ayah.objects.filter(surah_id=surah_number)
         
         for ayah in ayahs:
             # Split Arabic text into words
             arabic_words = self.split_arabic_text(ayah.text_uthmani)
+            transliterations = transliterate_words(arabic_words)
             
             for word_index, arabic_word in enumerate(arabic_words):
-                # Generate transliteration (basic)
-                transliteration = self.generate_transliteration(arabic_word)
+                transliteration = transliterations[word_index]
                 
                 # Get meaning from dictionary (simplified)
                 meaning = self.get_word_meaning(arabic_word)
@@ -581,30 +591,7 @@ class Command(BaseCommand):
 
     def generate_transliteration(self, arabic_word):
         """Generate basic transliteration for Arabic word"""
-        # Very basic transliteration mapping
-        # In a real application, you would use a proper Arabic transliteration library
-        translit_map = {
-            'ا': 'a', 'ب': 'b', 'ت': 't', 'ث': 'th', 'ج': 'j',
-            'ح': 'h', 'خ': 'kh', 'د': 'd', 'ذ': 'dh', 'ر': 'r',
-            'ز': 'z', 'س': 's', 'ش': 'sh', 'ص': 's', 'ض': 'd',
-            'ط': 't', 'ظ': 'dh', 'ع': 'a', 'غ': 'gh', 'ف': 'f',
-            'ق': 'q', 'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n',
-            'ه': 'h', 'و': 'w', 'ي': 'y', 'ء': "'",
-            'آ': 'aa', 'أ': 'a', 'إ': 'i', 'ؤ': "'u", 'ئ': "'i",
-            'ة': 'h', 'ى': 'a', 'لا': 'la'
-        }
-        
-        # Simple transliteration
-        translit = ''
-        for char in arabic_word:
-            if char in translit_map:
-                translit += translit_map[char]
-            elif char in 'ًٌٍََُِّْ':  # Arabic diacritics
-                continue  # Skip diacritics for basic transliteration
-            else:
-                translit += char
-        
-        return translit
+        return transliterate(arabic_word)
 
     def get_word_meaning(self, arabic_word):
         """Get basic meaning for common Arabic words"""
@@ -722,28 +709,3 @@ class Command(BaseCommand):
                 
             except Exception as e:
                 self.stdout.write(self.style.WARNING(f"Could not create word meanings: {e}"))
-    
-    def calculate_page(self, surah, ayah):
-        """Simplified page calculation"""
-        # This is a simplified version - in production, use actual page data
-        if surah == 1:
-            return 1
-        elif surah == 2 and ayah <= 141:
-            return 2
-        else:
-            return max(1, (surah - 1) // 2 + 1)
-    
-    def calculate_juz(self, surah, ayah):
-        """Simplified juz calculation"""
-        if surah == 1:
-            return 1
-        elif surah == 2 and ayah <= 141:
-            return 1
-        elif surah == 2 and ayah <= 252:
-            return 2
-        else:
-            return min(30, (surah - 1) // 4 + 1)
-    
-    def calculate_hizb(self, surah, ayah):
-        """Simplified hizb calculation"""
-        return max(1, self.calculate_juz(surah, ayah) * 2 - 1)
\ No newline at end of file
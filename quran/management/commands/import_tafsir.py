@@ -0,0 +1,139 @@
+import gzip
+import os
+import time
+import xml.etree.ElementTree as ET
+
+from django.core.management.base import CommandError
+from django.db import transaction
+from quran.models import Ayah, Tafsir
+from quran import positions, rawjson
+from quran.replica import IngestCommand
+
+SOURCES = [value for value, _ in Tafsir._meta.get_field('source').choices]
+
+
+class Command(IngestCommand):
+    help = 'Stream a local tafsir file (JSON lines or XML, optionally gzipped) into Tafsir'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path',
+                            help='JSON lines of {"verse_key": "2:255", "text": ...} (or "surah"/"ayah"), '
+                                 'or XML of <sura index=".."><aya index=".." text=".."/></sura>')
+        parser.add_argument('--source', required=True, choices=SOURCES)
+        parser.add_argument('--language', default='en')
+        parser.add_argument('--format', choices=['jsonl', 'xml'],
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--report-every', type=int, default=10000,
+                            help='Print throughput every N entries')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        name = path[:-3] if path.endswith('.gz') else path
+        fmt = options['format'] or ('xml' if name.endswith('.xml') else 'jsonl')
+
+        # Verse key -> ayah id, loaded once instead of a lookup per entry
+        ayah_ids = dict(Ayah.objects.values_list('number', 'id'))
+        if not ayah_ids:
+            raise CommandError('No verses found. Run download_quran_data first.')
+
+        self.source = options['source']
+        self.language = options['language']
+        self.total_bytes = os.path.getsize(path)
+        self.started = time.perf_counter()
+
+        with open(path, 'rb') as raw:
+            stream = gzip.open(raw) if path.endswith('.gz') else raw
+            entries = self.xml_entries(stream) if fmt == 'xml' else self.jsonl_entries(stream)
+
+            # Keyed by ayah so a repeated verse in one batch is upserted once
+            batch = {}
+            imported = skipped = 0
+            next_report = options['report_every']
+            for number, text in entries:
+                ayah_id = ayah_ids.get(number)
+                if ayah_id is None or not text:
+                    skipped += 1
+                    continue
+                batch[ayah_id] = text
+                if len(batch) >= options['batch_size']:
+                    imported += self.write(batch)
+                    batch = {}
+                    if imported >= next_report:
+                        self.report(imported, raw)
+                        next_report += options['report_every']
+            imported += self.write(batch)
+
+        self.rows_written = imported
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {imported} {self.source} ({self.language}) entries in {elapsed:.1f}s "
+            f"({imported / max(elapsed, 1e-9):.0f} entries/s, "
+            f"{self.total_bytes / max(elapsed, 1e-9) / 1e6:.1f} MB/s)"
+        ))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"⚠️ Skipped {skipped} entries without text or not in the database"))
+
+    def write(self, batch):
+        """Upsert one batch of ``{ayah_id: text}``"""
+        if not batch:
+            return 0
+        rows = [
+            Tafsir(ayah_id=ayah_id, source=self.source, language=self.language, text=text)
+            for ayah_id, text in batch.items()
+        ]
+        with transaction.atomic():
+            Tafsir.objects.bulk_create(
+                rows, update_conflicts=True,
+                unique_fields=['ayah', 'source', 'language'], update_fields=['text'],
+            )
+        return len(rows)
+
+    def report(self, imported, raw):
+        elapsed = time.perf_counter() - self.started
+        read = raw.tell()
+        self.stdout.write(
+            f"📖 {imported} entries, {read / 1e6:.1f}/{self.total_bytes / 1e6:.1f} MB read, "
+            f"{imported / max(elapsed, 1e-9):.0f} entries/s"
+        )
+
+    def verse_number(self, surah, ayah):
+        try:
+            return positions.global_number(int(surah), int(ayah))
+        except (TypeError, ValueError):
+            return None
+
+    def jsonl_entries(self, stream):
+        """Yield ``(global ayah number, text)`` per JSON line"""
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = rawjson.loads(line)
+            except ValueError:
+                raise CommandError(f"Line {line_number}: invalid JSON")
+            if not isinstance(entry, dict):
+                # Valid JSON but not an entry; skipped like rows without a verse
+                yield None, None
+                continue
+            if 'verse_key' in entry:
+                surah, _, ayah = str(entry['verse_key']).partition(':')
+            else:
+                surah, ayah = entry.get('surah'), entry.get('ayah')
+            yield self.verse_number(surah, ayah), entry.get('text')
+
+    def xml_entries(self, stream):
+        """Yield ``(global ayah number, text)`` per <aya>, discarding parsed elements as it goes"""
+        surah = None
+        for event, elem in ET.iterparse(stream, events=('start', 'end')):
+            if elem.tag == 'sura':
+                if event == 'start':
+                    surah = elem.get('index')
+                else:
+                    elem.clear()
+            elif elem.tag == 'aya' and event == 'end':
+                text = elem.get('text')
+                if text is None:
+                    text = ''.join(elem.itertext()).strip()
+                yield self.verse_number(surah, elem.get('index')), text
+                elem.clear()
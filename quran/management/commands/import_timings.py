@@ -0,0 +1,77 @@
+import json
+from django.core.management.base import CommandError
+from django.db import transaction
+from quran.models import Ayah, AyahTiming, Recitation
+from quran import positions, rawjson, timings
+from quran.replica import IngestCommand
+
+class Command(IngestCommand):
+    help = 'Import per-word audio timings for a reciter into packed storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('reciter', type=int, help='Reciter id the timings belong to')
+        parser.add_argument('path', nargs='?',
+                            help='JSON file: {"1:1": [[word, start_ms, end_ms], ...]} '
+                                 'or a list/"audio_files" of {"verse_key", "segments"}')
+        parser.add_argument('--from-ayahs', action='store_true',
+                            help='Convert the legacy Ayah.audio_segments column instead of a file')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            recitation = Recitation.objects.get(reciter_id=options['reciter'])
+        except Recitation.DoesNotExist:
+            raise CommandError(f"Recitation {options['reciter']} not found")
+
+        if options['from_ayahs']:
+            entries = self.legacy_entries()
+        elif options['path']:
+            entries = self.file_entries(options['path'])
+        else:
+            raise CommandError('Give a JSON file or --from-ayahs')
+
+        ayah_ids = {
+            (surah, number): ayah_id
+            for surah, number, ayah_id in Ayah.objects.values_list('surah_id', 'number_in_surah', 'id')
+        }
+
+        rows = []
+        skipped = 0
+        for (surah, number), segments in entries:
+            ayah_id = ayah_ids.get((surah, number))
+            if ayah_id is None or not segments:
+                skipped += 1
+                continue
+            rows.append(AyahTiming(recitation=recitation, ayah_id=ayah_id,
+                                   segments=timings.from_positions(segments)))
+
+        with transaction.atomic():
+            AyahTiming.objects.bulk_create(
+                rows, batch_size=options['batch_size'],
+                update_conflicts=True, unique_fields=['recitation', 'ayah'], update_fields=['segments'],
+            )
+        self.rows_written = len(rows)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Imported timings for {len(rows)} ayahs ({recitation.name})"))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"⚠️ Skipped {skipped} ayahs without data or not in the database"))
+
+    def file_entries(self, path):
+        """Yield ``((surah, ayah), segments)`` from a JSON export"""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict) and 'audio_files' in data:
+            data = data['audio_files']
+        items = data.items() if isinstance(data, dict) else (
+            (item['verse_key'], item.get('segments') or []) for item in data
+        )
+        for verse_key, segments in items:
+            try:
+                yield positions.surah_ayah(positions.parse_verse_key(verse_key)), segments
+            except ValueError:
+                raise CommandError(f"Invalid verse key: {verse_key}")
+
+    def legacy_entries(self):
+        """Yield timings already stored on the Ayah rows"""
+        for surah, number, segments in Ayah.objects.values_list('surah_id', 'number_in_surah', 'audio_segments'):
+            yield (surah, number), rawjson.decode(segments)
@@ -0,0 +1,276 @@
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from itertools import accumulate
+
+import requests
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from quran import audio, positions
+from quran.models import Ayah, Recitation
+
+ACCOUNT_PREFIX = 'loadtest-'
+ACCOUNT_PASSWORD = 'loadtest-password'
+
+# Most read surahs first; the rest follow in mushaf order
+POPULAR_SURAHS = (1, 36, 18, 67, 55, 56, 2, 112, 114, 113, 12, 19, 32, 78, 73, 3, 97, 103, 108, 110)
+SURAH_ORDER = POPULAR_SURAHS + tuple(n for n in range(1, 115) if n not in POPULAR_SURAHS)
+# Zipf-like: the n-th most popular surah is read about 1/n as often as the first
+SURAH_WEIGHTS = list(accumulate(1 / rank for rank in range(1, len(SURAH_ORDER) + 1)))
+
+# Endpoint -> share of a reader's requests
+MIX = {
+    'surah-list': 8,
+    'surah-detail': 25,
+    'verse-page': 20,
+    'word-tap': 20,
+    'audio': 10,
+    'recitations': 5,
+    'bookmark': 10,
+    'login': 2,
+}
+ACCOUNT_ENDPOINTS = ('bookmark', 'login')
+
+# Verses on one page of the reader (CONFIG.VERSES_PER_PAGE in static/js/config.js)
+VERSES_PER_PAGE = 10
+
+
+class Reader:
+    """One simulated reader: a cookie session reading through a surah, as the reader page does"""
+
+    def __init__(self, base_url, rng, ayah_ids, reciter_ids, username=None):
+        self.base_url = base_url
+        self.rng = rng
+        self.ayah_ids = ayah_ids
+        self.reciter_ids = reciter_ids
+        self.username = username
+        self.session = requests.Session()
+        self.surah = self.popular_surah()
+        self.verse_page_number = 0
+
+    def get(self, path, **params):
+        return self.session.get(self.base_url + path, params=params, timeout=30)
+
+    def post(self, path, **kwargs):
+        headers = {'X-CSRFToken': self.session.cookies.get('csrftoken', ''), 'Referer': self.base_url + path}
+        return self.session.post(self.base_url + path, headers=headers, timeout=30, **kwargs)
+
+    def popular_surah(self):
+        return self.rng.choices(SURAH_ORDER, cum_weights=SURAH_WEIGHTS)[0]
+
+    def current_ayah(self):
+        """Global number of an ayah in the surah being read"""
+        return self.rng.randint(*positions.surah_range(self.surah))
+
+    def surah_list(self):
+        return self.get('/api/surahs/')
+
+    def surah_detail(self):
+        self.surah = self.popular_surah()
+        self.verse_page_number = 0
+        if self.username:
+            return self.get(f'/api/surahs/{self.surah}/', user_flags=1)
+        return self.get(f'/api/surahs/{self.surah}/')
+
+    def verse_page(self):
+        """Turning a page of the reader: the words of its verses, moving on to the next surah at the end"""
+        first, last = positions.surah_range(self.surah)
+        if self.verse_page_number * VERSES_PER_PAGE > last - first:
+            self.surah = self.surah % positions.TOTAL_SURAHS + 1
+            self.verse_page_number = 0
+            first, last = positions.surah_range(self.surah)
+        start = self.verse_page_number * VERSES_PER_PAGE + 1
+        self.verse_page_number += 1
+        end = min(start + VERSES_PER_PAGE - 1, last - first + 1)
+        return self.get('/api/words/', surah=self.surah, **{'from': start, 'to': end})
+
+    def word_tap(self):
+        return self.get('/api/words/', verse=positions.verse_key(*positions.surah_ayah(self.current_ayah())))
+
+    def audio(self):
+        ayah_id = self.ayah_ids[self.current_ayah() - 1]
+        return self.get(f'/api/verses/{ayah_id}/audio/', recitation=self.rng.choice(self.reciter_ids))
+
+    def recitations(self):
+        return self.get('/api/recitations/')
+
+    def bookmark(self):
+        ayah_id = self.ayah_ids[self.current_ayah() - 1]
+        if self.rng.random() < 0.25:
+            body = {'delete_matching': {'bookmark_type': 'study'}}
+        else:
+            bookmark_type = self.rng.choice(('default', 'favorite', 'memorized', 'study'))
+            body = {'upsert': [{'ayah': ayah_id, 'bookmark_type': bookmark_type}]}
+        return self.post('/api/bookmarks/bulk/', json=body)
+
+    def login(self):
+        self.session.get(self.base_url + '/login/', timeout=30)
+        response = self.post('/login/', data={
+            'username': self.username,
+            'password': ACCOUNT_PASSWORD,
+            'csrfmiddlewaretoken': self.session.cookies.get('csrftoken', ''),
+        }, allow_redirects=False)
+        # A successful login redirects; a failed one re-renders the form
+        if response.status_code != 302:
+            response.status_code = 401
+        return response
+
+
+class Stats:
+    """Latencies and errors per endpoint, shared by all reader threads"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.samples = defaultdict(dict)  # endpoint -> error -> count
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, elapsed, error=None):
+        with self._lock:
+            self.latencies[endpoint].append(elapsed)
+            if error is not None:
+                self.errors[endpoint] += 1
+                self.samples[endpoint][error] = self.samples[endpoint].get(error, 0) + 1
+
+
+def percentile(timings, fraction):
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+
+class Command(BaseCommand):
+    help = ('Replay a realistic mix of reader traffic against a running server and report '
+            'requests per second, p50/p95/p99 latency and errors per endpoint')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server to load (default: %(default)s)')
+        parser.add_argument('--readers', type=int, default=16, help='Concurrent simulated readers')
+        parser.add_argument('--seconds', type=float, default=30, help='Measured duration')
+        parser.add_argument('--warmup', type=float, default=5, help='Unmeasured seconds before the measurement')
+        parser.add_argument('--think', type=float, default=0,
+                            help="Mean pause in seconds between a reader's requests (default: none, maximum load)")
+        parser.add_argument('--anonymous', action='store_true',
+                            help='Skip logins and bookmark writes, e.g. when the server uses another database')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--label', default='', help='Name of this run in the report, e.g. "asgi redis"')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file, for comparing runs')
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/')
+        ayah_ids = list(Ayah.objects.order_by('number').values_list('id', flat=True))
+        if len(ayah_ids) != positions.TOTAL_AYAHS:
+            raise CommandError("The corpus is not loaded. Run download_quran_data first.")
+        # The audio endpoint looks reciters up by reciter_id
+        reciter_ids = list(Recitation.objects.values_list('reciter_id', flat=True)) or [audio.DEFAULT_RECITER_ID]
+        try:
+            requests.get(base_url + '/api/surahs/', timeout=10)
+        except requests.RequestException as e:
+            raise CommandError(f"Cannot reach {base_url}: {e}")
+
+        mix = {
+            endpoint: weight for endpoint, weight in MIX.items()
+            if not (options['anonymous'] and endpoint in ACCOUNT_ENDPOINTS)
+        }
+        usernames = [None] * options['readers'] if options['anonymous'] else self.accounts(options['readers'])
+
+        stats = Stats()
+        measuring = threading.Event()
+        stop = threading.Event()
+        endpoints, weights = list(mix), list(accumulate(mix.values()))
+
+        def run(index):
+            rng = random.Random(options['seed'] * 1000 + index)
+            reader = Reader(base_url, rng, ayah_ids, reciter_ids, usernames[index])
+            if reader.username:
+                self.request(reader, 'login', stats if measuring.is_set() else None)
+            while not stop.is_set():
+                endpoint = rng.choices(endpoints, cum_weights=weights)[0]
+                self.request(reader, endpoint, stats if measuring.is_set() else None)
+                if options['think']:
+                    time.sleep(rng.expovariate(1 / options['think']))
+
+        threads = [threading.Thread(target=run, args=(index,), daemon=True) for index in range(options['readers'])]
+        self.stdout.write(
+            f"🚦 {options['readers']} readers against {base_url}: "
+            f"{options['warmup']:.0f}s warm-up, {options['seconds']:.0f}s measured"
+        )
+        for thread in threads:
+            thread.start()
+        time.sleep(options['warmup'])
+        measuring.set()
+        started = time.perf_counter()
+        time.sleep(options['seconds'])
+        stop.set()
+        elapsed = time.perf_counter() - started
+        for thread in threads:
+            thread.join()
+
+        results = self.report(stats, elapsed)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({
+                    'label': options['label'],
+                    'url': base_url,
+                    'readers': options['readers'],
+                    'seconds': round(elapsed, 2),
+                    'think': options['think'],
+                    'endpoints': results,
+                }, f, indent=2)
+            self.stdout.write(f"💾 Results written to {options['json_path']}")
+
+    def accounts(self, count):
+        """Usernames of ``count`` reader accounts, created with a known password if missing"""
+        usernames = [f"{ACCOUNT_PREFIX}{index}" for index in range(count)]
+        existing = {user.username: user for user in User.objects.filter(username__in=usernames)}
+        for username in usernames:
+            user = existing.get(username) or User(username=username)
+            if user.pk is None or not user.check_password(ACCOUNT_PASSWORD):
+                user.set_password(ACCOUNT_PASSWORD)
+                user.save()
+        return usernames
+
+    def request(self, reader, endpoint, stats):
+        """Make one request for ``endpoint``; recorded in ``stats`` unless warming up"""
+        started = time.perf_counter()
+        error = None
+        try:
+            response = getattr(reader, endpoint.replace('-', '_'))()
+            response.content  # the body is part of the latency
+            if response.status_code >= 400:
+                error = f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            error = type(e).__name__
+        if stats is not None:
+            stats.record(endpoint, time.perf_counter() - started, error)
+
+    def report(self, stats, elapsed):
+        label = self.style.MIGRATE_HEADING
+        self.stdout.write(label(
+            f"\n{'endpoint':<14}{'requests':>9}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}"
+        ))
+        results = {}
+        rows = [(endpoint, stats.latencies[endpoint]) for endpoint in MIX if stats.latencies[endpoint]]
+        everything = sorted(t for _, timings in rows for t in timings)
+        rows.append(('all', everything))
+        for endpoint, timings in rows:
+            timings = sorted(timings)
+            errors = sum(stats.errors.values()) if endpoint == 'all' else stats.errors[endpoint]
+            results[endpoint] = {
+                'requests': len(timings),
+                'rps': round(len(timings) / elapsed, 1),
+                'p50_ms': round(percentile(timings, 0.50) * 1000, 1),
+                'p95_ms': round(percentile(timings, 0.95) * 1000, 1),
+                'p99_ms': round(percentile(timings, 0.99) * 1000, 1),
+                'error_rate': round(errors / len(timings), 4),
+            }
+            row = results[endpoint]
+            self.stdout.write(
+                f"{endpoint:<14}{row['requests']:>9}{row['rps']:>9.1f}{row['p50_ms']:>9.1f}"
+                f"{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['error_rate']:>9.1%}"
+            )
+
+        for endpoint, samples in stats.samples.items():
+            for error, count in sorted(samples.items(), key=lambda item: -item[1]):
+                self.stdout.write(self.style.WARNING(f"⚠️ {endpoint}: {error} x{count}"))
+        return results
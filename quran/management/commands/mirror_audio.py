@@ -0,0 +1,135 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from tqdm import tqdm
+from quran.models import AudioFile, Recitation
+from quran import audio, audio_store, positions
+
+class Command(BaseCommand):
+    help = 'Mirror recitation audio into the local content-addressed store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reciter', type=int, action='append',
+                            help='Reciter id to mirror (repeatable, default: all)')
+        parser.add_argument('--surah', type=int, action='append',
+                            help='Surah number to mirror (repeatable, default: all)')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Parallel downloads')
+        parser.add_argument('--timeout', type=int, default=30)
+        parser.add_argument('--retries', type=int, default=3)
+        parser.add_argument('--verify', action='store_true',
+                            help='Re-download files whose object is missing from disk')
+
+    def handle(self, *args, **options):
+        recitations = Recitation.objects.all()
+        if options['reciter']:
+            recitations = recitations.filter(reciter_id__in=options['reciter'])
+        recitations = list(recitations)
+        if not recitations:
+            raise CommandError('No matching recitations')
+
+        surahs = options['surah'] or range(1, positions.TOTAL_SURAHS + 1)
+        for surah in surahs:
+            if not 1 <= surah <= positions.TOTAL_SURAHS:
+                raise CommandError(f'Invalid surah number: {surah}')
+
+        self.timeout = options['timeout']
+        self.retries = options['retries']
+        self.local = threading.local()
+
+        for recitation in recitations:
+            self.mirror_recitation(recitation, surahs, options['workers'], options['verify'])
+
+        self.stdout.write(self.style.SUCCESS("✅ Audio mirror up to date"))
+
+    def session(self):
+        """One HTTP session (connection pool) per worker thread"""
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        return session
+
+    def mirror_recitation(self, recitation, surahs, workers, verify):
+        """Download every missing ayah file for one reciter"""
+        done = {
+            (surah, ayah): sha256
+            for surah, ayah, sha256 in AudioFile.objects.filter(
+                recitation=recitation, surah_number__in=surahs
+            ).values_list('surah_number', 'ayah_number', 'sha256')
+        }
+        if verify:
+            done = {key: sha256 for key, sha256 in done.items()
+                    if audio_store.object_path(sha256).exists()}
+
+        todo = [
+            (surah, ayah)
+            for surah in surahs
+            for ayah in range(1, positions.SURAH_AYAH_COUNTS[surah - 1] + 1)
+            if (surah, ayah) not in done
+        ]
+        self.stdout.write(f"🎵 {recitation.name}: {len(done)} mirrored, {len(todo)} to download")
+        if not todo:
+            return
+
+        failed = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.fetch, recitation, surah, ayah): (surah, ayah)
+                for surah, ayah in todo
+            }
+            for future in tqdm(as_completed(futures), total=len(futures), desc=recitation.name):
+                surah, ayah = futures[future]
+                try:
+                    url, sha256, size, content_type = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f"⚠️ {positions.verse_key(surah, ayah)}: {e}"))
+                    continue
+                # Database writes stay on the main thread
+                AudioFile.objects.update_or_create(
+                    recitation=recitation, surah_number=surah, ayah_number=ayah,
+                    defaults={'sha256': sha256, 'size': size,
+                              'content_type': content_type, 'source_url': url},
+                )
+
+        if failed:
+            self.stdout.write(self.style.WARNING(f"⚠️ {failed} files failed, re-run to resume"))
+
+    def fetch(self, recitation, surah, ayah):
+        """Download one file, resuming a partial download when possible"""
+        url = audio.format_audio_url(recitation.audio_url_template, surah, ayah)
+        partial = audio_store.partial_path(recitation.reciter_id, surah, ayah)
+        partial.parent.mkdir(parents=True, exist_ok=True)
+
+        for attempt in range(self.retries):
+            try:
+                content_type = self.download(url, partial)
+                break
+            except requests.RequestException:
+                if attempt == self.retries - 1:
+                    raise
+
+        sha256 = audio_store.hash_file(partial).hexdigest()
+        size = os.path.getsize(partial)
+        audio_store.commit_partial(partial, sha256)
+        return url, sha256, size, content_type
+
+    def download(self, url, partial):
+        """Stream ``url`` into ``partial``, appending to what is already there"""
+        offset = partial.stat().st_size if partial.exists() else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+        with self.session().get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 416:
+                # Already complete on a previous run
+                return 'audio/mpeg'
+            response.raise_for_status()
+            # A plain 200 means the server ignored the Range header
+            mode = 'ab' if response.status_code == 206 else 'wb'
+            with open(partial, mode) as f:
+                for chunk in response.iter_content(audio_store.CHUNK_SIZE):
+                    f.write(chunk)
+            return response.headers.get('Content-Type', 'audio/mpeg').split(';')[0]
@@ -1,11 +1,12 @@
 import requests
 import json
-from django.core.management.base import BaseCommand
-from quran.models import Surah, Ayah, Tafsir, Recitation, WordMeaning
+from quran.models import Surah, Ayah, Tafsir, Recitation, Translation, WordMeaning
+from quran import positions
+from quran.replica import IngestCommand
 from tqdm import tqdm
 import time
 
-class Command(BaseCommand):
+class Command(IngestCommand):
     help = 'Populate Quran data from open-source APIs'
     
     def handle(self, *args, **options):
@@ -23,8 +24,7 @@ class Command(BaseCommand):
         # Populate other data
         self.populate_recitations()
         
-        # Tafsir can be added later as it's optional
-        # self.populate_tafsir()
+        # Tafsir is optional; load it from a local file with import_tafsir
         
         self.stdout.write(self.style.SUCCESS("Successfully populated Quran data!"))
     
@@ -94,7 +94,7 @@ class Command(BaseCommand):
                     "name_translation": f"Surah {i}",
                     "revelation_type": "meccan" if i <= 86 else "medinan",  # Approximate
                     "total_verses": self.get_surah_verse_count(i),
-                    "audio_url": f"https://everyayah.com/data/Alafasy_128kbps/{str(i).zfill(3)}001.mp3"
+                    "audio_url": f"https://everyayah.com/data/Alafasy_128kbps/{positions.audio_file_key(i, 1)}.mp3"
                 }
             )
             if created:
@@ -104,21 +104,9 @@ class Command(BaseCommand):
     
     def get_surah_verse_count(self, surah_number):
         """Get verse count for each surah"""
-        verse_counts = {
-            1: 7, 2: 286, 3: 200, 4: 176, 5: 120, 6: 165, 7: 206, 8: 75, 9: 129, 10: 109,
-            11: 123, 12: 111, 13: 43, 14: 52, 15: 99, 16: 128, 17: 111, 18: 110, 19: 98, 20: 135,
-            21: 112, 22: 78, 23: 118, 24: 64, 25: 77, 26: 227, 27: 93, 28: 88, 29: 69, 30: 60,
-            31: 34, 32: 30, 33: 73, 34: 54, 35: 45, 36: 83, 37: 182, 38: 88, 39: 75, 40: 85,
-            41: 54, 42: 53, 43: 89, 44: 59, 45: 37, 46: 35, 47: 38, 48: 29, 49: 18, 50: 45,
-            51: 60, 52: 49, 53: 62, 54: 55, 55: 78, 56: 96, 57: 29, 58: 22, 59: 24, 60: 13,
-            61: 14, 62: 11, 63: 11, 64: 18, 65: 12, 66: 12, 67: 30, 68: 52, 69: 52, 70: 44,
-            71: 28, 72: 28, 73: 20, 74: 56, 75: 40, 76: 31, 77: 50, 78: 40, 79: 46, 80: 42,
-            81: 29, 82: 19, 83: 36, 84: 25, 85: 22, 86: 17, 87: 19, 88: 26, 89: 30, 90: 20,
-            91: 15, 92: 21, 93: 11, 94: 8, 95: 8, 96: 19, 97: 5, 98: 8, 99: 8, 100: 11,
-            101: 11, 102: 8, 103: 3, 104: 9, 105: 5, 106: 4, 107: 7, 108: 3, 109: 6, 110: 3,
-            111: 5, 112: 4, 113: 5, 114: 6
-        }
-        return verse_counts.get(surah_number, 0)
+        if 1 <= surah_number <= positions.TOTAL_SURAHS:
+            return positions.SURAH_AYAH_COUNTS[surah_number - 1]
+        return 0
     
     def populate_verses(self):
         """Populate Ayah data from API"""
@@ -126,11 +114,14 @@ class Command(BaseCommand):
         
         base_url = "https://api.alquran.cloud/v1"
         
+        # Ayahs reference surahs by number, so check once which ones exist
+        surah_numbers = set(Surah.objects.values_list('number', flat=True))
+        
         # First, let's test with just one surah to debug
         for surah_num in range(6, 115):  # Just first 5 surahs for testing
             try:
                 # Check if surah exists
-                if not Surah.objects.filter(number=surah_num).exists():
+                if surah_num not in surah_numbers:
                     self.stdout.write(self.style.WARNING(f"Surah {surah_num} not found, skipping..."))
                     continue
                 
@@ -139,29 +130,30 @@ class Command(BaseCommand):
                 if response.status_code == 200:
                     data = response.json()['data']
                     
-                    # Get the surah object
-                    surah = Surah.objects.get(number=surah_num)
+                    # Ayahs already stored for this surah, in one query
+                    existing = set(Ayah.objects.filter(surah_id=surah_num)
+                                   .values_list('number_in_surah', flat=True))
                     
-                    # Fetch each verse
-                    verses_created = 0
+                    # Create missing ayahs; positions come from the position tables
+                    new_ayahs = []
+                    english = []
                     for verse in data['ayahs']:
-                        # Create or update ayah
-                        ayah, created = Ayah.objects.get_or_create(
-                            surah=surah,
-                            number_in_surah=verse['numberInSurah'],
-                            defaults={
-                                'number': verse['number'],
-                                'text_uthmani': verse['text'],
-                                'translation_en': verse.get('translation', ''),
-                                'page_number': verse.get('page', 0),
-                                'juz_number': verse.get('juz', 0),
-                                'hizb_number': verse.get('hizbQuarter', 0),
-                                'audio_url': f"https://everyayah.com/data/Alafasy_128kbps/{str(surah_num).zfill(3)}{str(verse['numberInSurah']).zfill(3)}.mp3"
-                            }
-                        )
-                        
-                        if created:
-                            verses_created += 1
+                        if verse['numberInSurah'] in existing:
+                            continue
+                        position = positions.position(surah_num, verse['numberInSurah'])
+                        new_ayahs.append(Ayah(
+                            surah_id=surah_num,
+                            text_uthmani=verse['text'],
+                            audio_url=f"https://everyayah.com/data/Alafasy_128kbps/{positions.audio_file_key(surah_num, verse['numberInSurah'])}.mp3",
+                            **position.ayah_fields()
+                        ))
+                        english.append(verse.get('translation', ''))
+                    Ayah.objects.bulk_create(new_ayahs)
+                    Translation.objects.bulk_create(
+                        Translation(ayah=ayah, language='en', edition='asad', text=text)
+                        for ayah, text in zip(new_ayahs, english) if text
+                    )
+                    verses_created = len(new_ayahs)
                     
                     self.stdout.write(f"Created {verses_created} verses for Surah {surah_num}")
                     
@@ -0,0 +1,67 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from quran import caching, translations, warmup
+
+
+class Command(BaseCommand):
+    help = 'Build every surah, page and juz payload, the reciter list and the Bismillah into the shared cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', action='append', choices=warmup.KINDS,
+                            help='Only warm these payloads (repeatable; default: all)')
+        parser.add_argument('--translations', action='append',
+                            help='Translation editions to warm, as in ?translations= (repeatable; '
+                                 'default: the default editions)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--verbose-items', action='store_true', help='Print time and size of every item')
+
+    def handle(self, *args, **options):
+        try:
+            edition_sets = [translations.parse_translations(value) for value in options['translations'] or [None]]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        workers = max(1, options['workers'])
+        if not caching.is_shared(caching.get_cache()):
+            self.stdout.write(self.style.WARNING(
+                "⚠️ The cache is per process (locmem): this only checks the builds. "
+                "Use QURAN_CACHE=file or redis, or QURAN_WARM_CACHE_ON_START=1."
+            ))
+            workers = 1
+
+        jobs = [(item, editions) for editions in edition_sets for item in warmup.items(options['kind'] or warmup.KINDS)]
+        started = time.perf_counter()
+        totals = {}
+        if workers == 1:
+            results = (warmup.warm(item, editions) for item, editions in jobs)
+            self.report(results, totals, options['verbose_items'])
+        else:
+            # Forked workers would otherwise inherit this process's connections
+            connections.close_all()
+            with ProcessPoolExecutor(workers, initializer=warmup.init_worker) as pool:
+                results = pool.map(warmup.warm, *zip(*jobs), chunksize=8)
+                self.report(results, totals, options['verbose_items'])
+
+        elapsed = time.perf_counter() - started
+        for kind, (count, seconds, size) in totals.items():
+            self.stdout.write(
+                f"📦 {kind}: {count} items, {size / 1e6:.1f} MB, "
+                f"{seconds / count * 1000:.1f} ms/item avg"
+            )
+        count = sum(count for count, _, _ in totals.values())
+        size = sum(size for _, _, size in totals.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Warmed {count} payloads ({size / 1e6:.1f} MB) in {elapsed:.1f}s with {workers} worker(s)"
+        ))
+
+    def report(self, results, totals, verbose):
+        for (kind, number), seconds, size in results:
+            count, total_seconds, total_size = totals.get(kind, (0, 0, 0))
+            totals[kind] = (count + 1, total_seconds + seconds, total_size + size)
+            if verbose:
+                label = kind if number is None else f"{kind} {number}"
+                self.stdout.write(f"  {label}: {seconds * 1000:.1f} ms, {size / 1024:.1f} KiB")
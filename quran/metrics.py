@@ -0,0 +1,342 @@
+"""
+Aggregate metrics in the Prometheus text format.
+
+Off unless ``QURAN_METRICS`` is set. Each process keeps its counters and
+histograms in memory and writes a snapshot to ``QURAN_METRICS_DIR`` every
+``QURAN_METRICS_FLUSH_INTERVAL`` seconds and at exit, one file per
+process. The ``/metrics`` endpoint adds up this process's live numbers
+and every other process's file, so any worker can answer a scrape for all
+of them (ingest commands included) without a collector.
+
+A file not rewritten for ``RETIRE_AFTER`` flush intervals belongs to a
+process that has exited. A scrape folds such files into one ``retired``
+file, so totals never go backwards and a scrape reads one file per live
+process plus one.
+
+Recorded:
+
+* request count and latency histogram per URL name (``MetricsMiddleware``),
+* shared cache lookups per key family and outcome (``caching``),
+* ingest runs, seconds and rows per command (``replica.IngestCommand``).
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+DEFAULT_FLUSH_INTERVAL = 10
+
+# Flush intervals without a write after which a process counts as exited
+RETIRE_AFTER = 10
+RETIRED = 'retired.json'
+COMPACT_LOCK = 'compact.lock'
+
+# Seconds; covers a cached hit (a few ms) to a cold full-surah build
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRICS = {
+    'quran_http_requests_total': ('counter', 'Requests handled, by URL name, method and status'),
+    'quran_http_request_duration_seconds': ('histogram', 'Request latency by URL name'),
+    'quran_cache_requests_total': ('counter', 'Shared cache lookups by key family and outcome'),
+    'quran_ingest_runs_total': ('counter', 'Completed ingest command runs'),
+    'quran_ingest_seconds_total': ('counter', 'Time spent in ingest commands'),
+    'quran_ingest_rows_total': ('counter', 'Rows written by ingest commands'),
+}
+
+
+def metric_key(name, labels):
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+class Registry:
+    """Counters and fixed-bucket histograms keyed by (name, labels)"""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}  # key -> [count per bucket..., +Inf count, sum]
+        self.changed = False
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = metric_key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self.changed = True
+
+    def observe(self, name, value, **labels):
+        key = metric_key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+            histogram[bisect_left(LATENCY_BUCKETS, value)] += 1
+            histogram[-1] += value
+            self.changed = True
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, dict(labels), list(values)] for (name, labels), values in self.histograms.items()],
+            }
+
+
+registry = Registry()
+
+_started = time.time()
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def reset_after_fork():
+    """A forked worker starts from zero with its own file and flush thread"""
+    global registry, _started, _flusher
+    registry = Registry()
+    _started = time.time()
+    _flusher = None
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def enabled():
+    return getattr(settings, 'QURAN_METRICS', False)
+
+
+def metrics_dir():
+    return getattr(settings, 'QURAN_METRICS_DIR', None) if enabled() else None
+
+
+def flush_interval():
+    return getattr(settings, 'QURAN_METRICS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+
+def snapshot_path(directory):
+    # The start time keeps a reused pid from overwriting an exited process's file
+    return os.path.join(directory, f"{os.getpid()}-{int(_started)}.json")
+
+
+def write_json(path, data):
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(data, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def flush():
+    """Write this process's numbers to its file in QURAN_METRICS_DIR"""
+    directory = metrics_dir()
+    if not directory:
+        return
+    path = snapshot_path(directory)
+    if not registry.changed:
+        # Still alive: keep the file from being retired
+        if os.path.exists(path):
+            os.utime(path)
+        return
+    registry.changed = False
+    os.makedirs(directory, exist_ok=True)
+    write_json(path, registry.snapshot())
+
+
+def start_flusher():
+    global _flusher
+    if _flusher is not None or not metrics_dir():
+        return
+    with _flusher_lock:
+        if _flusher is None:
+            interval = flush_interval()
+
+            def run():
+                while True:
+                    time.sleep(interval)
+                    flush()
+
+            _flusher = threading.Thread(target=run, name='metrics-flush', daemon=True)
+            _flusher.start()
+            atexit.register(flush)
+
+
+def inc(name, value=1, **labels):
+    registry.inc(name, value, **labels)
+    start_flusher()
+
+
+def observe(name, value, **labels):
+    registry.observe(name, value, **labels)
+    start_flusher()
+
+
+def read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # being replaced or removed
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def merge(snapshots, counters=None, histograms=None):
+    """Sum snapshots into ``{metric_key: value}`` counters and histograms"""
+    counters = {} if counters is None else counters
+    histograms = {} if histograms is None else histograms
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = metric_key(name, labels)
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snapshot['histograms']:
+            key = metric_key(name, labels)
+            merged = histograms.setdefault(key, [0] * len(values))
+            for index, value in enumerate(values):
+                merged[index] += value
+    return counters, histograms
+
+
+def process_files(directory):
+    return [
+        name for name in os.listdir(directory)
+        if name.endswith('.json') and name != RETIRED
+    ]
+
+
+def compact(directory):
+    """Fold the files of exited processes into the retired file"""
+    lock = os.path.join(directory, COMPACT_LOCK)
+    cutoff = time.time() - RETIRE_AFTER * flush_interval()
+    try:
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        # Someone else is compacting; clear a lock left behind by a crash
+        try:
+            if os.path.getmtime(lock) < cutoff:
+                remove(lock)
+        except OSError:
+            pass
+        return
+    try:
+        own = os.path.basename(snapshot_path(directory))
+        retired_path = os.path.join(directory, RETIRED)
+        retired = read_json(retired_path) or {'counters': [], 'histograms': [], 'folded': []}
+        # Already counted in the retired file: left by a crash before removal.
+        # A name stays recorded until its file is confirmed gone.
+        previously = set(retired['folded'])
+        for name in previously:
+            remove(os.path.join(directory, name))
+        folded = {name for name in previously if os.path.exists(os.path.join(directory, name))}
+
+        exited = []
+        for name in process_files(directory):
+            path = os.path.join(directory, name)
+            try:
+                if name == own or name in folded or os.path.getmtime(path) >= cutoff:
+                    continue
+            except OSError:
+                continue
+            snapshot = read_json(path)
+            if snapshot is not None:
+                exited.append((name, snapshot))
+        if not exited:
+            if folded != previously:
+                write_json(retired_path, {**retired, 'folded': sorted(folded)})
+            return
+
+        counters, histograms = merge([retired] + [snapshot for _, snapshot in exited])
+        # The folded names are recorded so that files a crash leaves behind
+        # are never counted twice
+        write_json(retired_path, {
+            'counters': [[name, dict(labels), value] for (name, labels), value in counters.items()],
+            'histograms': [[name, dict(labels), values] for (name, labels), values in histograms.items()],
+            'folded': sorted(folded | {name for name, _ in exited}),
+        })
+        for name, _ in exited:
+            remove(os.path.join(directory, name))
+    finally:
+        os.close(fd)
+        remove(lock)
+
+
+def collect():
+    """This process's snapshot plus every other process's file"""
+    snapshots = [registry.snapshot()]
+    directory = metrics_dir()
+    if directory and os.path.isdir(directory):
+        compact(directory)
+        own = os.path.basename(snapshot_path(directory))
+        retired = read_json(os.path.join(directory, RETIRED))
+        skip = {own}
+        if retired is not None:
+            snapshots.append(retired)
+            skip.update(retired['folded'])
+        for name in process_files(directory):
+            if name not in skip:
+                snapshot = read_json(os.path.join(directory, name))
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+    return merge(snapshots)
+
+
+def format_number(value):
+    # Exact for large counters, which the :g format would round
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def format_labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in items)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(items, escaped)) + '}'
+
+
+def render():
+    """All processes' metrics in the Prometheus text exposition format"""
+    counters, histograms = collect()
+    lines = []
+    for metric, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        if kind == 'counter':
+            for (name, labels), value in sorted(counters.items()):
+                if name == metric:
+                    lines.append(f"{metric}{format_labels(labels)} {format_number(value)}")
+            continue
+        for (name, labels), values in sorted(histograms.items()):
+            if name != metric:
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), values[:-1]):
+                cumulative += count
+                lines.append(f"{metric}_bucket{format_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{metric}_sum{format_labels(labels)} {format_number(values[-1])}")
+            lines.append(f"{metric}_count{format_labels(labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """Counts requests and records their latency per URL name"""
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match is not None else 'unmatched'
+        inc('quran_http_requests_total', view=view, method=request.method, status=response.status_code)
+        observe('quran_http_request_duration_seconds', elapsed, view=view)
+        return response
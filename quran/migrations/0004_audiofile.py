@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0003_bismillah'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('surah_number', models.PositiveIntegerField()),
+                ('ayah_number', models.PositiveIntegerField()),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveIntegerField()),
+                ('content_type', models.CharField(default='audio/mpeg', max_length=50)),
+                ('source_url', models.URLField(max_length=500)),
+                ('downloaded_at', models.DateTimeField(auto_now=True)),
+                ('recitation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audio_files', to='quran.recitation')),
+            ],
+            options={
+                'unique_together': {('recitation', 'surah_number', 'ayah_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0004_audiofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AyahTiming',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segments', models.BinaryField()),
+                ('ayah', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timings', to='quran.ayah')),
+                ('recitation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timings', to='quran.recitation')),
+            ],
+            options={
+                'unique_together': {('recitation', 'ayah')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-19 02:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0005_ayahtiming'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Translation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=10)),
+                ('edition', models.CharField(default='default', max_length=50)),
+                ('text', models.TextField()),
+                ('ayah', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='translations', to='quran.ayah')),
+            ],
+            options={
+                'unique_together': {('language', 'edition', 'ayah')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+# Ayah column -> (language, edition); the English text was imported from en.asad
+COLUMNS = {
+    'translation_en': ('en', 'asad'),
+    'translation_id': ('id', 'default'),
+    'translation_ur': ('ur', 'default'),
+    'translation_bn': ('bn', 'default'),
+}
+
+BATCH_SIZE = 2000
+
+
+def copy_translations(apps, schema_editor):
+    Ayah = apps.get_model('quran', 'Ayah')
+    Translation = apps.get_model('quran', 'Translation')
+    
+    for column, (language, edition) in COLUMNS.items():
+        rows = []
+        for ayah_id, text in Ayah.objects.exclude(**{column: ''}).values_list('id', column).iterator():
+            rows.append(Translation(ayah_id=ayah_id, language=language, edition=edition, text=text))
+            if len(rows) >= BATCH_SIZE:
+                Translation.objects.bulk_create(rows)
+                rows = []
+        Translation.objects.bulk_create(rows)
+
+
+def restore_translations(apps, schema_editor):
+    Ayah = apps.get_model('quran', 'Ayah')
+    Translation = apps.get_model('quran', 'Translation')
+    
+    for column, (language, edition) in COLUMNS.items():
+        texts = dict(Translation.objects.filter(language=language, edition=edition)
+                     .values_list('ayah_id', 'text'))
+        ayahs = list(Ayah.objects.filter(id__in=texts).only('id'))
+        for ayah in ayahs:
+            setattr(ayah, column, texts[ayah.id])
+        Ayah.objects.bulk_update(ayahs, [column], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0006_translation'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_translations, restore_translations),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-19 02:25
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0007_copy_ayah_translations'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='ayah',
+            name='translation_bn',
+        ),
+        migrations.RemoveField(
+            model_name='ayah',
+            name='translation_en',
+        ),
+        migrations.RemoveField(
+            model_name='ayah',
+            name='translation_id',
+        ),
+        migrations.RemoveField(
+            model_name='ayah',
+            name='translation_ur',
+        ),
+    ]
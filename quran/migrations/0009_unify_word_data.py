@@ -0,0 +1,120 @@
+# Generated by Django 6.0.1 on 2026-10-19 03:05
+
+import json
+from itertools import accumulate
+
+from django.db import migrations, models
+
+# Frozen copies of positions.WORD_SLOTS / positions.word_number and the
+# ayah counts behind positions.global_number, as they were for this migration
+WORD_SLOTS = 1000
+
+SURAH_AYAH_COUNTS = (
+    7, 286, 200, 176, 120, 165, 206, 75, 129, 109, 123, 111, 43, 52, 99, 128, 111, 110, 98,
+    135, 112, 78, 118, 64, 77, 227, 93, 88, 69, 60, 34, 30, 73, 54, 45, 83, 182, 88,
+    75, 85, 54, 53, 89, 59, 37, 35, 38, 29, 18, 45, 60, 49, 62, 55, 78, 96, 29,
+    22, 24, 13, 14, 11, 11, 18, 12, 12, 30, 52, 52, 44, 28, 28, 20, 56, 40, 31,
+    50, 40, 46, 42, 29, 19, 36, 25, 22, 17, 19, 26, 30, 20, 15, 21, 11, 8, 8,
+    19, 5, 8, 8, 11, 11, 8, 3, 9, 5, 4, 7, 3, 6, 3, 5, 4, 5, 6,
+)
+# Global number of the last ayah before each surah
+SURAH_OFFSETS = (0, *accumulate(SURAH_AYAH_COUNTS))
+
+BATCH_SIZE = 2000
+
+
+def load(value):
+    # The custom JSONField yields undecoded RawJSON wrappers from the database
+    value = getattr(value, 'text', value)
+    if not value:
+        return []
+    return json.loads(value)
+
+
+def global_number(surah, ayah):
+    return SURAH_OFFSETS[surah - 1] + ayah
+
+
+def merge_word_arrays(apps, schema_editor):
+    """Number existing words and fold the Ayah word arrays into WordMeaning"""
+    Ayah = apps.get_model('quran', 'Ayah')
+    WordMeaning = apps.get_model('quran', 'WordMeaning')
+    
+    # The sample-data fallback of download_quran_data stored number_in_surah
+    # as the global number, which would give words of different surahs the
+    # same id; set the real global numbers first
+    ayahs = list(Ayah.objects.only('id', 'surah_id', 'number_in_surah', 'number'))
+    changed = []
+    for ayah in ayahs:
+        number = global_number(ayah.surah_id, ayah.number_in_surah)
+        if ayah.number != number:
+            ayah.number = number
+            changed.append(ayah)
+    Ayah.objects.bulk_update(changed, ['number'], batch_size=BATCH_SIZE)
+    ayah_numbers = {ayah.id: ayah.number for ayah in ayahs}
+    
+    words = list(WordMeaning.objects.only('id', 'ayah_id', 'word_index'))
+    for word in words:
+        word.number = ayah_numbers[word.ayah_id] * WORD_SLOTS + word.word_index + 1
+    WordMeaning.objects.bulk_update(words, ['number'], batch_size=BATCH_SIZE)
+    existing = {(word.ayah_id, word.word_index) for word in words}
+    
+    rows = []
+    columns = Ayah.objects.values_list('id', 'words_arabic', 'words_transliteration', 'words_translation')
+    for ayah_id, arabic, transliteration, translation in columns.iterator():
+        number = ayah_numbers[ayah_id]
+        arabic = load(arabic)
+        transliteration = load(transliteration)
+        translation = load(translation)
+        for index, word in enumerate(arabic):
+            if (ayah_id, index) in existing:
+                continue
+            rows.append(WordMeaning(
+                number=number * WORD_SLOTS + index + 1,
+                ayah_id=ayah_id,
+                word_index=index,
+                arabic_word=word,
+                transliteration=transliteration[index] if index < len(transliteration) else '',
+                meaning_en=translation[index] if index < len(translation) else '',
+            ))
+        if len(rows) >= BATCH_SIZE:
+            WordMeaning.objects.bulk_create(rows)
+            rows = []
+    WordMeaning.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0008_remove_ayah_translation_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wordmeaning',
+            name='number',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.RunPython(merge_word_arrays, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='wordmeaning',
+            name='number',
+            field=models.PositiveIntegerField(unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='wordmeaning',
+            index=models.Index(fields=['root_word'], name='quran_wordm_root_wo_dca02f_idx'),
+        ),
+        migrations.RemoveField(
+            model_name='ayah',
+            name='words_arabic',
+        ),
+        migrations.RemoveField(
+            model_name='ayah',
+            name='words_translation',
+        ),
+        migrations.RemoveField(
+            model_name='ayah',
+            name='words_transliteration',
+        ),
+    ]
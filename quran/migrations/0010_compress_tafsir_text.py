@@ -0,0 +1,63 @@
+# Generated by Django 6.0.1 on 2026-10-19 04:10
+
+import quran.models
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def compress_texts(apps, schema_editor):
+    """Copy every tafsir body into the compressed column"""
+    Tafsir = apps.get_model('quran', 'Tafsir')
+    
+    rows = []
+    for tafsir in Tafsir.objects.only('id', 'text').iterator():
+        # CompressedTextField compresses plain strings when saving
+        tafsir.body = tafsir.text
+        rows.append(tafsir)
+        if len(rows) >= BATCH_SIZE:
+            Tafsir.objects.bulk_update(rows, ['body'])
+            rows = []
+    Tafsir.objects.bulk_update(rows, ['body'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0009_unify_word_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextDictionary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=100)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'text dictionaries',
+            },
+        ),
+        migrations.AddField(
+            model_name='tafsir',
+            name='body',
+            field=quran.models.CompressedTextField(editable=True, null=True),
+        ),
+        migrations.RunPython(compress_texts, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='tafsir',
+            name='text',
+        ),
+        migrations.RenameField(
+            model_name='tafsir',
+            old_name='body',
+            new_name='text',
+        ),
+        migrations.AlterField(
+            model_name='tafsir',
+            name='text',
+            field=quran.models.CompressedTextField(dictionary_key='tafsir:{source}:{language}', editable=True),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-19 05:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_change_log(apps, schema_editor):
+    """One entry per existing annotation so a first sync from cursor 0 sees everything"""
+    AnnotationChange = apps.get_model('quran', 'AnnotationChange')
+    for model_name, kind in [('Bookmark', 'bookmark'), ('UserNote', 'note')]:
+        model = apps.get_model('quran', model_name)
+        AnnotationChange.objects.bulk_create(
+            [
+                AnnotationChange(user_id=user_id, kind=kind, object_id=object_id)
+                for object_id, user_id in model.objects.order_by('id').values_list('id', 'user_id')
+            ],
+            batch_size=1000,
+        )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0010_compress_tafsir_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookmark',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name='AnnotationChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('bookmark', 'Bookmark'), ('note', 'Note')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quran_annotation_changes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'id'], name='quran_annot_user_id_071db7_idx'), models.Index(fields=['user', 'kind', 'object_id'], name='quran_annot_user_id_3538e4_idx')],
+            },
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
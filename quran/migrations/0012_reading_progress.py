@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-19 06:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0011_annotation_change_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField()),
+                ('ayah', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='quran.ayah')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='quran_reading_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AyahReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('last_read_at', models.DateTimeField()),
+                ('ayah', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='quran.ayah')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quran_ayah_readings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'ayah')},
+            },
+        ),
+    ]
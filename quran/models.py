@@ -1,23 +1,101 @@
+from django import forms
 from django.db import models
 from django.contrib.auth.models import User
-from django.contrib.postgres.fields import ArrayField  # If using PostgreSQL
 import json
+from .rawjson import LazyJSONAttribute, RawJSON, loads
+from . import compressed
+from . import positions
 
-# For SQLite/MySQL alternative to ArrayField
 class JSONField(models.TextField):
-    """Custom JSON field for storing lists/dicts"""
+    """Custom JSON field for storing lists/dicts, decoded on first access"""
+    descriptor_class = LazyJSONAttribute
+    
+    def db_type(self, connection):
+        # Native jsonb on PostgreSQL; Django has it handed back as text, so
+        # values still reach clients without being parsed
+        if connection.vendor == 'postgresql':
+            return 'jsonb'
+        return super().db_type(connection)
+    
+    def get_placeholder(self, value, compiler, connection):
+        if connection.vendor == 'postgresql':
+            return '%s::jsonb'
+        return '%s'
+    
     def from_db_value(self, value, expression, connection):
         if value is None:
             return value
-        return json.loads(value)
+        return RawJSON(value)
     
     def to_python(self, value):
+        if isinstance(value, RawJSON):
+            return value.decode()
         if isinstance(value, str):
-            return json.loads(value)
+            return loads(value)
         return value
     
+    def pre_save(self, model_instance, add):
+        # Read the stored value directly so untouched rows are not decoded
+        if self.attname in model_instance.__dict__:
+            return model_instance.__dict__[self.attname]
+        return super().pre_save(model_instance, add)
+    
     def get_prep_value(self, value):
-        return json.dumps(value)
+        if isinstance(value, RawJSON):
+            return value.text
+        # Compact UTF-8 so the stored text can be sent to clients as-is
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+class CompressedTextField(models.BinaryField):
+    """Text stored compressed (see quran.compressed), decompressed on first access"""
+    descriptor_class = compressed.LazyTextAttribute
+    
+    def __init__(self, *args, dictionary_key=None, **kwargs):
+        # e.g. 'tafsir:{source}:{language}', filled from the row being saved
+        self.dictionary_key = dictionary_key
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+    
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.dictionary_key is not None:
+            kwargs['dictionary_key'] = self.dictionary_key
+        return name, path, args, kwargs
+    
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return compressed.CompressedText(value)
+    
+    def to_python(self, value):
+        if isinstance(value, compressed.CompressedText):
+            return value.decode()
+        return value
+    
+    def pre_save(self, model_instance, add):
+        value = model_instance.__dict__.get(self.attname)
+        if isinstance(value, str):
+            dictionary_id = 0
+            if self.dictionary_key is not None:
+                dictionary_id = compressed.current_dictionary(self.dictionary_key.format(**vars(model_instance)))
+            # Keep the compressed form so the next save does not redo the work
+            value = model_instance.__dict__[self.attname] = compressed.CompressedText(
+                compressed.compress(value, dictionary_id)
+            )
+        return value
+    
+    def get_prep_value(self, value):
+        if isinstance(value, compressed.CompressedText):
+            return value.blob
+        if isinstance(value, str):
+            return compressed.compress(value)
+        return value
+    
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+    
+    def formfield(self, **kwargs):
+        return super().formfield(**{'widget': forms.Textarea, **kwargs})
 
 class Surah(models.Model):
     """Model for Quran chapters"""
@@ -56,16 +134,9 @@ class Ayah(models.Model):
     # Transliteration
     transliteration = models.TextField(blank=True)
     
-    # Translations
-    translation_en = models.TextField(blank=True)
-    translation_id = models.TextField(blank=True)  # Indonesian
-    translation_ur = models.TextField(blank=True)  # Urdu
-    translation_bn = models.TextField(blank=True)  # Bengali
+    # Translations are stored per edition in Translation
     
-    # Word by word breakdown
-    words_arabic = JSONField(blank=True, default=list)  # List of Arabic words
-    words_transliteration = JSONField(blank=True, default=list)  # List of transliterations
-    words_translation = JSONField(blank=True, default=list)  # List of word meanings
+    # Word by word breakdown lives in WordMeaning
     
     # Audio
     audio_url = models.URLField(max_length=500, blank=True, null=True)
@@ -88,6 +159,20 @@ class Ayah(models.Model):
     def __str__(self):
         return f"{self.surah.number}:{self.number_in_surah}"
 
+class Translation(models.Model):
+    """One ayah's text in a translation edition"""
+    ayah = models.ForeignKey(Ayah, on_delete=models.CASCADE, related_name='translations')
+    language = models.CharField(max_length=10)
+    edition = models.CharField(max_length=50, default='default')  # e.g. 'asad', 'sahih'
+    text = models.TextField()
+    
+    class Meta:
+        # Leading (language, edition) so one edition's rows are a single index range
+        unique_together = ['language', 'edition', 'ayah']
+    
+    def __str__(self):
+        return f"{self.ayah} - {self.language}/{self.edition}"
+
 class Tafsir(models.Model):
     """Model for verse explanations/tafsir"""
     ayah = models.ForeignKey(Ayah, on_delete=models.CASCADE, related_name='tafsirs')
@@ -98,7 +183,7 @@ class Tafsir(models.Model):
         ('tabari', 'Tafsir al-Tabari'),
         ('modern', 'Modern Tafsir'),
     ])
-    text = models.TextField()
+    text = CompressedTextField(dictionary_key='tafsir:{source}:{language}')
     language = models.CharField(max_length=10, default='en')
     
     class Meta:
@@ -107,6 +192,18 @@ class Tafsir(models.Model):
     def __str__(self):
         return f"{self.ayah} - {self.get_source_display()}"
 
+class TextDictionary(models.Model):
+    """Preset compression dictionary shared by the texts registered under ``key``"""
+    key = models.CharField(max_length=100, db_index=True)  # e.g. tafsir:ibn_kathir:en
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name_plural = 'text dictionaries'
+    
+    def __str__(self):
+        return f"{self.key} ({len(self.data)} bytes)"
+
 class UserNote(models.Model):
     """Model for user personal notes on verses"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quran_notes')
@@ -126,6 +223,7 @@ class Bookmark(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quran_bookmarks')
     ayah = models.ForeignKey(Ayah, on_delete=models.CASCADE, related_name='bookmarked_by')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     # Optional: Bookmark type/color
     bookmark_type = models.CharField(max_length=20, default='default', choices=[
@@ -141,8 +239,65 @@ class Bookmark(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.ayah}"
 
+class DatasetVersion(models.Model):
+    """Version counter of a dataset (e.g. the corpus), bumped by ingest commands"""
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+class ReadingProgress(models.Model):
+    """Where a user last stopped reading (written in batches by quran.progress)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='quran_reading_progress')
+    ayah = models.ForeignKey(Ayah, on_delete=models.CASCADE, related_name='+')
+    read_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.ayah}"
+
+class AyahReading(models.Model):
+    """How often and when a user last read an ayah (written in batches by quran.progress)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quran_ayah_readings')
+    ayah = models.ForeignKey(Ayah, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+    last_read_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ['user', 'ayah']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.ayah} ({self.count})"
+
+class AnnotationChange(models.Model):
+    """Per-user log of bookmark and note changes, read by the sync endpoint"""
+    KIND_BOOKMARK = 'bookmark'
+    KIND_NOTE = 'note'
+    
+    # The auto id is the sync cursor; each object keeps only its latest entry
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quran_annotation_changes')
+    kind = models.CharField(max_length=10, choices=[
+        (KIND_BOOKMARK, 'Bookmark'),
+        (KIND_NOTE, 'Note'),
+    ])
+    object_id = models.PositiveBigIntegerField()
+    deleted = models.BooleanField(default=False)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id']),
+            models.Index(fields=['user', 'kind', 'object_id']),
+        ]
+    
+    def __str__(self):
+        action = 'deleted' if self.deleted else 'changed'
+        return f"{self.user.username} - {self.kind} {self.object_id} {action}"
+
 class WordMeaning(models.Model):
-    """Detailed meaning and pronunciation for individual words"""
+    """Canonical per-word data: text, meaning and pronunciation"""
+    # Global word id (see positions.word_number), stable across re-imports
+    number = models.PositiveIntegerField(unique=True)
     ayah = models.ForeignKey(Ayah, on_delete=models.CASCADE, related_name='word_meanings')
     word_index = models.PositiveIntegerField()  # Position in verse
     arabic_word = models.CharField(max_length=100)
@@ -161,9 +316,19 @@ class WordMeaning(models.Model):
     class Meta:
         ordering = ['ayah', 'word_index']
         unique_together = ['ayah', 'word_index']
+        indexes = [models.Index(fields=['root_word'])]
     
     def __str__(self):
         return f"{self.arabic_word} - {self.meaning_en[:50]}"
+    
+    def save(self, *args, **kwargs):
+        if self.number is None:
+            if WordMeaning.ayah.is_cached(self):
+                ayah_number = self.ayah.number
+            else:
+                ayah_number = Ayah.objects.filter(pk=self.ayah_id).values_list('number', flat=True).get()
+            self.number = positions.word_number(ayah_number, self.word_index)
+        super().save(*args, **kwargs)
 
 class Recitation(models.Model):
     """Different Quran recitations/audio styles"""
@@ -183,6 +348,35 @@ class Recitation(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.get_style_display()})"
+
+class AyahTiming(models.Model):
+    """Per-word audio timings of one ayah for one reciter (packed, see quran.timings)"""
+    recitation = models.ForeignKey(Recitation, on_delete=models.CASCADE, related_name='timings')
+    ayah = models.ForeignKey(Ayah, on_delete=models.CASCADE, related_name='timings')
+    segments = models.BinaryField()
+    
+    class Meta:
+        unique_together = ['recitation', 'ayah']
+    
+    def __str__(self):
+        return f"{self.recitation.name} - {self.ayah}"
+
+class AudioFile(models.Model):
+    """Locally mirrored recitation file, stored on disk by content hash"""
+    recitation = models.ForeignKey(Recitation, on_delete=models.CASCADE, related_name='audio_files')
+    surah_number = models.PositiveIntegerField()
+    ayah_number = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveIntegerField()
+    content_type = models.CharField(max_length=50, default='audio/mpeg')
+    source_url = models.URLField(max_length=500)
+    downloaded_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['recitation', 'surah_number', 'ayah_number']
+    
+    def __str__(self):
+        return f"{self.recitation.name} - {self.surah_number}:{self.ayah_number}"
     
 
 
@@ -0,0 +1,90 @@
+"""
+API payloads that are the same for every user.
+
+Verses of a surah, a mushaf page or a juz, the reciter list and the
+Bismillah are serialized once and kept in the shared cache (see
+``caching``). Corpus payloads follow the corpus version; reciters and the
+Bismillah are edited by hand, so they live under their own ``reference``
+dataset, bumped whenever one of those rows is saved or deleted.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import caching, instrumentation, positions, translations
+from .models import Ayah, Bismillah, Recitation
+from .serializers import AyahSerializer, RecitationSerializer
+
+REFERENCE = 'reference'
+
+# Part of every verse payload key; raise it when AyahSerializer's output
+# changes so entries of the old shape are never served, not even as stale
+VERSE_FORMAT = 2
+
+# Verses of a page or juz, by global ayah number range
+POSITION_RANGES = {
+    'page': positions.page_range,
+    'juz': positions.juz_range,
+}
+
+
+def ayah_columns(queryset, editions):
+    """Only what AyahSerializer renders: unused scripts deferred, requested editions joined"""
+    queryset = (queryset.select_related('surah').prefetch_related('word_meanings')
+                .defer('text_indopak', 'text_simple'))
+    return translations.with_translations(queryset, editions)
+
+
+def editions_key(editions):
+    return ','.join(f"{language}:{edition}" for language, edition in editions)
+
+
+def serialize_verses(queryset, editions):
+    verses = ayah_columns(queryset, editions)
+    with instrumentation.span('serialize'):
+        return list(AyahSerializer(verses, many=True, context={'translations': editions}).data)
+
+
+def surah_verses(surah_number, editions):
+    """Serialized verses of a surah, cached per corpus version"""
+    return caching.get_or_set(
+        ('surah-verses', VERSE_FORMAT, surah_number, editions_key(editions)),
+        lambda: serialize_verses(Ayah.objects.filter(surah_id=surah_number).order_by('number_in_surah'), editions),
+    )
+
+
+def position_verses(kind, number, editions):
+    """Serialized verses of a page or juz; raises ValueError for an unknown number"""
+    first, last = POSITION_RANGES[kind](number)
+    return caching.get_or_set(
+        (f"{kind}-verses", VERSE_FORMAT, number, editions_key(editions)),
+        lambda: serialize_verses(Ayah.objects.filter(number__range=(first, last)).order_by('number'), editions),
+    )
+
+
+def recitation_list():
+    return caching.get_or_set(
+        ('recitations',),
+        lambda: list(RecitationSerializer(Recitation.objects.all(), many=True).data),
+        dataset=REFERENCE,
+    )
+
+
+def bismillah():
+    def build():
+        bismillah = Bismillah.get_default()
+        return {
+            'text_uthmani': bismillah.text_uthmani,
+            'translation_en': bismillah.translation_en,
+            'audio_url': bismillah.audio_url,
+            'words': bismillah.words,
+        }
+
+    return caching.get_or_set(('bismillah',), build, dataset=REFERENCE)
+
+
+@receiver(post_save, sender=Recitation)
+@receiver(post_delete, sender=Recitation)
+@receiver(post_save, sender=Bismillah)
+@receiver(post_delete, sender=Bismillah)
+def invalidate_reference(**kwargs):
+    caching.bump(REFERENCE)
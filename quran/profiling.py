@@ -0,0 +1,188 @@
+"""
+Profiles of single requests, for staff.
+
+A staff user adds ``?profile=1`` or an ``X-Quran-Profile: 1`` header to a
+request and the view runs under a profiler. If pyinstrument is installed
+its sampling profiler is used; otherwise cProfile is. The response is
+replaced by a plain text report: the call profile, slowest first, then
+every SQL statement the request ran, with its time. ``profile=store``
+keeps the normal response instead and only saves the report. Every report
+is saved in ``QURAN_PROFILE_DIR``, and the ``X-Quran-Profile`` response
+header names the file.
+
+Captures are limited to ``QURAN_PROFILE_RATE`` (count, seconds), counted
+in the cache so that a shared backend limits all workers together, and
+only one request per process is profiled at a time. Requests over the
+limit are served normally with ``X-Quran-Profile: rate-limited``. Anyone
+who is not staff gets the normal response, so the hook can stay on in
+production.
+"""
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.cache import add_never_cache_headers
+
+from . import caching
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:  # optional, lower overhead and readable call trees
+    SamplingProfiler = None
+
+TRIGGER_PARAM = 'profile'
+TRIGGER_HEADER = 'X-Quran-Profile'
+STORE_ONLY = 'store'
+
+DEFAULT_RATE = (10, 60)
+DEFAULT_KEEP = 200
+
+# cProfile rows in the report
+CPROFILE_LINES = 80
+
+# One profiler per process: cProfile cannot run twice at once
+_busy = threading.Lock()
+
+
+def requested_mode(request):
+    """'1' or 'store' when the request asks for a profile, else None"""
+    mode = request.GET.get(TRIGGER_PARAM) or request.headers.get(TRIGGER_HEADER)
+    if not mode or mode in ('0', 'false'):
+        return None
+    return STORE_ONLY if mode == STORE_ONLY else '1'
+
+
+def allowed():
+    """Take one capture from the rate limit, if any are left in the current window"""
+    limit, window = getattr(settings, 'QURAN_PROFILE_RATE', DEFAULT_RATE)
+    backend = caching.get_cache()
+    key = f"quran:profile:{int(time.time() // window)}"
+    backend.add(key, 0, window)
+    try:
+        return backend.incr(key) <= limit
+    except ValueError:  # expired between add and incr
+        return False
+
+
+class QueryLog:
+    """Every statement run on any connection while it is active"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            connection = context['connection']
+            try:
+                statement = connection.ops.last_executed_query(context['cursor'], sql, params)
+            except Exception:
+                statement = f"{sql} -- params: {params!r}"
+            self.queries.append((elapsed, connection.alias, statement))
+
+    def report(self):
+        total = sum(elapsed for elapsed, _, _ in self.queries)
+        lines = [f"{len(self.queries)} queries, {total * 1000:.1f} ms"]
+        for elapsed, alias, statement in self.queries:
+            lines.append(f"\n[{elapsed * 1000:.1f} ms {alias}] {statement}")
+        return '\n'.join(lines)
+
+
+def profile_call(func):
+    """Run ``func`` under the profiler and return (its result, the call profile as text)"""
+    if SamplingProfiler is not None:
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.start()
+        try:
+            result = func()
+        finally:
+            profiler.stop()
+        return result, profiler.output_text(unicode=True, color=False)
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func)
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(CPROFILE_LINES)
+    return result, output.getvalue()
+
+
+def save(request, report):
+    """Write the report to QURAN_PROFILE_DIR, dropping the oldest beyond QURAN_PROFILE_KEEP"""
+    directory = getattr(settings, 'QURAN_PROFILE_DIR', None)
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    match = request.resolver_match
+    view = match.url_name if match is not None and match.url_name else 'request'
+    now = time.time()
+    name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now * 1000) % 1000:03d}-{os.getpid()}-{view}.txt"
+    with open(os.path.join(directory, name), 'w') as f:
+        f.write(report)
+
+    keep = getattr(settings, 'QURAN_PROFILE_KEEP', DEFAULT_KEEP)
+    reports = sorted(entry for entry in os.listdir(directory) if entry.endswith('.txt'))
+    for old in reports[:-keep]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except OSError:
+            pass
+    return name
+
+
+class ProfilingMiddleware:
+    """Profiles staff requests that ask for it; see the module docstring"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QURAN_PROFILING', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        user = getattr(request, 'user', None)
+        if mode is None or user is None or not user.is_staff:
+            return self.get_response(request)
+
+        if not allowed() or not _busy.acquire(blocking=False):
+            return self.limited(request)
+        try:
+            queries = QueryLog()
+            started = time.perf_counter()
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(queries))
+                response, call_profile = profile_call(lambda: self.get_response(request))
+            total = time.perf_counter() - started
+        finally:
+            _busy.release()
+
+        report = '\n\n'.join([
+            f"{request.method} {request.get_full_path()} -> {response.status_code} in {total * 1000:.1f} ms",
+            call_profile.rstrip(),
+            queries.report(),
+        ]) + '\n'
+        name = save(request, report)
+
+        if mode != STORE_ONLY:
+            response = HttpResponse(report, content_type='text/plain; charset=utf-8')
+            add_never_cache_headers(response)
+        if name:
+            response[TRIGGER_HEADER] = name
+        return response
+
+    def limited(self, request):
+        response = self.get_response(request)
+        response[TRIGGER_HEADER] = 'rate-limited'
+        return response
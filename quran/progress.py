@@ -0,0 +1,268 @@
+"""
+Write-behind reading progress.
+
+Reading positions arrive with every verse change, far too often for a
+write each on SQLite's single writer. ``record`` only updates an
+in-process buffer:
+
+* the last position per user (last write wins), and
+* per (user, ayah) read counts and the latest read time.
+
+A background thread flushes the buffer every
+``QURAN_PROGRESS_FLUSH_INTERVAL`` seconds (and as soon as
+``QURAN_PROGRESS_MAX_PENDING`` entries pile up, and at exit) in one
+transaction of batched upserts. A crash loses at most one interval of
+progress. Readers merge the pending entries over the stored rows, so a
+user always sees their own latest position from the same process.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, close_old_connections, connection, transaction
+
+from . import caching
+from .models import Ayah, AyahReading, ReadingProgress
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 5
+DEFAULT_MAX_PENDING = 5000
+
+# Least time between reloads of the ayah ids for unknown ids
+RELOAD_INTERVAL = 2
+
+_ayah_ids = None  # (corpus version, loaded_at, ids)
+_ayah_ids_lock = threading.Lock()
+
+
+def valid_ayah_ids(refresh=False):
+    """Every ayah id, reloaded when the corpus version changes.
+
+    ``refresh`` also reloads them (at most every RELOAD_INTERVAL seconds),
+    for ids that may have been added since the last load.
+    """
+    global _ayah_ids
+    current = caching.version(caching.CORPUS)
+    loaded = _ayah_ids
+    if loaded is not None and loaded[0] == current:
+        if not refresh or time.monotonic() - loaded[1] < RELOAD_INTERVAL:
+            return loaded[2]
+    with _ayah_ids_lock:
+        if _ayah_ids is loaded:
+            _ayah_ids = (current, time.monotonic(), frozenset(Ayah.objects.values_list('id', flat=True)))
+        return _ayah_ids[2]
+
+
+def is_valid_ayah(ayah_id):
+    return ayah_id in valid_ayah_ids() or ayah_id in valid_ayah_ids(refresh=True)
+
+
+class ProgressBuffer:
+    """Pending reading progress, coalesced per user and per (user, ayah)"""
+
+    def __init__(self, flush_interval, max_pending):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._positions = {}  # user_id -> (ayah_id, read_at)
+        self._reads = {}  # (user_id, ayah_id) -> [count, last_read_at]
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def record(self, user_id, ayah_id, read_at):
+        with self._lock:
+            self._positions[user_id] = (ayah_id, read_at)
+            entry = self._reads.get((user_id, ayah_id))
+            if entry is None:
+                self._reads[(user_id, ayah_id)] = [1, read_at]
+            else:
+                entry[0] += 1
+                entry[1] = max(entry[1], read_at)
+            full = len(self._reads) >= self.max_pending
+        self.start()
+        if full:
+            self.flush()
+
+    def pending_position(self, user_id):
+        with self._lock:
+            return self._positions.get(user_id)
+
+    def pending_reads(self, user_id):
+        with self._lock:
+            return {
+                ayah_id: (count, last_read_at)
+                for (owner, ayah_id), (count, last_read_at) in self._reads.items()
+                if owner == user_id
+            }
+
+    def drain(self):
+        with self._lock:
+            positions, self._positions = self._positions, {}
+            reads, self._reads = self._reads, {}
+        return positions, reads
+
+    def flush(self):
+        """Write everything pending; returns the number of rows written"""
+        with self._flush_lock:
+            positions, reads = self.drain()
+            if not positions and not reads:
+                return 0
+            try:
+                return write(positions, reads)
+            except IntegrityError:
+                # Retrying the same batch would fail forever: write it per
+                # user so one bad row only costs that user's pending progress
+                logger.exception("Reading progress flush failed, retrying per user")
+                return self.write_each(positions, reads)
+            except Exception:
+                # Put the batch back so the next flush retries it
+                logger.exception("Reading progress flush failed")
+                self.restore(positions, reads)
+                return 0
+
+    def write_each(self, positions, reads):
+        written = 0
+        for user_id in set(positions) | {user_id for user_id, _ in reads}:
+            user_positions = {user_id: positions[user_id]} if user_id in positions else {}
+            user_reads = {key: value for key, value in reads.items() if key[0] == user_id}
+            try:
+                written += write(user_positions, user_reads)
+            except IntegrityError:
+                logger.exception("Dropped the pending reading progress of user %s", user_id)
+            except Exception:
+                logger.exception("Reading progress flush failed")
+                self.restore(user_positions, user_reads)
+        return written
+
+    def restore(self, positions, reads):
+        with self._lock:
+            for user_id, (ayah_id, read_at) in positions.items():
+                current = self._positions.get(user_id)
+                if current is None or current[1] < read_at:
+                    self._positions[user_id] = (ayah_id, read_at)
+            for key, (count, last_read_at) in reads.items():
+                entry = self._reads.setdefault(key, [0, last_read_at])
+                entry[0] += count
+                entry[1] = max(entry[1], last_read_at)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='reading-progress-flush', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            close_old_connections()
+
+
+def write(positions, reads):
+    """Upsert drained positions and read counts in one transaction"""
+    # Users and ayahs deleted since the progress was buffered would fail the FK check
+    user_ids = set(positions) | {user_id for user_id, _ in reads}
+    live = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+    ayah_ids = {ayah_id for ayah_id, _ in positions.values()} | {ayah_id for _, ayah_id in reads}
+    ayahs = set(Ayah.objects.filter(id__in=ayah_ids).values_list('id', flat=True))
+    positions = {
+        user_id: position for user_id, position in positions.items()
+        if user_id in live and position[0] in ayahs
+    }
+    reads = {key: value for key, value in reads.items() if key[0] in live and key[1] in ayahs}
+
+    with transaction.atomic():
+        ReadingProgress.objects.bulk_create(
+            [
+                ReadingProgress(user_id=user_id, ayah_id=ayah_id, read_at=read_at)
+                for user_id, (ayah_id, read_at) in positions.items()
+            ],
+            update_conflicts=True, unique_fields=['user'], update_fields=['ayah', 'read_at'],
+        )
+
+        # bulk_create cannot add to the stored count, so upsert with plain SQL
+        rows = [
+            (user_id, ayah_id, count, last_read_at)
+            for (user_id, ayah_id), (count, last_read_at) in reads.items()
+        ]
+        if rows:
+            table = connection.ops.quote_name(AyahReading._meta.db_table)
+            read_at_field = AyahReading._meta.get_field('last_read_at')
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {table} (user_id, ayah_id, count, last_read_at) VALUES (%s, %s, %s, %s) "
+                    f"ON CONFLICT (user_id, ayah_id) DO UPDATE SET "
+                    f"count = {table}.count + excluded.count, "
+                    f"last_read_at = CASE WHEN excluded.last_read_at > {table}.last_read_at "
+                    f"THEN excluded.last_read_at ELSE {table}.last_read_at END",
+                    [
+                        (user_id, ayah_id, count, read_at_field.get_db_prep_save(last_read_at, connection))
+                        for user_id, ayah_id, count, last_read_at in rows
+                    ],
+                )
+    return len(positions) + len(rows)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ProgressBuffer(
+                    getattr(settings, 'QURAN_PROGRESS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL),
+                    getattr(settings, 'QURAN_PROGRESS_MAX_PENDING', DEFAULT_MAX_PENDING),
+                )
+                atexit.register(_buffer.stop)
+    return _buffer
+
+
+def record(user_id, ayah_id, read_at):
+    """Buffer one reading event; raises ValueError for an unknown ayah id"""
+    if not is_valid_ayah(ayah_id):
+        raise ValueError(f"Ayah {ayah_id} not found")
+    get_buffer().record(user_id, ayah_id, read_at)
+
+
+def last_position(user):
+    """``(ayah_id, read_at)`` of the user's latest position, pending or stored, or None"""
+    pending = get_buffer().pending_position(user.id)
+    stored = ReadingProgress.objects.filter(user=user).values_list('ayah_id', 'read_at').first()
+    if pending is None:
+        return stored
+    if stored is None or stored[1] < pending[1]:
+        return pending
+    return stored
+
+
+def reads(user, ayah_ids):
+    """``{ayah_id: (count, last_read_at)}`` for the given ayahs, pending reads added in"""
+    result = {
+        ayah_id: (count, last_read_at)
+        for ayah_id, count, last_read_at in AyahReading.objects.filter(
+            user=user, ayah_id__in=ayah_ids
+        ).values_list('ayah_id', 'count', 'last_read_at')
+    }
+    wanted = set(ayah_ids)
+    for ayah_id, (count, last_read_at) in get_buffer().pending_reads(user.id).items():
+        if ayah_id not in wanted:
+            continue
+        stored = result.get(ayah_id)
+        if stored is None:
+            result[ayah_id] = (count, last_read_at)
+        else:
+            result[ayah_id] = (stored[0] + count, max(stored[1], last_read_at))
+    return result
@@ -0,0 +1,70 @@
+"""
+Lazily decoded JSON column values.
+
+``JSONField`` hands back a ``RawJSON`` wrapper from the database instead of
+parsing it; the model attribute decodes it on first access (see
+``LazyJSONAttribute``). Serializers can pass the wrapper straight to
+``quran.renderers.JSONRenderer``, which splices the stored text into the
+response without a decode/encode round trip.
+"""
+import json
+
+from django.db.models.query_utils import DeferredAttribute
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+if orjson is not None:
+    loads = orjson.loads
+else:
+    loads = json.loads
+
+
+class RawJSON:
+    """Undecoded JSON text as read from the database"""
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def decode(self):
+        return loads(self.text)
+
+    def __repr__(self):
+        return f"RawJSON({self.text[:40]!r})"
+
+    def __reduce__(self):
+        return (RawJSON, (self.text,))
+
+
+def decode(value):
+    """Decode a RawJSON (or pass through an already decoded value)"""
+    return value.decode() if isinstance(value, RawJSON) else value
+
+
+def raw_value(instance, attname):
+    """The stored value of a JSON attribute without forcing a decode"""
+    try:
+        return instance.__dict__[attname]
+    except KeyError:
+        # Deferred field: load it through the descriptor
+        return getattr(instance, attname)
+
+
+class LazyJSONAttribute(DeferredAttribute):
+    """Model attribute that decodes its RawJSON value on first access"""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = instance.__dict__.get(self.field.attname, self)
+        if value is self:
+            value = super().__get__(instance, cls)
+        if isinstance(value, RawJSON):
+            value = instance.__dict__[self.field.attname] = value.decode()
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
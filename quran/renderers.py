@@ -0,0 +1,57 @@
+import secrets
+
+from rest_framework import renderers
+
+from . import instrumentation
+from .rawjson import RawJSON
+
+
+class JSONEncoder(renderers.JSONRenderer.encoder_class):
+    """Marks RawJSON values with a placeholder the renderer swaps back out"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fragments = []
+        # Random per render, so no string in the data can pass for a placeholder
+        self.marker = secrets.token_hex(8)
+
+    def default(self, obj):
+        if isinstance(obj, RawJSON):
+            self.fragments.append(obj.text)
+            return f"\x00rawjson:{self.marker}:{len(self.fragments) - 1}\x00"
+        return super().default(obj)
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """DRF JSON renderer that emits RawJSON values verbatim"""
+    encoder_class = JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        with instrumentation.span('render'):
+            renderer_context = renderer_context or {}
+            indent = self.get_indent(accepted_media_type, renderer_context)
+            if indent is None:
+                separators = (',', ':') if self.compact else (', ', ': ')
+            else:
+                separators = (',', ': ')
+
+            encoder = self.encoder_class(
+                indent=indent, ensure_ascii=self.ensure_ascii,
+                allow_nan=not self.strict, separators=separators,
+            )
+            text = encoder.encode(data)
+            if encoder.fragments:
+                parts = text.split(f'"\\u0000rawjson:{encoder.marker}:')
+                out = [parts[0]]
+                for part in parts[1:]:
+                    index, _, rest = part.partition('\\u0000"')
+                    out.append(encoder.fragments[int(index)])
+                    out.append(rest)
+                text = ''.join(out)
+
+            # Same escaping as DRF's renderer: keep the output valid JavaScript
+            text = text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+            return text.encode()
@@ -0,0 +1,201 @@
+"""
+Keeping the corpus database in step with the primary.
+
+All writes go to the primary (see ``routers``). With a PostgreSQL replica
+or the read-only connection to the primary file there is nothing to
+copy. With ``QURAN_CORPUS_SNAPSHOT`` the corpus tables are copied into a
+new SQLite file which then replaces the old one, so readers switch over
+on their next connection and never see a half-written corpus.
+
+``publish()`` refreshes the snapshot once the current transaction commits
+and then bumps the dataset versions, so caches are never rebuilt from the
+old copy under the new version. It runs after ``migrate`` and at the end
+of every ``IngestCommand``. Admin edits of corpus rows bump the corpus
+version when they commit; with a snapshot they instead schedule a
+refresh on a background thread ``QURAN_CORPUS_REFRESH_DELAY`` seconds
+after the last edit, so a burst of edits costs one rebuild and none of
+it runs in a request.
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import caching, metrics, payloads, routers
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_DELAY = 30
+
+_pending = threading.local()
+
+
+def snapshot_path():
+    return getattr(settings, 'QURAN_CORPUS_SNAPSHOT', None)
+
+
+def corpus_tables():
+    return [
+        model._meta.db_table
+        for model in apps.get_app_config('quran').get_models()
+        if routers.is_corpus(model)
+    ]
+
+
+def build_snapshot(path):
+    """Copy the corpus tables and their indexes from the primary into a new file at ``path``"""
+    primary = connections[DEFAULT_DB_ALIAS]
+    if primary.vendor != 'sqlite':
+        raise ImproperlyConfigured('QURAN_CORPUS_SNAPSHOT needs a SQLite primary database')
+
+    # Per process, so two workers refreshing at once do not share a file
+    partial = f"{path}.{os.getpid()}.partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+    target = sqlite3.connect(partial, isolation_level=None)
+    try:
+        target.execute('ATTACH DATABASE ? AS source', (str(primary.settings_dict['NAME']),))
+        target.execute('BEGIN')
+        indexes = []
+        for table in corpus_tables():
+            schema = target.execute(
+                "SELECT type, sql FROM source.sqlite_master WHERE tbl_name = ? AND sql IS NOT NULL", (table,)
+            ).fetchall()
+            for kind, sql in schema:
+                if kind == 'table':
+                    target.execute(sql)
+                else:
+                    indexes.append(sql)
+            # Indexes are built after the copy, which is faster than maintaining them row by row
+            target.execute(f'INSERT INTO main."{table}" SELECT * FROM source."{table}"')
+        for sql in indexes:
+            target.execute(sql)
+        target.execute('COMMIT')
+        target.execute('DETACH DATABASE source')
+        target.execute('ANALYZE')
+    finally:
+        target.close()
+    os.replace(partial, path)
+
+
+def refresh():
+    path = snapshot_path()
+    if path:
+        build_snapshot(path)
+    caching.bump(caching.CORPUS)
+    caching.bump(payloads.REFERENCE)
+
+
+def publish():
+    """Make corpus changes visible to readers once the current transaction commits"""
+    # Only the last publish of a transaction does the work
+    _pending.latest = token = object()
+
+    def run():
+        if _pending.latest is token:
+            refresh()
+
+    transaction.on_commit(run)
+
+
+class DeferredRefresh:
+    """Coalesces corpus edits into one refresh, run on a background thread"""
+
+    def __init__(self):
+        self._due = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def schedule(self, delay):
+        """Refresh ``delay`` seconds from now, replacing any earlier schedule"""
+        with self._lock:
+            self._due = time.monotonic() + delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='corpus-refresh', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._due is None:
+                    self._thread = None
+                    return
+                wait = self._due - time.monotonic()
+                if wait <= 0:
+                    self._due = None
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            self._refresh()
+
+    def _refresh(self):
+        try:
+            refresh()
+        except Exception:
+            logger.exception("Corpus snapshot refresh failed")
+        finally:
+            connections.close_all()
+
+    def flush(self):
+        """Run a pending refresh now, so edits are not left out when the process exits"""
+        with self._lock:
+            pending, self._due = self._due is not None, None
+        if pending:
+            self._refresh()
+
+
+_deferred = DeferredRefresh()
+atexit.register(_deferred.flush)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def publish_edit(sender, **kwargs):
+    # Ingest commands publish once when they finish
+    if not routers.is_corpus(sender) or routers.using_primary():
+        return
+    if snapshot_path():
+        delay = getattr(settings, 'QURAN_CORPUS_REFRESH_DELAY', DEFAULT_REFRESH_DELAY)
+        transaction.on_commit(lambda: _deferred.schedule(delay))
+    else:
+        # Readers already see the primary's rows; only the cached payloads are old
+        transaction.on_commit(lambda: caching.bump(caching.CORPUS))
+
+
+@receiver(post_migrate)
+def publish_schema(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    if snapshot_path() and sender.name == 'quran' and using == DEFAULT_DB_ALIAS:
+        refresh()
+
+
+class IngestCommand(BaseCommand):
+    """Management command that writes corpus data.
+
+    Corpus reads go to the primary while it runs, and its changes are
+    published to readers when it completes. Commands that know how many
+    rows they wrote set ``rows_written`` for the ingest metrics.
+    """
+    rows_written = 0
+
+    def execute(self, *args, **options):
+        started = time.perf_counter()
+        with routers.use_primary():
+            output = super().execute(*args, **options)
+        publish()
+
+        command = self.__module__.rpartition('.')[2]
+        metrics.inc('quran_ingest_runs_total', command=command)
+        metrics.inc('quran_ingest_seconds_total', time.perf_counter() - started, command=command)
+        metrics.inc('quran_ingest_rows_total', self.rows_written, command=command)
+        metrics.flush()
+        return output
@@ -0,0 +1,80 @@
+"""
+Database routing.
+
+When a ``corpus`` database is configured (``QURAN_CORPUS_DB``: a
+read-only connection to the primary SQLite file, a snapshot file, or a
+PostgreSQL replica), reads of the corpus models go there and never wait
+on user writes. Everything else stays on ``default``:
+
+* user data (notes, bookmarks, progress, auth, sessions),
+* every write, including saves of instances read from the corpus,
+* corpus reads inside a transaction on the primary and inside
+  ``use_primary()`` (ingest commands, which must see their own writes
+  rather than a copy that has not been refreshed yet).
+
+Only ``default`` is migrated; a corpus snapshot is rebuilt from the
+primary after ``migrate`` instead (see ``replica``).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+CORPUS_DB = 'corpus'
+
+CORPUS_MODELS = {
+    'surah', 'ayah', 'translation', 'wordmeaning', 'tafsir', 'textdictionary',
+    'recitation', 'ayahtiming', 'bismillah',
+}
+
+_primary = ContextVar('quran_use_primary', default=False)
+
+
+@contextmanager
+def use_primary():
+    """Send corpus reads to the primary database inside the block"""
+    token = _primary.set(True)
+    try:
+        yield
+    finally:
+        _primary.reset(token)
+
+
+def using_primary():
+    return _primary.get()
+
+
+def has_corpus_db():
+    return CORPUS_DB in settings.DATABASES
+
+
+def is_corpus(model):
+    return model._meta.app_label == 'quran' and model._meta.model_name in CORPUS_MODELS
+
+
+class CorpusRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            has_corpus_db()
+            and is_corpus(model)
+            and not _primary.get()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return CORPUS_DB
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Including instances that were read from the corpus database
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The corpus database holds a copy of the primary's corpus rows
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, CORPUS_DB}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db != DEFAULT_DB_ALIAS:
+            return False
+        return None
@@ -1,40 +1,71 @@
 from rest_framework import serializers
 from .models import *
 from django.contrib.auth.models import User
+from .rawjson import raw_value
+from . import translations
 import re
 
+class RawJSONField(serializers.Field):
+    """Read-only field that emits a stored JSON column without decoding it"""
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+    
+    def get_attribute(self, instance):
+        return raw_value(instance, self.source)
+    
+    def to_representation(self, value):
+        # RawJSON is written out verbatim by quran.renderers.JSONRenderer
+        return value
+
 class WordMeaningSerializer(serializers.ModelSerializer):
     class Meta:
         model = WordMeaning
-        fields = ['word_index', 'arabic_word', 'transliteration', 
+        fields = ['number', 'word_index', 'arabic_word', 'transliteration', 
                  'pronunciation_audio', 'meaning_en', 'root_word']
 
 class AyahSerializer(serializers.ModelSerializer):
     surah_name = serializers.CharField(source='surah.name_english', read_only=True)
     words = WordMeaningSerializer(source='word_meanings', many=True, read_only=True)
     
+    audio_segments = RawJSONField()
+    segment_timestamps = RawJSONField()
+    
+    # Joined from Translation by the view (see quran.translations)
+    translation_en = serializers.SerializerMethodField()
+    translation_bn = serializers.SerializerMethodField()
+    translations = serializers.SerializerMethodField()
+    
     # Add EXTRA cleaned fields (original fields remain as-is)
     text_uthmani_cleaned = serializers.SerializerMethodField()
-    words_arabic_cleaned = serializers.SerializerMethodField()
     
     class Meta:
         model = Ayah
         fields = ['id', 'surah', 'surah_name', 'number_in_surah', 
                  'text_uthmani', 'text_uthmani_cleaned',  # Original + Cleaned
-                 'transliteration', 'translation_en', 'translation_bn',
-                 'words_arabic', 'words_arabic_cleaned',  # Original + Cleaned
-                 'words_transliteration', 'words_translation',
+                 'transliteration', 'translation_en', 'translation_bn', 'translations',
                  'audio_url', 'audio_segments', 'segment_timestamps',
                  'page_number', 'juz_number', 'words']
     
+    def get_translation_en(self, obj):
+        return getattr(obj, translations.translation_alias('en', translations.default_edition('en')), None) or ''
+    
+    def get_translation_bn(self, obj):
+        return getattr(obj, translations.translation_alias('bn', translations.default_edition('bn')), None) or ''
+    
+    def get_translations(self, obj):
+        """Text of every joined edition, keyed by language or language:edition"""
+        editions = self.context.get('translations', translations.DEFAULT_TRANSLATIONS)
+        return {
+            translations.translation_key(language, edition):
+                getattr(obj, translations.translation_alias(language, edition), None) or ''
+            for language, edition in editions
+        }
+    
     def get_text_uthmani_cleaned(self, obj):
         """Return text with Bismillah automatically removed"""
         return self._clean_bismillah_from_text(obj.text_uthmani, obj)
     
-    def get_words_arabic_cleaned(self, obj):
-        """Return words with Bismillah automatically removed"""
-        return self._clean_bismillah_from_words(obj.words_arabic or [], obj, 'arabic')
-    
     def _clean_bismillah_from_text(self, text, obj):
         """Remove Bismillah from text if needed"""
         # Only clean for first ayah of surahs 2-114
@@ -42,13 +73,6 @@ class AyahSerializer(serializers.ModelSerializer):
             return self._clean_text(text)
         return text
     
-    def _clean_bismillah_from_words(self, words, obj, word_type):
-        """Remove Bismillah words if needed"""
-        # Only clean for first ayah of surahs 2-114
-        if obj.surah.number != 1 and obj.surah.number != 9 and obj.number_in_surah == 1:
-            return self._clean_words(words, word_type)
-        return words
-    
     def _clean_text(self, text):
         """Actual text cleaning logic"""
         if not text:
@@ -68,24 +92,6 @@ class AyahSerializer(serializers.ModelSerializer):
         text = re.sub(r'^\s*[\.،,:;]\s*', '', text)
         return text.strip()
     
-    def _clean_words(self, words, word_type):
-        """Actual word cleaning logic"""
-        if len(words) < 4:
-            return words
-        
-        bismillah_arabic = ['بِسْمِ', 'اللَّهِ', 'الرَّحْمَٰنِ', 'الرَّحِيمِ']
-        
-        # Check if first 4 words match Bismillah
-        is_bismillah = all(
-            bismillah_arabic[i] in words[i] 
-            for i in range(min(4, len(words)))
-        )
-        
-        if is_bismillah:
-            return words[4:]
-        
-        return words
-    
 class TafsirSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tafsir
@@ -110,7 +116,20 @@ class BookmarkSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Bookmark
-        fields = ['id', 'ayah', 'bookmark_type', 'created_at', 'user']
+        fields = ['id', 'ayah', 'bookmark_type', 'created_at', 'updated_at', 'user']
+        read_only_fields = ['created_at', 'updated_at']
+
+class BookmarkBulkItemSerializer(serializers.Serializer):
+    """One bulk upsert item; ayah ids are checked for the whole batch at once"""
+    ayah = serializers.IntegerField(min_value=1)
+    bookmark_type = serializers.ChoiceField(
+        choices=Bookmark._meta.get_field('bookmark_type').choices, default='default'
+    )
+
+class UserNoteBulkItemSerializer(serializers.Serializer):
+    """One bulk upsert item; ayah ids are checked for the whole batch at once"""
+    ayah = serializers.IntegerField(min_value=1)
+    note = serializers.CharField()
 
 class RecitationSerializer(serializers.ModelSerializer):
     class Meta:
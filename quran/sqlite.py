@@ -0,0 +1,49 @@
+"""
+SQLite connection tuning.
+
+Every SQLite connection gets ``QURAN_SQLITE_PRAGMAS`` as it is opened:
+
+* ``journal_mode=wal`` so readers keep reading while a note or bookmark
+  is written (the rollback journal locks the whole file for a write),
+* ``synchronous=normal``, which is durable across application crashes
+  in WAL mode and skips an fsync per commit,
+* memory-mapped reads, a larger page cache and in-memory temp tables.
+
+Connections to a ``mode=ro`` URI (the optional ``corpus`` alias, see
+``routers``) skip the pragmas that need write access and are made
+``query_only``, so a corpus read can never take the write lock.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # negative: KiB rather than pages
+    'temp_store': 'memory',
+}
+
+# Persisted in the database file, so they need a writable connection
+WRITE_PRAGMAS = {'journal_mode'}
+
+
+def is_read_only(connection):
+    return 'mode=ro' in str(connection.settings_dict['NAME'])
+
+
+def pragmas(read_only=False):
+    configured = getattr(settings, 'QURAN_SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    result = {name: value for name, value in configured.items() if not (read_only and name in WRITE_PRAGMAS)}
+    if read_only:
+        result['query_only'] = 1
+    return result
+
+
+@receiver(connection_created)
+def tune_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in pragmas(is_read_only(connection)).items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
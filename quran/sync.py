@@ -0,0 +1,97 @@
+"""
+Delta sync for bookmarks and notes.
+
+Every create, update and delete of a ``Bookmark`` or ``UserNote`` appends
+an ``AnnotationChange`` row for its owner and drops the older rows for the
+same object, so the log holds one entry per object ever seen and its auto
+id doubles as the client's cursor. A client that sends the last cursor it
+saw gets only what changed after it.
+
+An auto id is handed out at insert, not at commit, so two transactions
+could otherwise commit one user's changes out of id order, and a client
+that synced in between would skip the lower id for good. ``record`` locks
+the user's row first, which makes a user's changes take their ids in
+commit order (SQLite already runs one write transaction at a time).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AnnotationChange, Bookmark, UserNote
+
+KINDS = {
+    Bookmark: AnnotationChange.KIND_BOOKMARK,
+    UserNote: AnnotationChange.KIND_NOTE,
+}
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 2000
+
+_suspended = ContextVar('quran_sync_suspended', default=False)
+
+
+@contextmanager
+def recording_suspended():
+    """Skip the per-object signal handlers; bulk writers call ``record`` themselves"""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def record(user_id, kind, object_ids, deleted=False):
+    """Log a change to ``object_ids`` of one kind for one user"""
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+    with transaction.atomic():
+        # Held until commit: the next writer for this user waits, then gets a higher id
+        list(User.objects.select_for_update().filter(id=user_id).values_list('id', flat=True))
+        AnnotationChange.objects.filter(user_id=user_id, kind=kind, object_id__in=object_ids).delete()
+        AnnotationChange.objects.bulk_create([
+            AnnotationChange(user_id=user_id, kind=kind, object_id=object_id, deleted=deleted)
+            for object_id in object_ids
+        ])
+
+
+@receiver(post_save, sender=Bookmark)
+@receiver(post_save, sender=UserNote)
+def record_save(sender, instance, **kwargs):
+    if _suspended.get():
+        return
+    record(instance.user_id, KINDS[sender], [instance.pk])
+
+
+@receiver(post_delete, sender=Bookmark)
+@receiver(post_delete, sender=UserNote)
+def record_delete(sender, instance, origin=None, **kwargs):
+    # Deleting the account removes its log as well
+    if _suspended.get() or isinstance(origin, User):
+        return
+    record(instance.user_id, KINDS[sender], [instance.pk], deleted=True)
+
+
+def changes_since(user, cursor, limit=DEFAULT_LIMIT):
+    """Return ``(changes, next_cursor, has_more)`` for changes after ``cursor``"""
+    changes = list(
+        AnnotationChange.objects.filter(user=user, id__gt=cursor)
+        .order_by('id').values_list('id', 'kind', 'object_id', 'deleted')[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    next_cursor = changes[-1][0] if changes else cursor
+    return changes, next_cursor, has_more
+
+
+def split_changes(changes):
+    """``({kind: [changed ids]}, {kind: [deleted ids]})`` from a page of changes"""
+    changed = {kind: [] for kind in KINDS.values()}
+    deleted = {kind: [] for kind in KINDS.values()}
+    for _, kind, object_id, is_deleted in changes:
+        (deleted if is_deleted else changed)[kind].append(object_id)
+    return changed, deleted
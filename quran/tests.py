@@ -1,3 +1,705 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer as StockJSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from . import audio_store, caching, compressed, metrics, positions, progress, replica, routers, sync, timings
+from .models import (
+    AnnotationChange, AudioFile, Ayah, AyahReading, Bookmark, ReadingProgress, Recitation, Surah, Tafsir,
+    TextDictionary, WordMeaning,
+)
+from .rawjson import RawJSON
+from .renderers import JSONRenderer
+from .transliteration import transliterate
+from .views import WordDetailView
+
+
+def create_surah(number=1, verses=7):
+    surah = Surah.objects.create(
+        number=number, name_arabic='الفاتحة', name_english='Al-Fatiha', name_translation='The Opening',
+        revelation_type='meccan', total_verses=verses,
+    )
+    return [
+        Ayah.objects.create(
+            surah=surah, number=n, number_in_surah=n, text_uthmani='...',
+            page_number=1, juz_number=1, hizb_number=1,
+        )
+        for n in range(1, verses + 1)
+    ]
+
+
+def clear_cache():
+    """Forget cached payloads and dataset versions left by other tests"""
+    caching.get_cache().clear()
+    caching._seen.clear()
+
+
+# Transactional, so the foreign keys are checked when the flush commits
+class ProgressBufferTests(TransactionTestCase):
+
+    def setUp(self):
+        self.ayahs = create_surah()
+        self.user = User.objects.create_user('reader')
+        self.buffer = progress.ProgressBuffer(flush_interval=60, max_pending=1000)
+        self.buffer.start = lambda: None  # flushed by hand, no background thread
+        self.now = timezone.now()
+
+    def test_flush_writes_positions_and_counts(self):
+        self.buffer.record(self.user.id, self.ayahs[0].id, self.now)
+        self.buffer.record(self.user.id, self.ayahs[0].id, self.now + timedelta(seconds=1))
+        self.buffer.record(self.user.id, self.ayahs[1].id, self.now + timedelta(seconds=2))
+
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(ReadingProgress.objects.get(user=self.user).ayah_id, self.ayahs[1].id)
+        self.assertEqual(AyahReading.objects.get(user=self.user, ayah=self.ayahs[0]).count, 2)
+        self.assertEqual(self.buffer.drain(), ({}, {}))
+
+    def test_failed_flush_is_restored_and_retried(self):
+        self.buffer.record(self.user.id, self.ayahs[0].id, self.now)
+        with mock.patch.object(progress, 'write', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('quran.progress', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.pending_reads(self.user.id), {self.ayahs[0].id: (1, self.now)})
+
+        self.buffer.record(self.user.id, self.ayahs[0].id, self.now + timedelta(seconds=1))
+        self.buffer.flush()
+        self.assertEqual(AyahReading.objects.get(user=self.user, ayah=self.ayahs[0]).count, 2)
+
+    def test_deleted_ayah_does_not_block_other_reads(self):
+        self.buffer.record(self.user.id, self.ayahs[6].id, self.now)
+        self.ayahs[6].delete()
+        self.buffer.record(self.user.id, self.ayahs[0].id, self.now + timedelta(seconds=1))
+
+        self.buffer.flush()
+        self.assertEqual(list(AyahReading.objects.values_list('ayah_id', flat=True)), [self.ayahs[0].id])
+        self.assertEqual(ReadingProgress.objects.get(user=self.user).ayah_id, self.ayahs[0].id)
+        self.assertEqual(self.buffer.drain(), ({}, {}))
+
+    def test_deleted_user_is_skipped(self):
+        other = User.objects.create_user('gone')
+        self.buffer.record(other.id, self.ayahs[0].id, self.now)
+        self.buffer.record(self.user.id, self.ayahs[1].id, self.now)
+        other.delete()
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(list(AyahReading.objects.values_list('user_id', flat=True)), [self.user.id])
+
+    def test_integrity_error_drops_only_that_users_batch(self):
+        other = User.objects.create_user('other')
+        self.buffer.record(other.id, self.ayahs[0].id, self.now)
+        self.buffer.record(self.user.id, self.ayahs[1].id, self.now)
+        write = progress.write
+
+        def fail_for_other(positions, reads):
+            if other.id in positions:
+                raise IntegrityError('FOREIGN KEY constraint failed')
+            return write(positions, reads)
+
+        with mock.patch.object(progress, 'write', side_effect=fail_for_other), \
+                self.assertLogs('quran.progress', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(list(AyahReading.objects.values_list('user_id', flat=True)), [self.user.id])
+        self.assertEqual(self.buffer.drain(), ({}, {}))
+
+
+class SyncTests(TestCase):
+
+    def setUp(self):
+        self.ayahs = create_surah()
+        self.user = User.objects.create_user('reader')
+        self.client.force_login(self.user)
+
+    def sync(self, cursor, **params):
+        response = self.client.get('/api/sync/', {'cursor': cursor, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_changes_after_cursor(self):
+        first = Bookmark.objects.create(user=self.user, ayah=self.ayahs[0])
+        data = self.sync(0)
+        self.assertEqual([b['id'] for b in data['bookmarks']], [first.id])
+
+        second = Bookmark.objects.create(user=self.user, ayah=self.ayahs[1])
+        data = self.sync(data['cursor'])
+        self.assertEqual([b['id'] for b in data['bookmarks']], [second.id])
+        self.assertEqual(self.sync(data['cursor'])['bookmarks'], [])
+
+    def test_one_entry_per_object_and_deletes(self):
+        bookmark = Bookmark.objects.create(user=self.user, ayah=self.ayahs[0])
+        bookmark.bookmark_type = 'favorite'
+        bookmark.save()
+        self.assertEqual(AnnotationChange.objects.filter(user=self.user).count(), 1)
+
+        cursor = self.sync(0)['cursor']
+        bookmark_id = bookmark.id
+        bookmark.delete()
+        data = self.sync(cursor)
+        self.assertEqual(data['bookmarks'], [])
+        self.assertEqual(data['deleted']['bookmarks'], [bookmark_id])
+
+    def test_pages_with_limit(self):
+        for ayah in self.ayahs[:3]:
+            Bookmark.objects.create(user=self.user, ayah=ayah)
+        data = self.sync(0, limit=2)
+        self.assertTrue(data['has_more'])
+        self.assertEqual(len(data['bookmarks']), 2)
+        data = self.sync(data['cursor'], limit=2)
+        self.assertFalse(data['has_more'])
+        self.assertEqual(len(data['bookmarks']), 1)
+
+    def test_bulk_writes_are_logged(self):
+        response = self.client.post('/api/bookmarks/bulk/', {
+            'upsert': [{'ayah': self.ayahs[0].id}, {'ayah': self.ayahs[1].id}],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.sync(0)['bookmarks']), 2)
+
+    def test_other_users_changes_are_not_synced(self):
+        other = User.objects.create_user('other')
+        Bookmark.objects.create(user=other, ayah=self.ayahs[0])
+        self.assertEqual(sync.changes_since(self.user, 0)[0], [])
+        self.assertEqual(self.sync(0)['bookmarks'], [])
+
+
+class BulkAnnotationTests(TestCase):
+
+    def setUp(self):
+        self.ayahs = create_surah()
+        self.user = User.objects.create_user('reader')
+        self.client.force_login(self.user)
+
+    def bulk(self, body):
+        return self.client.post('/api/bookmarks/bulk/', body, content_type='application/json')
+
+    def test_body_must_be_an_object(self):
+        self.assertEqual(self.bulk([1, 2]).status_code, 400)
+
+    def test_delete_matching_values_must_be_strings(self):
+        Bookmark.objects.create(user=self.user, ayah=self.ayahs[0], bookmark_type='study')
+        for value in (['study'], {'in': 'study'}, 1, None):
+            self.assertEqual(self.bulk({'delete_matching': {'bookmark_type': value}}).status_code, 400)
+        self.assertEqual(Bookmark.objects.count(), 1)
+        self.assertEqual(self.bulk({'delete_matching': {'bookmark_type': 'study'}}).status_code, 200)
+        self.assertEqual(Bookmark.objects.count(), 0)
+
+    def test_deletes_apply_before_upserts(self):
+        bookmark = Bookmark.objects.create(user=self.user, ayah=self.ayahs[0], bookmark_type='study')
+        data = self.bulk({
+            'upsert': [{'ayah': self.ayahs[0].id, 'bookmark_type': 'study'}],
+            'delete': [bookmark.id],
+        }).json()
+        stored = Bookmark.objects.get(user=self.user)
+        self.assertEqual(data['results']['upsert'][0]['id'], stored.id)
+        self.assertEqual(data['results']['delete'], [{'id': bookmark.id, 'status': 'deleted'}])
+
+
+class WordDetailTests(TestCase):
+
+    def setUp(self):
+        clear_cache()
+        self.ayahs = create_surah()
+        self.ayahs[1].text_uthmani = 'ٱلْحَمْدُ لِلَّهِ رَبِّ ٱلْعَٰلَمِينَ'
+        self.ayahs[1].save()
+        self.view = WordDetailView.as_view({'get': 'retrieve'})
+
+    def retrieve(self, ayah, word_index):
+        return self.view(APIRequestFactory().get('/'), ayah_id=ayah.id, word_index=word_index)
+
+    def test_fallback_is_transliterated(self):
+        data = self.retrieve(self.ayahs[1], 2).data
+        self.assertEqual(data['arabic'], 'رَبِّ')
+        self.assertEqual(data['transliteration'], transliterate('رَبِّ'))
+        self.assertNotEqual(data['transliteration'], 'word_3')
+
+    def test_stored_words_are_matched_by_index(self):
+        WordMeaning.objects.create(ayah=self.ayahs[0], word_index=0, arabic_word='a', transliteration='a', meaning_en='a')
+        WordMeaning.objects.create(ayah=self.ayahs[0], word_index=2, arabic_word='c', transliteration='c', meaning_en='c')
+        self.assertEqual(self.retrieve(self.ayahs[0], 2).data['arabic'], 'c')
+        self.assertEqual(self.retrieve(self.ayahs[0], 1).status_code, 404)
+
+
+class CacheTests(TestCase):
+
+    def setUp(self):
+        clear_cache()
+        self.backend = caching.get_cache()
+        self.parts = ('test-entry', 1)
+        self.slot = caching.slot_key(self.parts)
+        self.calls = 0
+
+    def build(self, value='fresh', delay=0):
+        self.calls += 1
+        time.sleep(delay)
+        return value
+
+    def test_concurrent_misses_build_once(self):
+        caching.version()  # every thread then uses the version this one saw
+        start = threading.Barrier(8)
+        results = []
+
+        def request():
+            start.wait()
+            results.append(caching.get_or_set(self.parts, lambda: self.build(delay=0.2)))
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ['fresh'] * 8)
+
+    def test_held_lock_serves_stale_entry(self):
+        with mock.patch.object(caching, 'is_shared', return_value=True):
+            self.backend.set(self.slot, (caching.version(), time.time() - 1, 'stale'))
+            self.backend.add(f"{self.slot}:lock", 1)
+            self.assertEqual(caching.get_or_set(self.parts, self.build), 'stale')
+        self.assertEqual(self.calls, 0)
+
+    @override_settings(QURAN_CACHE_BUILD_WAIT=0.1)
+    def test_held_lock_without_entry_builds_after_waiting(self):
+        with mock.patch.object(caching, 'is_shared', return_value=True):
+            self.backend.add(f"{self.slot}:lock", 1)
+            self.assertEqual(caching.get_or_set(self.parts, self.build), 'fresh')
+        self.assertEqual(self.calls, 1)
+
+    def test_builder_takes_and_releases_the_lock(self):
+        def build():
+            self.assertIsNotNone(self.backend.get(f"{self.slot}:lock"))
+            return self.build()
+
+        with mock.patch.object(caching, 'is_shared', return_value=True):
+            self.assertEqual(caching.get_or_set(self.parts, build), 'fresh')
+        self.assertIsNone(self.backend.get(f"{self.slot}:lock"))
+
+    def test_bump_rebuilds(self):
+        self.assertEqual(caching.get_or_set(self.parts, self.build), 'fresh')
+        self.assertEqual(caching.get_or_set(self.parts, lambda: self.build('newer')), 'fresh')
+        with self.captureOnCommitCallbacks(execute=True):
+            caching.bump()
+        self.assertEqual(caching.get_or_set(self.parts, lambda: self.build('newer')), 'newer')
+        self.assertEqual(self.calls, 2)
+
+
+class RawJSONRendererTests(SimpleTestCase):
+
+    def test_nested_raw_values_render_verbatim(self):
+        segments = '[[0,1,120],[1,2,480]]'
+        words = '{"ar":"بِسْمِ","en":null}'
+        data = {
+            'verses': [
+                {'id': 1, 'audio_segments': RawJSON(segments), 'note': 'say "\u0000rawjson:0:0\u0000"'},
+                {'id': 2, 'audio_segments': RawJSON('[]'), 'extra': {'words': [RawJSON(words)]}},
+            ],
+            # Exactly what a placeholder looks like before it is spliced
+            'placeholder': '\x00rawjson:0:0\x00',
+        }
+        decoded = {
+            'verses': [
+                {'id': 1, 'audio_segments': json.loads(segments), 'note': data['verses'][0]['note']},
+                {'id': 2, 'audio_segments': [], 'extra': {'words': [json.loads(words)]}},
+            ],
+            'placeholder': data['placeholder'],
+        }
+
+        rendered = JSONRenderer().render(data)
+        self.assertEqual(json.loads(rendered), decoded)
+        self.assertEqual(rendered, StockJSONRenderer().render(decoded))
+
+    def test_no_raw_values(self):
+        data = {'text': 'line\u2028break', 'n': [1, 2.5, None]}
+        self.assertEqual(JSONRenderer().render(data), StockJSONRenderer().render(data))
+
+
+class AudioStreamTests(TestCase):
+
+    def setUp(self):
+        clear_cache()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        overridden = override_settings(QURAN_AUDIO_ROOT=root.name)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+        self.body = bytes(range(256)) * 4
+        sha256 = hashlib.sha256(self.body).hexdigest()
+        path = audio_store.object_path(sha256)
+        path.parent.mkdir(parents=True)
+        path.write_bytes(self.body)
+        self.recitation = Recitation.objects.create(
+            reciter_id=7, name='Alafasy', style='hafs',
+            audio_url_template='https://example.com/{surah}{ayah}.mp3',
+        )
+        AudioFile.objects.create(
+            recitation=self.recitation, surah_number=1, ayah_number=1, sha256=sha256,
+            size=len(self.body), source_url='https://example.com/001001.mp3',
+        )
+        self.etag = f'"{sha256}"'
+
+    def get(self, file_key='001001', **headers):
+        response = self.client.get(f'/audio/7/{file_key}.mp3', headers=headers)
+        self.addCleanup(response.close)
+        return response
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(self.content(response), self.body)
+
+    def test_closed_range(self):
+        response = self.get(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(self.content(response), self.body[10:20])
+
+    def test_suffix_range(self):
+        response = self.get(Range='bytes=-100')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 924-1023/1024')
+        self.assertEqual(self.content(response), self.body[-100:])
+
+    def test_open_range(self):
+        response = self.get(Range='bytes=1000-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 1000-1023/1024')
+        self.assertEqual(self.content(response), self.body[1000:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_if_range_mismatch_sends_whole_file(self):
+        response = self.get(Range='bytes=10-19', **{'If-Range': '"something-else"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), self.body)
+
+    def test_if_range_match_sends_range(self):
+        response = self.get(Range='bytes=10-19', **{'If-Range': self.etag})
+        self.assertEqual(response.status_code, 206)
+
+    def test_missing_file_redirects_to_source(self):
+        response = self.get('001002')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], 'https://example.com/001002.mp3')
+
+    def test_parse_range(self):
+        self.assertIsNone(audio_store.parse_range(None, 100))
+        self.assertIsNone(audio_store.parse_range('bytes=0-1,5-6', 100))
+        self.assertEqual(audio_store.parse_range('bytes=90-200', 100), (90, 99))
+        self.assertEqual(audio_store.parse_range('bytes=-500', 100), (0, 99))
+        for header in ('bytes=100-', 'bytes=5-4', 'bytes=-0'):
+            with self.assertRaises(ValueError):
+                audio_store.parse_range(header, 100)
+
+
+class PositionTests(SimpleTestCase):
+
+    def test_table_sizes(self):
+        self.assertEqual(len(positions.SURAH_AYAH_COUNTS), positions.TOTAL_SURAHS)
+        self.assertEqual(sum(positions.SURAH_AYAH_COUNTS), positions.TOTAL_AYAHS)
+        self.assertEqual(positions.TOTAL_AYAHS, 6236)
+        self.assertEqual(len(positions.PAGE_STARTS), 604)
+        self.assertEqual(len(positions.JUZ_STARTS), 30)
+        self.assertEqual(len(positions.RUB_STARTS), 240)
+        self.assertEqual(positions.page_of(positions.TOTAL_AYAHS), 604)
+        self.assertEqual(positions.juz_of(positions.TOTAL_AYAHS), 30)
+        self.assertEqual(positions.rub_of(positions.TOTAL_AYAHS), 240)
+
+    def test_starts_are_in_order(self):
+        for starts in (positions.PAGE_STARTS, positions.JUZ_STARTS, positions.RUB_STARTS):
+            numbers = [positions.global_number(*start) for start in starts]
+            self.assertEqual(numbers[0], 1)
+            self.assertEqual(numbers, sorted(set(numbers)))
+
+    def test_known_positions(self):
+        for (surah, ayah), page, juz in (((1, 1), 1, 1), ((2, 255), 42, 3), ((18, 1), 293, 15),
+                                         ((36, 1), 440, 22), ((67, 1), 562, 29), ((114, 6), 604, 30)):
+            verse = positions.position(surah, ayah)
+            self.assertEqual((verse.page, verse.juz), (page, juz), f"{surah}:{ayah}")
+
+    def test_ranges(self):
+        self.assertEqual(positions.surah_range(2), (8, 293))
+        self.assertEqual(positions.page_range(1), (1, 7))
+        self.assertEqual(positions.juz_range(30), (positions.global_number(78, 1), positions.TOTAL_AYAHS))
+        self.assertEqual(positions.hizb_range(1), (1, positions.rub_range(4)[1]))
+        with self.assertRaises(ValueError):
+            positions.page_range(605)
+
+    def test_round_trips(self):
+        for number in range(1, positions.TOTAL_AYAHS + 1):
+            self.assertEqual(positions.global_number(*positions.surah_ayah(number)), number)
+        self.assertEqual(positions.parse_verse_key('2:255'), positions.global_number(2, 255))
+        self.assertEqual(positions.word_location(positions.word_number(262, 4)), (262, 4))
+        for surah, ayah in ((0, 1), (115, 1), (1, 8)):
+            with self.assertRaises(ValueError):
+                positions.global_number(surah, ayah)
+
+
+class CompressedTextTests(TestCase):
+    text = 'In the name of Allah — بِسْمِ ٱللَّهِ ٱلرَّحْمَٰنِ ٱلرَّحِيمِ. ' * 20
+
+    def setUp(self):
+        self.ayahs = create_surah()
+        self.forget()
+
+    def forget(self):
+        """Drop everything compressed.py remembers between calls"""
+        compressed._dictionaries.clear()
+        compressed._current.clear()
+        compressed._compressors.__dict__.clear()
+        compressed.text_cache().clear()
+
+    def codecs(self):
+        """(codec, zstandard module or None) for every codec available here"""
+        codecs = [(compressed.ZLIB, None)]
+        if compressed.zstandard is not None:
+            codecs.append((compressed.ZSTD, compressed.zstandard))
+        return codecs
+
+    def using(self, module):
+        self.forget()
+        return mock.patch.object(compressed, 'zstandard', module)
+
+    def stored_header(self, tafsir):
+        blob = Tafsir.objects.values_list('text', flat=True).get(id=tafsir.id).blob
+        return compressed._HEADER.unpack_from(blob)
+
+    def test_round_trip_without_dictionary(self):
+        for codec, module in self.codecs():
+            with self.subTest(codec=codec), self.using(module):
+                blob = compressed.compress(self.text)
+                self.assertEqual(compressed._HEADER.unpack_from(blob), (codec, 0))
+                self.assertLess(len(blob), len(self.text.encode()))
+                self.assertEqual(compressed.decompress(blob), self.text)
+
+    def test_rows_survive_a_rebuilt_dictionary(self):
+        key = 'tafsir:ibn_kathir:en'
+        for codec, module in self.codecs():
+            with self.subTest(codec=codec), self.using(module):
+                Tafsir.objects.all().delete()
+                first = TextDictionary.objects.create(key=key, data=self.text.encode() * 2)
+                old = Tafsir.objects.create(ayah=self.ayahs[0], source='ibn_kathir', text=self.text)
+                self.assertEqual(self.stored_header(old), (codec, first.id))
+
+                second = TextDictionary.objects.create(key=key, data=b'a rebuilt dictionary ' * 50)
+                new = Tafsir.objects.create(ayah=self.ayahs[1], source='ibn_kathir', text=self.text + ' more')
+                self.assertEqual(self.stored_header(new), (codec, second.id))
+
+                self.forget()
+                self.assertEqual(Tafsir.objects.get(id=old.id).text, self.text)
+                self.assertEqual(Tafsir.objects.get(id=new.id).text, self.text + ' more')
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            compressed.decompress(compressed._HEADER.pack(b'x', 0) + b'data')
+
+
+# Transactional, so reads can happen outside atomic() and on_commit runs
+class CorpusRoutingTests(TransactionTestCase):
+
+    def setUp(self):
+        clear_cache()
+        self.router = routers.CorpusRouter()
+        corpus_db = mock.patch.object(routers, 'has_corpus_db', return_value=True)
+        corpus_db.start()
+        self.addCleanup(corpus_db.stop)
+
+    def test_corpus_reads_go_to_the_corpus_database(self):
+        self.assertEqual(self.router.db_for_read(Ayah), routers.CORPUS_DB)
+        self.assertIsNone(self.router.db_for_read(Bookmark))
+        self.assertEqual(self.router.db_for_write(Ayah), 'default')
+
+    def test_use_primary(self):
+        with routers.use_primary():
+            self.assertIsNone(self.router.db_for_read(Ayah))
+        self.assertEqual(self.router.db_for_read(Ayah), routers.CORPUS_DB)
+
+    def test_atomic_block(self):
+        with transaction.atomic():
+            self.assertIsNone(self.router.db_for_read(Ayah))
+        self.assertEqual(self.router.db_for_read(Ayah), routers.CORPUS_DB)
+
+    def test_no_corpus_database(self):
+        with mock.patch.object(routers, 'has_corpus_db', return_value=False):
+            self.assertIsNone(self.router.db_for_read(Ayah))
+
+    def test_edit_without_snapshot_bumps_corpus_version(self):
+        before = caching.stored_version(caching.CORPUS)
+        surah = create_surah()[0].surah
+        after = caching.stored_version(caching.CORPUS)
+        self.assertGreater(after, before)
+
+        surah.name_english = 'The Opening'
+        surah.save()
+        self.assertEqual(caching.stored_version(caching.CORPUS), after + 1)
+        self.assertEqual(caching.version(caching.CORPUS), after + 1)
+
+    def test_edit_with_snapshot_schedules_refresh(self):
+        with override_settings(QURAN_CORPUS_SNAPSHOT='/nonexistent/corpus.sqlite3', QURAN_CORPUS_REFRESH_DELAY=5), \
+                mock.patch.object(replica._deferred, 'schedule') as schedule:
+            create_surah(verses=1)
+        schedule.assert_called_with(5)
+        self.assertEqual(caching.stored_version(caching.CORPUS), 0)
+
+    def test_ingest_edits_are_left_to_publish(self):
+        with routers.use_primary():
+            create_surah(verses=1)
+        self.assertEqual(caching.stored_version(caching.CORPUS), 0)
+
+
+class MetricsCompactionTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        overridden = override_settings(QURAN_METRICS=True, QURAN_METRICS_DIR=self.directory,
+                                       QURAN_METRICS_FLUSH_INTERVAL=1)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        registry = mock.patch.object(metrics, 'registry', metrics.Registry())
+        registry.start()
+        self.addCleanup(registry.stop)
+
+    def write_process(self, name, requests, age=0):
+        """A file as another process's flush leaves it, ``age`` seconds old"""
+        path = os.path.join(self.directory, name)
+        metrics.write_json(path, {
+            'counters': [['quran_http_requests_total', {'view': 'surah-detail'}, requests]],
+            'histograms': [['quran_http_request_duration_seconds', {'view': 'surah-detail'},
+                            [requests] + [0] * len(metrics.LATENCY_BUCKETS) + [requests * 0.001]]],
+        })
+        self.age(name, age)
+
+    def age(self, name, seconds):
+        mtime = time.time() - seconds
+        os.utime(os.path.join(self.directory, name), (mtime, mtime))
+
+    def total(self):
+        line = next(line for line in metrics.render().splitlines()
+                    if line.startswith('quran_http_requests_total{'))
+        return int(line.rpartition(' ')[2])
+
+    def test_exited_process_is_folded_once(self):
+        self.write_process('1-100.json', 5, age=60)
+        self.write_process('2-100.json', 7)
+
+        self.assertEqual(self.total(), 12)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['2-100.json', metrics.RETIRED])
+        self.assertEqual(self.total(), 12)
+
+        self.age('2-100.json', 60)
+        self.assertEqual(self.total(), 12)
+        self.assertEqual(os.listdir(self.directory), [metrics.RETIRED])
+        self.assertIn('quran_http_request_duration_seconds_count{view="surah-detail"} 12', metrics.render())
+
+    def test_files_that_could_not_be_removed_are_not_counted_twice(self):
+        self.write_process('1-100.json', 5, age=60)
+        self.write_process('2-100.json', 7)
+        remove = metrics.remove
+
+        def remove_only_the_lock(path):
+            if path.endswith(metrics.COMPACT_LOCK):
+                remove(path)
+
+        with mock.patch.object(metrics, 'remove', side_effect=remove_only_the_lock):
+            self.assertEqual(self.total(), 12)
+            self.age('2-100.json', 60)
+            self.assertEqual(self.total(), 12)
+            self.assertEqual(self.total(), 12)
+        self.assertEqual(metrics.read_json(os.path.join(self.directory, metrics.RETIRED))['folded'],
+                         ['1-100.json', '2-100.json'])
+
+        self.assertEqual(self.total(), 12)
+        self.assertEqual(os.listdir(self.directory), [metrics.RETIRED])
+        self.assertEqual(self.total(), 12)
+
+
+class TimingsTests(SimpleTestCase):
+
+    def test_pack_round_trip(self):
+        data = timings.pack([(0, 400), (400, 900), (950, 1500)])
+        self.assertEqual(timings.word_count(data), 3)
+        self.assertEqual(timings.segments(data), [[0, 400], [400, 900], [950, 1500]])
+
+    def test_word_at(self):
+        data = timings.pack([(100, 400), (400, 900), (950, 1500)])
+        self.assertIsNone(timings.word_at(data, 50))
+        self.assertEqual(timings.word_at(data, 100), 0)
+        self.assertEqual(timings.word_at(data, 399), 0)
+        self.assertEqual(timings.word_at(data, 400), 1)
+        self.assertIsNone(timings.word_at(data, 920))
+        self.assertEqual(timings.word_at(data, 1499), 2)
+        self.assertIsNone(timings.word_at(data, 1500))
+        self.assertIsNone(timings.word_at(b'', 0))
+
+    def test_word_range(self):
+        data = timings.pack([(0, 400), (400, 900)])
+        self.assertEqual(timings.word_range(data, 1), (400, 900))
+        for index in (-1, 2):
+            with self.assertRaises(IndexError):
+                timings.word_range(data, index)
+
+    def test_positions_are_merged(self):
+        data = timings.from_positions([[2, 500, 800], [1, 0, 500], [2, 800, 900]])
+        self.assertEqual(timings.segments(data), [[0, 500], [500, 900]])
+
+    def test_gaps_keep_word_positions(self):
+        data = timings.from_positions([[1, 0, 500], [3, 600, 1000], [5, 1200, 1500]])
+        self.assertEqual(timings.word_count(data), 5)
+        self.assertEqual(timings.word_range(data, 2), (600, 1000))
+        self.assertEqual(timings.word_range(data, 4), (1200, 1500))
+        self.assertEqual(timings.word_at(data, 700), 2)
+        self.assertEqual(timings.word_at(data, 1300), 4)
+        self.assertIsNone(timings.word_at(data, 550))
+        self.assertIsNone(timings.word_at(data, 1100))
+
+    def test_export_surah(self):
+        rows = [(1, timings.pack([(0, 400), (400, 900)])), (2, timings.pack([(0, 700)]))]
+        blob = timings.export_surah(36, rows)
+        self.assertEqual(timings.HEADER.unpack_from(blob), (timings.MAGIC, timings.VERSION, 36, 2))
+        offset = timings.HEADER.size
+        for number_in_surah, data in rows:
+            self.assertEqual(timings.AYAH_HEADER.unpack_from(blob, offset), (number_in_surah, timings.word_count(data)))
+            offset += timings.AYAH_HEADER.size
+            values = struct.unpack_from(f"<{timings.word_count(data) * 2}I", blob, offset)
+            self.assertEqual(list(values), [*timings.unpack(data)[0], *timings.unpack(data)[1]])
+            offset += len(data)
+        self.assertEqual(offset, len(blob))
+
+
+class ImportTafsirTests(TestCase):
+
+    def test_non_object_lines_are_skipped(self):
+        ayahs = create_surah()
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write('{"verse_key": "1:1", "text": "First"}\n')
+            f.write('["1:2", "a list"]\n')
+            f.write('"a string"\n')
+            f.write('{"surah": 1, "ayah": 3, "text": "Third"}\n')
+        self.addCleanup(os.remove, f.name)
+
+        output = io.StringIO()
+        call_command('import_tafsir', f.name, source='ibn_kathir', stdout=output)
+        self.assertEqual({t.ayah_id: t.text for t in Tafsir.objects.all()}, {ayahs[0].id: 'First', ayahs[2].id: 'Third'})
+        self.assertIn('Skipped 2 entries', output.getvalue())
@@ -0,0 +1,119 @@
+"""
+Packed word timings.
+
+One ayah's timings for one reciter are stored as a single blob of
+little-endian uint32 milliseconds: all word start times followed by all
+word end times (``starts[0..n) + ends[0..n)``). Start times are sorted, so
+"which word is playing at t" is a bisect over the first half.
+
+Surah export format (all little-endian)::
+
+    b'QTIM' u8 version u16 surah u16 ayah_count
+    then per ayah: u16 number_in_surah u16 word_count
+                   u32 starts[word_count] u32 ends[word_count]
+"""
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+MAGIC = b'QTIM'
+VERSION = 1
+
+HEADER = struct.Struct('<4sBHH')
+AYAH_HEADER = struct.Struct('<HH')
+
+
+def _array(data=b''):
+    values = array('I')
+    values.frombytes(bytes(data))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _bytes(values):
+    if sys.byteorder == 'big':
+        values = array('I', values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def pack(segments):
+    """Pack ``[(start_ms, end_ms), ...]`` (word order) into a blob"""
+    segments = [(int(start), int(end)) for start, end in segments]
+    return _bytes(array('I', [start for start, _ in segments] + [end for _, end in segments]))
+
+
+def from_positions(segments):
+    """Pack the common ``[[word_position, start_ms, end_ms], ...]`` format.
+
+    Word positions are 1-based and each word is stored at its position, so
+    index ``i`` is always word ``i + 1``. Entries for the same word are
+    merged; a word with no entry gets an empty segment at the next word's
+    start, which keeps the start times sorted and is never "playing".
+    """
+    words = {}
+    for segment in segments:
+        position, start, end = int(segment[0]), int(segment[1]), int(segment[2])
+        if position < 1:
+            continue
+        if position in words:
+            first, last = words[position]
+            words[position] = (min(first, start), max(last, end))
+        else:
+            words[position] = (start, end)
+
+    packed = []
+    following = 0
+    for position in range(max(words, default=0), 0, -1):
+        if position in words:
+            following = words[position][0]
+        packed.append(words.get(position, (following, following)))
+    packed.reverse()
+    return pack(packed)
+
+
+def unpack(data):
+    """Return ``(starts, ends)`` arrays"""
+    values = _array(data)
+    count = len(values) // 2
+    return values[:count], values[count:]
+
+
+def word_count(data):
+    return len(data) // 8
+
+
+def segments(data):
+    """``[[start_ms, end_ms], ...]`` in word order"""
+    starts, ends = unpack(data)
+    return [[start, end] for start, end in zip(starts, ends)]
+
+
+def word_at(data, ms):
+    """0-based index of the word playing at ``ms``, or None between words"""
+    starts, ends = unpack(data)
+    index = bisect_right(starts, ms) - 1
+    if index < 0 or ms >= ends[index]:
+        return None
+    return index
+
+
+def word_range(data, index):
+    """``(start_ms, end_ms)`` of word ``index``; raises IndexError"""
+    starts, ends = unpack(data)
+    if index < 0:
+        raise IndexError(index)
+    return starts[index], ends[index]
+
+
+def export_surah(surah_number, rows):
+    """Concatenate ``(number_in_surah, blob)`` rows into one surah payload"""
+    rows = list(rows)
+    parts = [HEADER.pack(MAGIC, VERSION, surah_number, len(rows))]
+    for number_in_surah, data in rows:
+        data = bytes(data)
+        parts.append(AYAH_HEADER.pack(number_in_surah, word_count(data)))
+        parts.append(data)
+    return b''.join(parts)
@@ -0,0 +1,82 @@
+"""
+Per-edition ayah translations.
+
+Translations live in their own table keyed by (language, edition, ayah).
+``with_translations`` adds one filtered LEFT JOIN per requested edition,
+so a request only reads the editions it asks for no matter how many are
+stored.
+"""
+import re
+
+from django.db.models import F, FilteredRelation, Q
+
+DEFAULT_EDITION = 'default'
+
+# Edition used when a request names only the language
+LANGUAGE_EDITIONS = {
+    'en': 'asad',
+}
+
+# Editions joined when the request does not ask for any
+DEFAULT_TRANSLATIONS = [('en', 'asad'), ('bn', DEFAULT_EDITION)]
+
+# Guard against joining an unbounded number of editions in one query
+MAX_TRANSLATIONS = 5
+
+# ISO 639 language codes have no underscore, so "<language>_<edition>"
+# aliases cannot collide
+LANGUAGE_RE = re.compile(r'^[a-z]{2,3}$')
+EDITION_RE = re.compile(r'^[a-z0-9_]{1,50}$')
+
+
+def default_edition(language):
+    return LANGUAGE_EDITIONS.get(language, DEFAULT_EDITION)
+
+
+def parse_translations(value):
+    """Parse ``"en,bn,en:sahih"`` into ``[(language, edition), ...]``.
+
+    Returns DEFAULT_TRANSLATIONS for an empty value; raises ValueError for
+    malformed or too many entries.
+    """
+    if not value:
+        return list(DEFAULT_TRANSLATIONS)
+    editions = []
+    for item in value.split(','):
+        language, _, edition = item.strip().lower().partition(':')
+        edition = edition or default_edition(language)
+        if not LANGUAGE_RE.match(language) or not EDITION_RE.match(edition):
+            raise ValueError(f"Invalid translation: {item}")
+        if (language, edition) not in editions:
+            editions.append((language, edition))
+    if len(editions) > MAX_TRANSLATIONS:
+        raise ValueError(f"At most {MAX_TRANSLATIONS} translations per request")
+    return editions
+
+
+def translation_key(language, edition):
+    """Key in the API ``translations`` dict: the language for its default edition"""
+    if edition == default_edition(language):
+        return language
+    return f"{language}:{edition}"
+
+
+def translation_alias(language, edition):
+    """Attribute the joined text is annotated as"""
+    if edition == default_edition(language):
+        return f"translation_{language}"
+    return f"translation_{language}_{edition}"
+
+
+def with_translations(queryset, editions):
+    """Annotate an Ayah queryset with the text of each requested edition"""
+    for language, edition in editions:
+        alias = translation_alias(language, edition)
+        relation = f"_{alias}_join"
+        queryset = queryset.annotate(**{
+            relation: FilteredRelation(
+                'translations',
+                condition=Q(translations__language=language, translations__edition=edition),
+            ),
+        }).annotate(**{alias: F(f"{relation}__text")})
+    return queryset
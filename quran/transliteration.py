@@ -0,0 +1,184 @@
+"""
+Table-driven Arabic -> Latin transliteration.
+
+All per-character work happens inside ``str.translate`` with a table that is
+compiled once at import time.  Multi-character rules (lam-alef, shadda
+gemination) run as a single precompiled regex pass before the translate.
+The batch helpers join a whole ayah/surah into one string so the corpus is
+transliterated in a handful of C-level passes instead of one Python loop per
+character.
+"""
+import re
+
+# Letter -> Latin mapping (kept compatible with the original ingest helpers)
+LETTERS = {
+    'ا': 'a', 'أ': 'a', 'إ': 'i', 'آ': 'aa', 'ٱ': 'a', 'ى': 'a',
+    'ب': 'b', 'ت': 't', 'ث': 'th', 'ج': 'j', 'ح': 'h',
+    'خ': 'kh', 'د': 'd', 'ذ': 'dh', 'ر': 'r', 'ز': 'z',
+    'س': 's', 'ش': 'sh', 'ص': 's', 'ض': 'd', 'ط': 't',
+    'ظ': 'dh', 'ع': 'a', 'غ': 'gh', 'ف': 'f', 'ق': 'q',
+    'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n', 'ه': 'h',
+    'و': 'w', 'ي': 'y', 'ة': 'h', 'ء': "'", 'ؤ': "'u",
+    'ئ': "'i",
+}
+
+# Multi-character sequences and presentation-form ligatures
+DIGRAPHS = {
+    'لا': 'la',
+    'ﻻ': 'la', 'ﻼ': 'la', 'ﻷ': 'la', 'ﻸ': 'la',
+    'ﻹ': 'li', 'ﻺ': 'li', 'ﻵ': 'laa', 'ﻶ': 'laa',
+}
+
+# Harakat, superscript alef, tatweel and Quranic annotation marks (inclusive
+# codepoint ranges) - dropped from the output
+STRIPPED_RANGES = [(0x064B, 0x065F), (0x0670, 0x0670), (0x0640, 0x0640), (0x06D6, 0x06ED)]
+
+SHADDA = '\u0651'
+
+# Shadda, optionally preceded by the short vowel typed before it
+GEMINATION = '[\u064B-\u0650\u0652]?' + SHADDA
+
+# Separator used to glue batches together; never occurs in Quran text
+RECORD_SEP = '\x1e'
+
+# Upper bound on memoised word forms (the Quran has ~19k distinct forms)
+CACHE_SIZE = 50000
+
+
+class Transliterator:
+    """Precompiled transliteration engine"""
+
+    def __init__(self, letters=None, digraphs=None, geminate=True, cache_size=CACHE_SIZE):
+        letters = LETTERS if letters is None else letters
+        digraphs = DIGRAPHS if digraphs is None else digraphs
+
+        table = {ord(char): latin for char, latin in letters.items()}
+        for first, last in STRIPPED_RANGES:
+            for codepoint in range(first, last + 1):
+                table[codepoint] = None
+
+        # Single-character entries (ligatures) live in the table; sequences
+        # the table already renders identically need no regex pass at all
+        self.digraphs = {}
+        for seq, latin in digraphs.items():
+            if len(seq) == 1:
+                table[ord(seq)] = latin
+            elif seq.translate(table) != latin:
+                self.digraphs[seq] = latin
+        self.table = table
+
+        # Longest sequences first so a digraph never loses to its prefix
+        self.digraph_pattern = re.compile('|'.join(
+            re.escape(seq) for seq in sorted(self.digraphs, key=len, reverse=True)
+        )) if self.digraphs else None
+
+        self.gemination_pattern = re.compile(GEMINATION) if geminate else None
+
+        self.cache_size = cache_size
+        self._cache = {}
+
+    def _geminate(self, text):
+        """Double every letter carrying shadda: رَبِّ -> رببِ"""
+        parts = self.gemination_pattern.split(text)
+        if len(parts) == 1:
+            return text
+        out = []
+        for part in parts[:-1]:
+            out.append(part)
+            if part:
+                out.append(part[-1])
+        out.append(parts[-1])
+        return ''.join(out)
+
+    def _apply(self, text):
+        if self.digraph_pattern is not None:
+            text = self.digraph_pattern.sub(lambda match: self.digraphs[match.group(0)], text)
+        if self.gemination_pattern is not None and SHADDA in text:
+            text = self._geminate(text)
+        return text.translate(self.table)
+
+    def _remember(self, fresh):
+        """Add new entries; start a new cache generation when full.
+
+        The old dict is rebound, never cleared, so concurrent readers holding
+        a reference to it keep a consistent view.
+        """
+        cache = self._cache
+        if len(cache) + len(fresh) > self.cache_size:
+            self._cache = dict(fresh) if len(fresh) <= self.cache_size else {}
+        else:
+            cache.update(fresh)
+
+    def transliterate(self, word):
+        """Transliterate a single word or phrase"""
+        if not word:
+            return ''
+        latin = self._cache.get(word)
+        if latin is None:
+            latin = self._apply(word)
+            self._remember({word: latin})
+        return latin
+
+    def transliterate_words(self, words):
+        """Transliterate a list of words, each distinct form in one shared pass"""
+        words = list(words)
+        if not words:
+            return []
+
+        cache = self._cache
+        missing = [word for word in dict.fromkeys(words) if word not in cache]
+        if not missing:
+            return [cache[word] for word in words]
+
+        fresh = dict(zip(missing, self.translate_uncached(missing)))
+        self._remember(fresh)
+        return [fresh[word] if word in fresh else cache[word] for word in words]
+
+    def translate_uncached(self, texts):
+        """Transliterate a list of texts in one pass without touching the cache"""
+        texts = [text or '' for text in texts]
+        if not texts:
+            return []
+        return self._apply(RECORD_SEP.join(texts)).split(RECORD_SEP)
+
+    def transliterate_texts(self, texts):
+        """Transliterate whole ayahs (or any list of texts) in one pass"""
+        return self.translate_uncached(texts)
+
+    def transliterate_ayah_words(self, texts):
+        """Split each ayah into words and transliterate all of them at once.
+
+        Returns one ``(arabic_words, latin_words)`` tuple per ayah.
+        """
+        split_texts = [(text or '').split() for text in texts]
+        flat = self.transliterate_words(word for words in split_texts for word in words)
+
+        result = []
+        offset = 0
+        for words in split_texts:
+            result.append((words, flat[offset:offset + len(words)]))
+            offset += len(words)
+        return result
+
+
+default_transliterator = Transliterator()
+
+
+def transliterate(word):
+    """Transliterate a single word with the default engine"""
+    return default_transliterator.transliterate(word)
+
+
+def transliterate_words(words):
+    """Transliterate a list of words with the default engine"""
+    return default_transliterator.transliterate_words(words)
+
+
+def transliterate_texts(texts):
+    """Transliterate a list of ayah texts with the default engine"""
+    return default_transliterator.transliterate_texts(texts)
+
+
+def transliterate_ayah_words(texts):
+    """Word-level batch transliteration for a list of ayah texts"""
+    return default_transliterator.transliterate_ayah_words(texts)
@@ -30,6 +30,11 @@ urlpatterns = [
     # REST Framework API URLs
     path('api/', include(router.urls)),
     path('api/bismillah/', views.BismillahView.as_view(), name='bismillah'),
+    path('api/words/', views.word_batch, name='word-batch'),
+    path('api/sync/', views.SyncView.as_view(), name='annotation-sync'),
+    path('api/progress/', views.ProgressView.as_view(), name='reading-progress'),
+    path('audio/<int:reciter_id>/<str:file_key>.mp3', views.stream_audio, name='audio-stream'),
+    path('metrics', views.metrics_view, name='metrics'),
 
     # path('api/verse/<int:ayah_id>/word/<int:word_index>/', 
     #      views.WordDetailView.as_view({'get': 'retrieve'}), 
@@ -6,11 +6,23 @@ from rest_framework import viewsets, permissions, status, generics
 from rest_framework.views import APIView
 from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import Count, Q
+from django.conf import settings
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified,
+    HttpResponseRedirect, StreamingHttpResponse,
+)
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils import timezone
+from django.utils.http import http_date
 from rest_framework.pagination import PageNumberPagination
 from .models import *
 from .serializers import *
+from . import annotations, audio, audio_store, instrumentation, metrics, payloads, positions, progress, sync, timings, translations, words
 import json
 
 # Custom pagination
@@ -19,6 +31,38 @@ class StandardPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+def filter_by_position(queryset, to_range, value):
+    """Restrict ayahs to a page/juz via the global ayah number range"""
+    try:
+        first, last = to_range(int(value))
+    except ValueError:
+        return queryset.none()
+    return queryset.filter(number__range=(first, last))
+
+def requested_translations(request):
+    """Translation editions asked for with ?translations=en,bn,en:sahih"""
+    try:
+        return translations.parse_translations(request.query_params.get('translations'))
+    except ValueError as e:
+        raise ValidationError({'translations': str(e)})
+
+def position_verses(params, editions):
+    """Cached verses when the only filter is ?page= or ?juz=, otherwise None"""
+    filters = [name for name in ('surah', 'page', 'juz') if params.get(name)]
+    if filters not in (['page'], ['juz']):
+        return None
+    try:
+        return payloads.position_verses(filters[0], int(params[filters[0]]), editions)
+    except ValueError:
+        return []
+
+def with_user_flags(request, verses):
+    """Add is_bookmarked/bookmark_type/has_note for the signed-in user when ?user_flags=1"""
+    if request.query_params.get('user_flags') in ('1', 'true') and request.user.is_authenticated:
+        with instrumentation.span('user_flags'):
+            return annotations.overlay(verses, request.user)
+    return verses
+
 # Template Views
 def home(request):
     """Home page view"""
@@ -58,9 +102,61 @@ class SurahViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=True, methods=['get'])
     def verses(self, request, pk=None):
         surah = self.get_object()
-        verses = Ayah.objects.filter(surah=surah)
-        serializer = AyahSerializer(verses, many=True)
-        return Response(serializer.data)
+        verses = payloads.surah_verses(surah.number, requested_translations(request))
+        return Response(with_user_flags(request, verses))
+    
+    @action(detail=True, methods=['get'])
+    def playlist(self, request, pk=None):
+        """Ordered audio URLs for a surah (optionally ?from=&to=) for one reciter"""
+        recitation_id = request.query_params.get('recitation', audio.DEFAULT_RECITER_ID)
+        try:
+            surah_number = int(pk)
+            recitation, items = audio.get_playlist(surah_number, recitation_id)
+        except ValueError:
+            return Response({'error': 'Surah not found'}, status=404)
+        
+        total = positions.SURAH_AYAH_COUNTS[surah_number - 1]
+        try:
+            start = int(request.query_params.get('from', 1))
+            end = int(request.query_params.get('to', total))
+        except ValueError:
+            return Response({'error': 'Invalid ayah range'}, status=400)
+        if not 1 <= start <= end:
+            return Response({'error': 'Invalid ayah range'}, status=400)
+        
+        if start > 1 or end < total:
+            items = [item for item in items if start <= item['number_in_surah'] <= end]
+        
+        response = Response({
+            'surah': surah_number,
+            'reciter_id': recitation['reciter_id'] if recitation else None,
+            'reciter_name': recitation['name'] if recitation else '',
+            'count': len(items),
+            'items': items,
+        })
+        patch_cache_control(response, public=True, max_age=audio.PLAYLIST_CACHE_TIMEOUT)
+        return response
+    
+    @action(detail=True, methods=['get'])
+    def timings(self, request, pk=None):
+        """All word timings of a surah for one reciter as one binary payload"""
+        try:
+            surah_number = int(pk)
+            positions.surah_range(surah_number)
+        except ValueError:
+            return Response({'error': 'Surah not found'}, status=404)
+        try:
+            recitation_id = int(request.query_params.get('recitation', audio.DEFAULT_RECITER_ID))
+        except ValueError:
+            return Response({'error': 'recitation must be an integer'}, status=400)
+        
+        rows = AyahTiming.objects.filter(
+            recitation__reciter_id=recitation_id, ayah__surah_id=surah_number
+        ).order_by('ayah__number_in_surah').values_list('ayah__number_in_surah', 'segments')
+        
+        response = HttpResponse(timings.export_surah(surah_number, rows), content_type='application/octet-stream')
+        patch_cache_control(response, public=True, max_age=audio.PLAYLIST_CACHE_TIMEOUT)
+        return response
 
 class AyahViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = AyahSerializer
@@ -68,7 +164,7 @@ class AyahViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = StandardPagination
     
     def get_queryset(self):
-        queryset = Ayah.objects.all().select_related('surah')
+        queryset = payloads.ayah_columns(Ayah.objects.all(), requested_translations(self.request))
         
         surah = self.request.query_params.get('surah', None)
         if surah:
@@ -76,18 +172,55 @@ class AyahViewSet(viewsets.ReadOnlyModelViewSet):
         
         page = self.request.query_params.get('page', None)
         if page:
-            queryset = queryset.filter(page_number=page)
+            queryset = filter_by_position(queryset, positions.page_range, page)
         
         juz = self.request.query_params.get('juz', None)
         if juz:
-            queryset = queryset.filter(juz_number=juz)
+            queryset = filter_by_position(queryset, positions.juz_range, juz)
         
         return queryset
     
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['translations'] = requested_translations(self.request)
+        return context
+    
+    def list(self, request, *args, **kwargs):
+        verses = position_verses(request.query_params, requested_translations(request))
+        if verses is not None:
+            # Whole pages and juz are served from the shared cache
+            page = self.paginate_queryset(verses)
+            if page is not None:
+                return self.get_paginated_response(with_user_flags(request, page))
+            return Response(with_user_flags(request, verses))
+        
+        with instrumentation.span('serialize'):
+            response = super().list(request, *args, **kwargs)
+        if isinstance(response.data, dict) and 'results' in response.data:
+            response.data['results'] = with_user_flags(request, response.data['results'])
+        else:
+            response.data = with_user_flags(request, response.data)
+        return response
+    
     @action(detail=True, methods=['get'])
     def tafsir(self, request, pk=None):
-        ayah = self.get_object()
-        tafsirs = Tafsir.objects.filter(ayah=ayah)
+        """Tafsir texts of an ayah, optionally narrowed with ?source=&language="""
+        try:
+            ayah_id = int(pk)
+        except ValueError:
+            raise Http404
+        # Filtering in the query means only the requested bodies are read and decompressed
+        tafsirs = Tafsir.objects.filter(ayah_id=ayah_id)
+        source = request.query_params.get('source')
+        if source:
+            tafsirs = tafsirs.filter(source=source)
+        language = request.query_params.get('language')
+        if language:
+            tafsirs = tafsirs.filter(language=language)
+        
+        tafsirs = list(tafsirs)
+        if not tafsirs and not Ayah.objects.filter(pk=ayah_id).exists():
+            raise Http404
         serializer = TafsirSerializer(tafsirs, many=True)
         return Response(serializer.data)
     
@@ -96,26 +229,144 @@ class AyahViewSet(viewsets.ReadOnlyModelViewSet):
         ayah = self.get_object()
         recitation_id = request.query_params.get('recitation', 1)
         
-        try:
-            recitation = Recitation.objects.get(reciter_id=recitation_id)
-            audio_url = recitation.audio_url_template.format(
-                surah=str(ayah.surah.number).zfill(3),
-                ayah=str(ayah.number_in_surah).zfill(3)
-            )
-        except:
-            audio_url = ayah.audio_url or f"https://everyayah.com/data/Alafasy_128kbps/{str(ayah.surah.number).zfill(3)}{str(ayah.number_in_surah).zfill(3)}.mp3"
+        audio_url = audio.resolve_audio_url(ayah, recitation_id)
         
         return Response({
             'audio_url': audio_url, 
-            'ayah': f"{ayah.surah.number}:{ayah.number_in_surah}",
+            'ayah': positions.verse_key(ayah.surah_id, ayah.number_in_surah),
             'surah_name': ayah.surah.name_english,
             'surah_name_translation_bn': ayah.surah.name_translation_bn,
             'ayah_number': ayah.number_in_surah
         })
+    
+    @action(detail=True, methods=['get'])
+    def timings(self, request, pk=None):
+        """Word timings for one reciter; ?t=<ms> finds the word playing, ?word=<i> its time range"""
+        try:
+            ayah_id = int(pk)
+        except ValueError:
+            raise Http404
+        try:
+            recitation_id = int(request.query_params.get('recitation', audio.DEFAULT_RECITER_ID))
+        except ValueError:
+            return Response({'error': 'recitation must be an integer'}, status=400)
+        data = AyahTiming.objects.filter(
+            recitation__reciter_id=recitation_id, ayah_id=ayah_id
+        ).values_list('segments', flat=True).first()
+        if data is None:
+            return Response({'error': 'Timings not found'}, status=404)
+        
+        try:
+            if 'word' in request.query_params:
+                index = int(request.query_params['word'])
+                start, end = timings.word_range(data, index)
+                return Response({'word': index, 'start': start, 'end': end})
+            if 't' in request.query_params:
+                index = timings.word_at(data, int(request.query_params['t']))
+                if index is None:
+                    return Response({'word': None})
+                start, end = timings.word_range(data, index)
+                return Response({'word': index, 'start': start, 'end': end})
+        except ValueError:
+            return Response({'error': 'Invalid query'}, status=400)
+        except IndexError:
+            return Response({'error': 'Word not found'}, status=404)
+        
+        return Response({'words': timings.word_count(data), 'segments': timings.segments(data)})
+
+# Largest upsert + delete list accepted by one bulk request
+MAX_BULK_ITEMS = 5000
 
-class UserNoteViewSet(viewsets.ModelViewSet):
+class BulkAnnotationMixin:
+    """POST <list>/bulk/ upserts and deletes many of the user's annotations in one transaction"""
+    bulk_item_serializer_class = None
+    bulk_update_fields = []
+    bulk_delete_filters = []
+    change_kind = None
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Body: {"upsert": [{"ayah": .., ...}], "delete": [id, ...], "delete_matching": {..}}
+
+        Deletes are applied first, so an upsert of a deleted annotation
+        creates it again and the response describes the final state.
+        """
+        if not isinstance(request.data, dict):
+            return Response({'error': 'The body must be a JSON object'}, status=400)
+        upserts = request.data.get('upsert') or []
+        deletes = request.data.get('delete') or []
+        matching = request.data.get('delete_matching') or {}
+        if not isinstance(upserts, list) or not isinstance(deletes, list) or not isinstance(matching, dict):
+            return Response({'error': 'upsert and delete must be lists, delete_matching an object'}, status=400)
+        if len(upserts) + len(deletes) > MAX_BULK_ITEMS:
+            return Response({'error': f"At most {MAX_BULK_ITEMS} items per request"}, status=400)
+        unknown = set(matching) - set(self.bulk_delete_filters)
+        if unknown:
+            return Response({'error': f"Cannot delete by {', '.join(sorted(unknown))}"}, status=400)
+        if not all(isinstance(value, str) for value in matching.values()):
+            return Response({'error': 'delete_matching values must be strings'}, status=400)
+        try:
+            delete_ids = [int(pk) for pk in deletes]
+        except (TypeError, ValueError):
+            return Response({'error': 'delete must list integer ids'}, status=400)
+        
+        # Validate every item first, checking ayah ids in one query
+        valid, errors = {}, {}
+        for index, item in enumerate(upserts):
+            serializer = self.bulk_item_serializer_class(data=item)
+            if serializer.is_valid():
+                valid[index] = serializer.validated_data
+            else:
+                errors[index] = serializer.errors
+        known = set(Ayah.objects.filter(id__in={data['ayah'] for data in valid.values()}).values_list('id', flat=True))
+        rows = {}
+        for index, data in list(valid.items()):
+            if data['ayah'] not in known:
+                errors[index] = {'ayah': [f"Invalid pk \"{data['ayah']}\" - object does not exist."]}
+                del valid[index]
+                continue
+            # A later item for the same ayah wins
+            rows[data['ayah']] = {name: value for name, value in data.items() if name != 'ayah'}
+        
+        model = self.get_queryset().model
+        with transaction.atomic(), sync.recording_suspended():
+            condition = Q(id__in=delete_ids)
+            if matching:
+                condition |= Q(**matching)
+            deleted_ids = set(self.get_queryset().filter(condition).values_list('id', flat=True))
+            if deleted_ids:
+                self.get_queryset().filter(id__in=deleted_ids).delete()
+            
+            model.objects.bulk_create(
+                [model(user=request.user, ayah_id=ayah_id, **fields) for ayah_id, fields in rows.items()],
+                update_conflicts=True, unique_fields=['user', 'ayah'], update_fields=self.bulk_update_fields,
+            )
+            ids = dict(self.get_queryset().filter(ayah_id__in=rows).values_list('ayah_id', 'id'))
+            
+            sync.record(request.user.id, self.change_kind, deleted_ids, deleted=True)
+            sync.record(request.user.id, self.change_kind, ids.values())
+        
+        upsert_results = [
+            {'index': index, 'status': 'error', 'errors': errors[index]} if index in errors
+            else {'index': index, 'status': 'ok', 'id': ids[valid[index]['ayah']], 'ayah': valid[index]['ayah']}
+            for index in range(len(upserts))
+        ]
+        delete_results = [
+            {'id': pk, 'status': 'deleted' if pk in deleted_ids else 'not_found'}
+            for pk in delete_ids
+        ]
+        return Response({
+            'upserted': len(ids),
+            'deleted': len(deleted_ids),
+            'results': {'upsert': upsert_results, 'delete': delete_results},
+        })
+
+class UserNoteViewSet(BulkAnnotationMixin, viewsets.ModelViewSet):
     serializer_class = UserNoteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    bulk_item_serializer_class = UserNoteBulkItemSerializer
+    bulk_update_fields = ['note', 'updated_at']
+    change_kind = AnnotationChange.KIND_NOTE
     
     def get_queryset(self):
         return UserNote.objects.filter(user=self.request.user)
@@ -123,9 +374,13 @@ class UserNoteViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class BookmarkViewSet(viewsets.ModelViewSet):
+class BookmarkViewSet(BulkAnnotationMixin, viewsets.ModelViewSet):
     serializer_class = BookmarkSerializer
     permission_classes = [permissions.IsAuthenticated]
+    bulk_item_serializer_class = BookmarkBulkItemSerializer
+    bulk_update_fields = ['bookmark_type', 'updated_at']
+    bulk_delete_filters = ['bookmark_type']
+    change_kind = AnnotationChange.KIND_BOOKMARK
     
     def get_queryset(self):
         return Bookmark.objects.filter(user=self.request.user)
@@ -133,40 +388,133 @@ class BookmarkViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+class SyncView(APIView):
+    """Bookmark and note changes after ?cursor= (0 for everything), at most ?limit= per call"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            cursor = int(request.query_params.get('cursor', 0))
+            limit = int(request.query_params.get('limit', sync.DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': 'cursor and limit must be integers'}, status=400)
+        limit = max(1, min(limit, sync.MAX_LIMIT))
+        
+        changes, next_cursor, has_more = sync.changes_since(request.user, cursor, limit)
+        changed, deleted = sync.split_changes(changes)
+        
+        bookmarks = Bookmark.objects.filter(user=request.user, id__in=changed[AnnotationChange.KIND_BOOKMARK])
+        notes = UserNote.objects.filter(user=request.user, id__in=changed[AnnotationChange.KIND_NOTE])
+        context = {'request': request}
+        return Response({
+            'cursor': next_cursor,
+            'has_more': has_more,
+            'bookmarks': BookmarkSerializer(bookmarks, many=True, context=context).data,
+            'notes': UserNoteSerializer(notes, many=True, context=context).data,
+            'deleted': {
+                'bookmarks': deleted[AnnotationChange.KIND_BOOKMARK],
+                'notes': deleted[AnnotationChange.KIND_NOTE],
+            },
+        })
+
+class ProgressView(APIView):
+    """Last-read position (GET, ?surah= adds per-ayah read counts) and reading events (POST {"ayah": id})"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        data = {'ayah': None, 'verse_key': None, 'read_at': None}
+        position = progress.last_position(request.user)
+        if position is not None:
+            ayah_id, read_at = position
+            # None when the ayah was deleted after it was read
+            verse = Ayah.objects.filter(id=ayah_id).values_list('surah_id', 'number_in_surah').first()
+            if verse is not None:
+                data.update({
+                    'ayah': ayah_id,
+                    'verse_key': positions.verse_key(*verse),
+                    'read_at': read_at,
+                })
+        
+        if request.query_params.get('surah'):
+            try:
+                surah = int(request.query_params['surah'])
+            except ValueError:
+                return Response({'error': 'Invalid surah'}, status=400)
+            ayahs = dict(Ayah.objects.filter(surah_id=surah).values_list('id', 'number_in_surah'))
+            data['reads'] = {
+                positions.verse_key(surah, ayahs[ayah_id]): {'count': count, 'last_read_at': last_read_at}
+                for ayah_id, (count, last_read_at) in progress.reads(request.user, ayahs).items()
+            }
+        return Response(data)
+    
+    def post(self, request):
+        # Buffered: the write reaches the database on the next flush
+        try:
+            progress.record(request.user.id, int(request.data.get('ayah')), timezone.now())
+        except (TypeError, ValueError):
+            return Response({'error': 'A valid ayah id is required'}, status=400)
+        return Response(status=status.HTTP_202_ACCEPTED)
+
 class RecitationViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Recitation.objects.all()
     serializer_class = RecitationSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    
+    def list(self, request, *args, **kwargs):
+        return Response(payloads.recitation_list())
 
 class WordDetailView(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
     def retrieve(self, request, ayah_id=None, word_index=None):
-        try:
-            word = WordMeaning.objects.get(ayah_id=ayah_id, word_index=word_index)
-            return Response({
-                'arabic': word.arabic_word,
-                'transliteration': word.transliteration,
-                'meaning': word.meaning_en,
-                'pronunciation_audio': word.pronunciation_audio,
-                'root': word.root_word,
-            })
-        except WordMeaning.DoesNotExist:
-            try:
-                ayah = Ayah.objects.get(id=ayah_id)
-                words = ayah.text_uthmani.split()
-                if word_index < len(words):
-                    return Response({
-                        'arabic': words[word_index],
-                        'transliteration': f"word_{word_index + 1}",
-                        'meaning': 'Meaning not available',
-                        'pronunciation_audio': '',
-                        'root': 'N/A',
-                    })
-            except:
-                pass
-            
-            return Response({'error': 'Word not found'}, status=404)
+        # Served from the cached batch, which already holds the transliterated
+        # text_uthmani fallback for ayahs without WordMeaning rows
+        number = Ayah.objects.filter(id=ayah_id).values_list('number', flat=True).first()
+        if number is not None:
+            for ayah_words in words.get_words(number, number).values():
+                for word in ayah_words:
+                    if word['index'] == word_index:
+                        return Response({
+                            'arabic': word['arabic'],
+                            'transliteration': word['transliteration'],
+                            'meaning': word['meaning'],
+                            'pronunciation_audio': word['pronunciation_audio'],
+                            'root': word['root'],
+                        })
+        
+        return Response({'error': 'Word not found'}, status=404)
+
+@api_view(['GET'])
+def word_batch(request):
+    """All words of ?verse=2:255, ?page=<n> or ?surah=<n> (optionally &from=&to=) in one call"""
+    params = request.query_params
+    start = end = None
+    try:
+        if 'verse' in params:
+            first = last = positions.parse_verse_key(params['verse'])
+        elif 'page' in params:
+            first, last = positions.page_range(int(params['page']))
+        elif 'surah' in params:
+            surah_number = int(params['surah'])
+            first, last = positions.surah_range(surah_number)
+            # Sub-ranges are cut from the cached whole-surah batch
+            start = int(params.get('from', 1))
+            end = int(params.get('to', last - first + 1))
+            if not 1 <= start <= end:
+                raise ValueError(f"Invalid ayah range {start}-{end}")
+        else:
+            return Response({'error': 'One of verse, page or surah is required'}, status=400)
+        verses = words.get_words(first, last)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    
+    if start is not None and (start > 1 or end < last - first + 1):
+        keys = {positions.verse_key(surah_number, n) for n in range(start, end + 1)}
+        verses = {key: ayah_words for key, ayah_words in verses.items() if key in keys}
+    
+    response = Response({'count': len(verses), 'verses': verses})
+    patch_cache_control(response, public=True, max_age=words.WORDS_CACHE_TIMEOUT)
+    return response
 
 # Simple API Views for frontend
 @api_view(['GET'])
@@ -181,14 +529,14 @@ def get_surah_detail(request, surah_number):
     """Get single surah with verses"""
     try:
         surah = Surah.objects.get(number=surah_number)
-        verses = Ayah.objects.filter(surah=surah).order_by('number_in_surah')
+        verses = payloads.surah_verses(surah.number, requested_translations(request))
         
-        surah_serializer = SurahSerializer(surah)
-        verses_serializer = AyahSerializer(verses, many=True)
+        with instrumentation.span('serialize'):
+            surah_data = SurahSerializer(surah).data
         
         return Response({
-            'surah': surah_serializer.data,
-            'verses': verses_serializer.data
+            'surah': surah_data,
+            'verses': with_user_flags(request, verses)
         })
     except Surah.DoesNotExist:
         return Response({'error': 'Surah not found'}, status=404)
@@ -199,39 +547,38 @@ def get_verses(request):
     surah = request.GET.get('surah')
     page = request.GET.get('page')
     
-    queryset = Ayah.objects.all()
+    editions = requested_translations(request)
+    verses = position_verses(request.GET, editions)
+    if verses is not None:
+        return Response(with_user_flags(request, verses))
+    
+    queryset = payloads.ayah_columns(Ayah.objects.all(), editions)
     
     if surah:
         queryset = queryset.filter(surah__number=surah)
     
     if page:
-        queryset = queryset.filter(page_number=page)
+        queryset = filter_by_position(queryset, positions.page_range, page)
     
     queryset = queryset.order_by('surah__number', 'number_in_surah')
     
-    serializer = AyahSerializer(queryset, many=True)
-    return Response(serializer.data)
+    with instrumentation.span('serialize'):
+        verses = AyahSerializer(queryset, many=True, context={'translations': editions}).data
+    return Response(with_user_flags(request, verses))
 
 # Direct API endpoints for frontend compatibility
 @api_view(['GET'])
 def ayah_audio_direct(request, ayah_id):
     """Direct audio endpoint for frontend compatibility"""
     try:
-        ayah = Ayah.objects.get(id=ayah_id)
+        ayah = Ayah.objects.select_related('surah').get(id=ayah_id)
         recitation_id = request.GET.get('recitation', 1)
         
-        try:
-            recitation = Recitation.objects.get(reciter_id=recitation_id)
-            audio_url = recitation.audio_url_template.format(
-                surah=str(ayah.surah.number).zfill(3),
-                ayah=str(ayah.number_in_surah).zfill(3)
-            )
-        except:
-            audio_url = ayah.audio_url or f"https://everyayah.com/data/Alafasy_128kbps/{str(ayah.surah.number).zfill(3)}{str(ayah.number_in_surah).zfill(3)}.mp3"
+        audio_url = audio.resolve_audio_url(ayah, recitation_id)
         
         return Response({
             'audio_url': audio_url, 
-            'ayah': f"{ayah.surah.number}:{ayah.number_in_surah}",
+            'ayah': positions.verse_key(ayah.surah_id, ayah.number_in_surah),
             'surah_name': ayah.surah.name_english,
             'surah_name_translation_bn': ayah.surah.name_translation_bn,
             'ayah_number': ayah.number_in_surah,
@@ -242,13 +589,84 @@ def ayah_audio_direct(request, ayah_id):
     
 
 
+# Mirrored recitation files change only when re-downloaded; the ETag
+# catches that case
+AUDIO_CACHE_MAX_AGE = 60 * 60 * 24 * 30
+
+def stream_audio(request, reciter_id, file_key):
+    """Serve a mirrored ayah recording with Range support, or redirect to its source"""
+    try:
+        surah, ayah = int(file_key[:3]), int(file_key[3:])
+        positions.global_number(surah, ayah)
+    except ValueError:
+        raise Http404('Unknown ayah')
+    
+    entry = AudioFile.objects.filter(
+        recitation__reciter_id=reciter_id, surah_number=surah, ayah_number=ayah
+    ).values('sha256', 'size', 'content_type', 'downloaded_at').first()
+    path = audio_store.object_path(entry['sha256']) if entry else None
+    if path is None or not path.exists():
+        return HttpResponseRedirect(audio.remote_audio_url(reciter_id, surah, ayah))
+    
+    size = entry['size']
+    etag = f'"{entry["sha256"]}"'
+    
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        byte_range = None
+        if request.headers.get('If-Range', etag) == etag:
+            try:
+                byte_range = audio_store.parse_range(request.headers.get('Range'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f"bytes */{size}"
+                return response
+        
+        sendfile_header = getattr(settings, 'QURAN_AUDIO_SENDFILE_HEADER', None)
+        if sendfile_header:
+            # The front-end server streams the body and handles Range itself
+            response = HttpResponse(content_type=entry['content_type'])
+            if sendfile_header.lower() == 'x-sendfile':
+                response[sendfile_header] = str(path)
+            else:
+                response[sendfile_header] = settings.QURAN_AUDIO_SENDFILE_PREFIX + audio_store.object_name(entry['sha256'])
+        elif byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=entry['content_type'])
+        else:
+            start, end = byte_range
+            if end == size - 1:
+                # An open-ended range is still a plain file tail, so it can
+                # go through wsgi.file_wrapper (sendfile) like a full response
+                f = open(path, 'rb')
+                f.seek(start)
+                response = FileResponse(f, status=206, content_type=entry['content_type'])
+            else:
+                response = StreamingHttpResponse(
+                    audio_store.iter_range(path, start, end), status=206, content_type=entry['content_type']
+                )
+                response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f"bytes {start}-{end}/{size}"
+    
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(entry['downloaded_at'].timestamp())
+    patch_cache_control(response, public=True, max_age=AUDIO_CACHE_MAX_AGE)
+    return response
+
+def metrics_view(request):
+    """Prometheus scrape endpoint covering every worker process; needs the token or a staff login"""
+    if not metrics.enabled():
+        raise Http404
+    token = getattr(settings, 'QURAN_METRICS_TOKEN', '')
+    authorized = request.user.is_staff or (
+        token and constant_time_compare(request.headers.get('Authorization', ''), f"Bearer {token}")
+    )
+    if not authorized:
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # views.py - ADD ONLY THIS
 class BismillahView(APIView):
     def get(self, request):
-        bismillah = Bismillah.get_default()
-        return Response({
-            'text_uthmani': bismillah.text_uthmani,
-            'translation_en': bismillah.translation_en,
-            'audio_url': bismillah.audio_url,
-            'words': bismillah.words
-        })
\ No newline at end of file
+        return Response(payloads.bismillah())
\ No newline at end of file
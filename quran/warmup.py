@@ -0,0 +1,84 @@
+"""
+Cache warm-up.
+
+Builds every shared payload (each surah, the 604 pages, the 30 juz, the
+reciter list and the Bismillah) so the first reader of each does not pay
+for it. Entries go through ``caching.get_or_set``, so warming alongside
+live traffic only fills what is missing and never builds an entry twice.
+
+``warm_cache`` spreads the work over a process pool; with
+``QURAN_WARM_CACHE_ON_START`` each server process also warms its cache in
+a background thread when it starts, which is what the per-process
+local-memory backend needs.
+"""
+import logging
+import pickle
+import threading
+import time
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from . import payloads, positions, translations
+
+logger = logging.getLogger(__name__)
+
+BUILDERS = {
+    'surah': payloads.surah_verses,
+    'page': lambda number, editions: payloads.position_verses('page', number, editions),
+    'juz': lambda number, editions: payloads.position_verses('juz', number, editions),
+    'recitations': lambda number, editions: payloads.recitation_list(),
+    'bismillah': lambda number, editions: payloads.bismillah(),
+}
+
+KINDS = list(BUILDERS)
+
+
+def items(kinds=KINDS):
+    """``(kind, number)`` for every payload of the given kinds"""
+    totals = {'surah': positions.TOTAL_SURAHS, 'page': positions.TOTAL_PAGES, 'juz': positions.TOTAL_JUZ}
+    for kind in kinds:
+        if kind in totals:
+            yield from ((kind, number) for number in range(1, totals[kind] + 1))
+        else:
+            yield kind, None
+
+
+def warm(item, editions):
+    """Build (or find) one payload; returns ``(item, seconds, pickled bytes)``"""
+    kind, number = item
+    started = time.perf_counter()
+    value = BUILDERS[kind](number, editions)
+    elapsed = time.perf_counter() - started
+    return item, elapsed, len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def init_worker():
+    # Forked workers must not share the parent's database connections
+    django.setup()
+    connections.close_all()
+
+
+def warm_in_background(editions):
+    """Warm this process's cache in a daemon thread"""
+    def run():
+        started = time.perf_counter()
+        try:
+            for item in items():
+                warm(item, editions)
+        except Exception:
+            logger.exception("Cache warm-up failed")
+        else:
+            logger.info("Cache warmed in %.1fs", time.perf_counter() - started)
+        finally:
+            close_old_connections()
+
+    thread = threading.Thread(target=run, name='cache-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_on_start():
+    if getattr(settings, 'QURAN_WARM_CACHE_ON_START', False):
+        warm_in_background(translations.parse_translations(None))
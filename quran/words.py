@@ -0,0 +1,106 @@
+"""
+Word-by-word data in batches.
+
+Words for a run of consecutive ayahs (one verse, a mushaf page, a surah)
+are read in a single range scan on ``WordMeaning.number`` and cached per
+run under the corpus version. Ayahs that have no ``WordMeaning`` rows yet
+get words split from ``text_uthmani`` and transliterated while the batch
+is built, so the fallback is computed once per cache entry instead of on
+every tap.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import caching, positions
+from .models import Ayah, WordMeaning
+from .transliteration import transliterate_ayah_words
+
+# Word data only changes on import; edits bump the generation below
+WORDS_CACHE_TIMEOUT = 60 * 60 * 24
+
+GENERATION_KEY = 'words:generation'
+
+
+def generation():
+    """Counter that is part of every batch key; bumping it drops all batches"""
+    cache = caching.get_cache()
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        cache.add(GENERATION_KEY, 1, None)
+        value = cache.get(GENERATION_KEY, 1)
+    return value
+
+
+@receiver(post_save, sender=WordMeaning)
+@receiver(post_delete, sender=WordMeaning)
+def invalidate_words(**kwargs):
+    """Forget every cached batch (single edits; imports bump the corpus version)"""
+    cache = caching.get_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 1, None)
+
+
+def word_entry(word):
+    return {
+        'number': word.number,
+        'index': word.word_index,
+        'arabic': word.arabic_word,
+        'transliteration': word.transliteration,
+        'meaning': word.meaning_en,
+        'pronunciation_audio': word.pronunciation_audio,
+        'root': word.root_word,
+    }
+
+
+def fallback_entries(ayah_number, arabic_words, latin_words):
+    """Words split from the ayah text, for ayahs without WordMeaning rows"""
+    return [
+        {
+            'number': positions.word_number(ayah_number, index),
+            'index': index,
+            'arabic': arabic,
+            'transliteration': latin or f"word_{index + 1}",
+            'meaning': 'Meaning not available',
+            'pronunciation_audio': '',
+            'root': 'N/A',
+        }
+        for index, (arabic, latin) in enumerate(zip(arabic_words, latin_words))
+    ]
+
+
+def build_words(first, last):
+    """``{verse_key: [word, ...]}`` for global ayah numbers first..last"""
+    by_ayah = {}
+    rows = WordMeaning.objects.filter(
+        number__range=(positions.word_number(first, 0), positions.word_number(last, positions.WORD_SLOTS - 2))
+    ).order_by('number').only(
+        'number', 'word_index', 'arabic_word', 'transliteration',
+        'meaning_en', 'pronunciation_audio', 'root_word',
+    )
+    for word in rows:
+        ayah_number, _ = positions.word_location(word.number)
+        by_ayah.setdefault(ayah_number, []).append(word_entry(word))
+
+    missing = [number for number in range(first, last + 1) if number not in by_ayah]
+    if missing:
+        ayahs = list(Ayah.objects.filter(number__in=missing).values_list('number', 'text_uthmani'))
+        split = transliterate_ayah_words([text for _, text in ayahs])
+        for (number, _), (arabic_words, latin_words) in zip(ayahs, split):
+            by_ayah[number] = fallback_entries(number, arabic_words, latin_words)
+
+    return {
+        positions.verse_key(*positions.surah_ayah(number)): by_ayah[number]
+        for number in range(first, last + 1)
+        if number in by_ayah
+    }
+
+
+def get_words(first, last):
+    """Cached ``build_words``; raises ValueError for numbers outside 1-6236"""
+    positions.surah_ayah(first)
+    positions.surah_ayah(last)
+    return caching.get_or_set(
+        ('words', generation(), first, last), lambda: build_words(first, last), WORDS_CACHE_TIMEOUT
+    )
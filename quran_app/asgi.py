@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quran_app.settings')
 
 application = get_asgi_application()
+
+# Optional: fill this process's cache in the background (QURAN_WARM_CACHE_ON_START)
+from quran.warmup import warm_on_start  # noqa: E402
+
+warm_on_start()
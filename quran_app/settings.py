@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so it times everything below; removes itself unless enabled
+    'quran.instrumentation.ServerTimingMiddleware',
+    'quran.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,8 +54,43 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Last, so it sees request.user and profiles only the view
+    'quran.profiling.ProfilingMiddleware',
 ]
 
+# Server-Timing headers and a `quran.requests` log line per request with
+# query count, DB time, serialize/render time and cache hits (quran/instrumentation.py)
+QURAN_SERVER_TIMING = os.environ.get('QURAN_SERVER_TIMING') == '1'
+
+# Request, cache and ingest metrics on /metrics in the Prometheus format
+# (quran/metrics.py), off unless QURAN_METRICS=1. Each process writes its
+# numbers to QURAN_METRICS_DIR so one scrape covers every worker. Scrapers
+# send QURAN_METRICS_TOKEN as "Authorization: Bearer <token>"; without it
+# only staff sessions can read the endpoint.
+QURAN_METRICS = os.environ.get('QURAN_METRICS') == '1'
+QURAN_METRICS_DIR = os.environ.get('QURAN_METRICS_DIR', str(BASE_DIR / '.metrics'))
+QURAN_METRICS_FLUSH_INTERVAL = 10
+QURAN_METRICS_TOKEN = os.environ.get('QURAN_METRICS_TOKEN', '')
+
+# Staff can profile a request with ?profile=1 (report in the response) or
+# ?profile=store (report only saved to QURAN_PROFILE_DIR); at most
+# QURAN_PROFILE_RATE (captures, seconds) are taken (quran/profiling.py)
+QURAN_PROFILING = os.environ.get('QURAN_PROFILING', '1') == '1'
+QURAN_PROFILE_DIR = os.environ.get('QURAN_PROFILE_DIR', str(BASE_DIR / '.profiles'))
+QURAN_PROFILE_RATE = (10, 60)
+QURAN_PROFILE_KEEP = 200
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'quran.requests': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 ROOT_URLCONF = 'quran_app.urls'
 
 TEMPLATES = [
@@ -76,14 +115,144 @@ WSGI_APPLICATION = 'quran_app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# QURAN_DB=postgres switches to PostgreSQL (QURAN_DB_NAME, QURAN_DB_USER,
+# QURAN_DB_PASSWORD, QURAN_DB_HOST, QURAN_DB_PORT). Connections stay open
+# between requests and are health-checked before reuse; QURAN_DB_POOL=1
+# uses a psycopg 3 connection pool instead (needs psycopg[pool]). Existing
+# SQLite data is moved over with `manage.py copy_database`.
+QURAN_DB = os.environ.get('QURAN_DB', 'sqlite')
+
+if QURAN_DB == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('QURAN_DB_NAME', 'quran'),
+            'USER': os.environ.get('QURAN_DB_USER', 'quran'),
+            'PASSWORD': os.environ.get('QURAN_DB_PASSWORD', ''),
+            'HOST': os.environ.get('QURAN_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('QURAN_DB_PORT', '5432'),
+        }
+    }
+    if os.environ.get('QURAN_DB_POOL') == '1':
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('QURAN_DB_POOL_MIN', 2)),
+                'max_size': int(os.environ.get('QURAN_DB_POOL_MAX', 10)),
+                'timeout': 10,
+            },
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('QURAN_DB_CONN_MAX_AGE', 600))
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Take the write lock when a transaction starts, so concurrent
+                # writers queue on the busy timeout instead of failing to upgrade
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+        }
+    }
+
+# Corpus tables (verses, words, tafsir, reciters...) only change on ingest,
+# so their reads can be served apart from user writes (quran/routers.py):
+#   QURAN_CORPUS_DB=readonly  the same SQLite file over a read-only connection
+#   QURAN_CORPUS_DB=replica   a PostgreSQL streaming replica at
+#                             QURAN_DB_REPLICA_HOST
+#   QURAN_CORPUS_DB=<path>    a SQLite snapshot of the corpus tables, rebuilt
+#                             from the primary by migrate and every ingest
+#                             command (quran/replica.py)
+QURAN_CORPUS_DB = os.environ.get('QURAN_CORPUS_DB', '')
+QURAN_CORPUS_SNAPSHOT = None
+# Admin edits of corpus rows rebuild the snapshot in the background this
+# many seconds after the last edit
+QURAN_CORPUS_REFRESH_DELAY = 30
+
+if QURAN_CORPUS_DB == 'readonly':
+    DATABASES['corpus'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{DATABASES['default']['NAME']}?mode=ro",
+        'TEST': {'MIRROR': 'default'},
+    }
+elif QURAN_CORPUS_DB == 'replica':
+    DATABASES['corpus'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get('QURAN_DB_REPLICA_HOST', 'localhost'),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif QURAN_CORPUS_DB:
+    QURAN_CORPUS_SNAPSHOT = QURAN_CORPUS_DB
+    DATABASES['corpus'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        # Snapshots are replaced, never modified, so readers can skip locking
+        'NAME': f"file:{QURAN_CORPUS_SNAPSHOT}?mode=ro&immutable=1",
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# The SQLite file `manage.py copy_database` reads from
+if os.environ.get('QURAN_DB_IMPORT'):
+    DATABASES['import'] = {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': f"file:{os.environ['QURAN_DB_IMPORT']}?mode=ro",
     }
+
+DATABASE_ROUTERS = ['quran.routers.CorpusRouter']
+
+# Applied to every SQLite connection as it opens (quran/sqlite.py)
+QURAN_SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
 }
 
 
+# Cache
+# QURAN_CACHE picks the backend: 'locmem' (per process, the default),
+# 'file' (shared by the processes of one host) or 'redis' (shared by every
+# host; needs the redis package). Corpus entries are keyed by dataset
+# version, see quran/caching.py.
+QURAN_CACHE = os.environ.get('QURAN_CACHE', 'locmem')
+
+if QURAN_CACHE == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('QURAN_CACHE_URL', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif QURAN_CACHE == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('QURAN_CACHE_DIR', str(BASE_DIR / '.cache')),
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Seconds a worker may keep using a dataset version before re-checking it
+QURAN_CACHE_VERSION_TTL = 2
+# Expired entries are served for this long while one request rebuilds them
+QURAN_CACHE_STALE_SECONDS = 60 * 60 * 24
+# Seconds a cache miss waits for another request's build of the same entry
+QURAN_CACHE_BUILD_WAIT = 10
+# Build every shared payload in the background when a server process starts
+# (see quran/warmup.py); `manage.py warm_cache` does the same from outside
+QURAN_WARM_CACHE_ON_START = os.environ.get('QURAN_WARM_CACHE_ON_START') == '1'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -126,12 +295,35 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
     ],
+    # Writes stored JSON columns into responses without re-encoding them
+    'DEFAULT_RENDERER_CLASSES': [
+        'quran.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Local recitation mirror (see `manage.py mirror_audio`)
+QURAN_AUDIO_ROOT = MEDIA_ROOT / 'audio'
+# Serve playlist/audio URLs from the local mirror instead of the reciter's host
+QURAN_AUDIO_SERVE_LOCAL = False
+# Hand file bodies to the front-end server, e.g. 'X-Accel-Redirect' (nginx)
+# or 'X-Sendfile' (Apache); QURAN_AUDIO_SENDFILE_PREFIX is the internal URL
+# that maps onto QURAN_AUDIO_ROOT
+QURAN_AUDIO_SENDFILE_HEADER = None
+QURAN_AUDIO_SENDFILE_PREFIX = '/protected-audio/'
+
+# Upper bound for decompressed tafsir texts kept in memory per process
+QURAN_TEXT_CACHE_BYTES = 16 * 1024 * 1024
+
+# Reading progress is buffered in memory and written in batches; a crash
+# loses at most QURAN_PROGRESS_FLUSH_INTERVAL seconds of it
+QURAN_PROGRESS_FLUSH_INTERVAL = 5
+QURAN_PROGRESS_MAX_PENDING = 5000
+
 # Static files
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
@@ -9,6 +9,7 @@ const CONFIG = {
         SURAHS: '/api/surahs/',
         SURAH: '/api/surahs/{number}/',
         AYAH_WORD: '/api/verse/{ayahId}/word/{wordIndex}/',
+        WORDS: '/api/words/',
         BISMILLAH: '/api/bismillah/'
     },
     BISMILLAH_AUDIO: {
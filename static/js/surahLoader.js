@@ -49,7 +49,7 @@ class SurahLoader {
         container.innerHTML = '<div class="loading"><i class="fas fa-spinner fa-spin"></i> Loading verses...</div>';
         
         try {
-            const response = await fetch(CONFIG.API_ENDPOINTS.SURAH.replace('{number}', surahNumber));
+            const response = await fetch(`${CONFIG.API_ENDPOINTS.SURAH.replace('{number}', surahNumber)}?user_flags=1`);
             if (!response.ok) throw new Error(`HTTP ${response.status}`);
             
             const data = await response.json();
@@ -145,6 +145,14 @@ class SurahLoader {
             container.appendChild(verseDiv);
         });
         
+        if (window.wordModal) {
+            window.wordModal.prefetch(
+                pageVerses[0].surah,
+                pageVerses[0].number_in_surah,
+                pageVerses[pageVerses.length - 1].number_in_surah
+            );
+        }
+        
         this.updatePagination();
         window.scrollTo({ top: 0, behavior: 'smooth' });
     }
@@ -204,8 +212,8 @@ class SurahLoader {
             <button onclick="surahLoader.copyAyah(${index})" title="Copy verse">
                 <i class="fas fa-copy"></i> Copy
             </button>
-            <button onclick="surahLoader.bookmarkAyah('${verse.id}')" title="Bookmark this verse">
-                <i class="fas fa-bookmark"></i> Save
+            <button onclick="surahLoader.bookmarkAyah('${verse.id}')" title="Bookmark this verse"${verse.is_bookmarked ? ' class="bookmarked"' : ''}>
+                <i class="fas fa-bookmark"></i> ${verse.is_bookmarked ? 'Saved' : 'Save'}
             </button>
             <button onclick="surahLoader.shareAyah(${index})" title="Share this verse">
                 <i class="fas fa-share"></i> Share
@@ -374,6 +382,8 @@ class SurahLoader {
             });
             
             if (response.ok) {
+                const verse = this.currentVerses.find(v => String(v.id) === String(ayahId));
+                if (verse) verse.is_bookmarked = true;
                 showToast('Verse bookmarked!', 'success');
             } else if (response.status === 401) {
                 showToast('Please login to bookmark verses', 'warning');
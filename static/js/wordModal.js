@@ -7,6 +7,7 @@ class WordModal {
         this.wordModal = document.getElementById('word-modal');
         this.audioElement = document.getElementById('word-audio-player');
         this.audioSource = document.getElementById('word-audio-source');
+        this.words = new Map(); // "surah:ayah" -> word list
         this.init();
     }
 
@@ -52,43 +53,53 @@ class WordModal {
             this.audioElement.load();
         }
         
-        // Try to fetch word details
-        const endpoints = [
-            CONFIG.API_ENDPOINTS.AYAH_WORD
-                .replace('{ayahId}', ayahId)
-                .replace('{wordIndex}', wordIndexRaw),
-        ];
+        const ayahWords = await this.getAyahWords(surahNumberRaw, ayahNumberRaw);
+        // Words are keyed by their stored index, which can have gaps
+        const wordData = ayahWords?.find(w => w.index === wordIndexRaw);
+        if (!wordData) {
+            this.showBasicWordInfo(ayahId, surahNumberRaw, ayahNumberRaw, wordIndexRaw, finalAudioUrl);
+            return;
+        }
+        
+        this.displayWordData(wordData);
+        this.open();
         
-        await this.tryEndpoints(endpoints, ayahId, surahNumberRaw, ayahNumberRaw, wordIndexRaw, finalAudioUrl);
+        // Auto-play if enabled
+        const autoPlay = localStorage.getItem('autoPlayWordAudio') === 'true';
+        if (autoPlay && this.audioElement) {
+            this.audioElement.play().catch(e => console.log('Auto-play prevented:', e));
+        }
     }
 
-    async tryEndpoints(endpoints, ayahId, surahNumber, ayahNumber, wordIndex, audioUrl) {
-        for (const endpoint of endpoints) {
-            try {
-                const response = await fetch(endpoint);
-                if (!response.ok) continue;
-                
-                const wordData = await response.json();
-                if (wordData.error) continue;
-                
-                this.displayWordData(wordData);
-                this.open();
-                
-                // Auto-play if enabled
-                const autoPlay = localStorage.getItem('autoPlayWordAudio') === 'true';
-                if (autoPlay && this.audioElement) {
-                    this.audioElement.play().catch(e => console.log('Auto-play prevented:', e));
-                }
-                
-                return;
-            } catch (error) {
-                console.log(`Word endpoint ${endpoint} failed:`, error);
-                continue;
-            }
+    async fetchWords(params) {
+        try {
+            const response = await fetch(`${CONFIG.API_ENDPOINTS.WORDS}?${new URLSearchParams(params)}`);
+            if (!response.ok) return;
+            
+            const data = await response.json();
+            Object.entries(data.verses || {}).forEach(([key, words]) => this.words.set(key, words));
+        } catch (error) {
+            console.log('Word batch request failed:', error);
         }
+    }
+
+    // Load the words of every ayah on the visible page in one request
+    async prefetch(surahNumber, fromAyah, toAyah) {
+        const missing = [];
+        for (let ayah = fromAyah; ayah <= toAyah; ayah++) {
+            if (!this.words.has(`${surahNumber}:${ayah}`)) missing.push(ayah);
+        }
+        if (missing.length === 0) return;
         
-        // If all endpoints fail, show basic info
-        this.showBasicWordInfo(ayahId, surahNumber, ayahNumber, wordIndex, audioUrl);
+        await this.fetchWords({ surah: surahNumber, from: missing[0], to: missing[missing.length - 1] });
+    }
+
+    async getAyahWords(surahNumber, ayahNumber) {
+        const key = `${surahNumber}:${ayahNumber}`;
+        if (!this.words.has(key)) {
+            await this.fetchWords({ verse: key });
+        }
+        return this.words.get(key);
     }
 
     displayWordData(wordData) {